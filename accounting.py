@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ZIVPN bandwidth accounting
+Conntrack accounting counters (nf_conntrack_acct) မှ flow တစ်ခုချင်းစီ၏ bytes ကို interval တစ်ခုလျှင် dump တစ်ကြိမ်ဖတ်ပြီး
+ယခင် reading နှင့် ခြားနားချက် (delta) ကို port -> user အလိုက် စုပေါင်းကာ SQLite ထဲသို့ transaction တစ်ခုတည်းဖြင့် flush လုပ်သည်။
+- Counter reset (flow id ပြန်သုံးခြင်း / conntrack flush) ဖြစ်ပါက counter အသစ်တစ်ခုလုံးကို delta အဖြစ် ယူသည်။
+- Interval အတွင်း ပိတ်သွားသော flows များ၏ နောက်ဆုံး bytes ကို DESTROY events မှ ယူသည်။
+"""
+
+import os
+import queue
+import threading
+import time
+
+import database
+from conntrack import get_flow_source, get_event_source
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+ACCOUNTING_INTERVAL = float(os.environ.get("BANDWIDTH_INTERVAL", "60"))
+# DESTROY event မရောက်လာသော flows များကို dump ထဲမှ ပျောက်သွားပြီး ဤ cycle အရေအတွက်အထိ စောင့်သည်။
+GONE_GRACE_CYCLES = 1
+DESTROY_QUEUE_SIZE = 100000
+
+def record_usage(db, usage):
+    """
+    {username: bytes} ကို users.bandwidth_used ထဲ ပေါင်းပြီး bandwidth_logs ထဲ raw sample rows အဖြစ်
+    transaction တစ်ခုတည်းဖြင့် ထည့်သည်။ Hourly/daily/monthly ပေါင်းခြင်းကို rollups.py က လုပ်သည်။
+    """
+    rows = [(b, u) for u, b in usage.items() if b > 0]
+    if not rows:
+        return 0
+    with db.transaction():
+        db.executemany('''
+            UPDATE users SET bandwidth_used = bandwidth_used + ?, updated_at = CURRENT_TIMESTAMP
+            WHERE username = ?
+        ''', rows)
+        db.executemany('INSERT INTO bandwidth_logs (bytes_used, username) VALUES (?, ?)', rows)
+    return len(rows)
+
+class BandwidthCollector:
+    def __init__(self, flow_source=None, event_source=None, db_path=DATABASE_PATH, interval=ACCOUNTING_INTERVAL):
+        self.flow_source = flow_source or get_flow_source()
+        self.event_source = event_source or get_event_source()
+        self.db_path = db_path
+        self.interval = interval
+        # (ct_id, dport) -> နောက်ဆုံးဖတ်ခဲ့သော bytes
+        self.flows = {}
+        # Dump ထဲမှ ပျောက်သွားသော flows: (ct_id, dport) -> [bytes, ကျန်ရှိသော grace cycles]
+        self.gone = {}
+        self.destroyed = queue.Queue(maxsize=DESTROY_QUEUE_SIZE)
+        # Flush မအောင်မြင်သေးသော port -> bytes (နောက် cycle တွင် ပြန်ကြိုးစားသည်)
+        self.pending = {}
+        self.baseline_done = False
+        self.last_stats = None
+
+    def get_db(self):
+        return database.get_db(self.db_path)
+
+    def watch_destroyed(self):
+        """DESTROY events များကို queue ထဲ ထည့်သည် (thread ထဲတွင် run ရန်)။"""
+        while True:
+            try:
+                for counter in self.event_source.destroyed():
+                    try:
+                        self.destroyed.put_nowait(counter)
+                    except queue.Full:
+                        pass
+            except Exception as e:
+                print(f"Accounting event stream error: {e}")
+            time.sleep(5)
+
+    def _take_delta(self, key, current, deltas):
+        """key ၏ ယခင် reading နှင့် နှိုင်းယှဉ်ပြီး delta ကို deltas[port] ထဲ ပေါင်းထည့်သည်။"""
+        prev = self.flows.pop(key, None)
+        if prev is None:
+            gone = self.gone.pop(key, None)
+            prev = gone[0] if gone else None
+        if prev is None:
+            # Baseline ပြီးနောက် ပေါ်လာသော flow အသစ် (counter သုည မှ စတင်သည်)
+            delta = current if self.baseline_done else 0
+        elif current >= prev:
+            delta = current - prev
+        else:
+            # Counter reset: flow id ပြန်သုံးခြင်း စသည်
+            delta = current
+        if delta:
+            deltas[key[1]] = deltas.get(key[1], 0) + delta
+
+    def collect(self):
+        """Cycle တစ်ခု၏ port -> delta bytes (DESTROY events + dump)"""
+        deltas = {}
+        lost_events = False
+        # ယခု cycle တွင် ပိတ်သွားသော flows ၏ final bytes (dump ထဲ ခဏကျန်နေပါက နှစ်ခါမရေရန်)
+        closed = {}
+        while True:
+            try:
+                ct_id, dport, total = self.destroyed.get_nowait()
+            except queue.Empty:
+                break
+            if ct_id is None:
+                lost_events = True
+                continue
+            self._take_delta((ct_id, dport), total, deltas)
+            closed[(ct_id, dport)] = total
+
+        # Grace ကုန်သော gone flows များ (DESTROY event မရ) ကို စွန့်သည်။
+        for key in list(self.gone):
+            self.gone[key][1] -= 1
+            if self.gone[key][1] < 0:
+                del self.gone[key]
+
+        seen = {}
+        for ct_id, dport, total in self.flow_source.counters():
+            key = (ct_id, dport)
+            if key in closed:
+                self.flows[key] = closed[key]
+            self._take_delta(key, total, deltas)
+            seen[key] = total
+        for key, last in self.flows.items():
+            self.gone[key] = [last, GONE_GRACE_CYCLES]
+        self.flows = seen
+        self.baseline_done = True
+        if lost_events:
+            print("Accounting: conntrack DESTROY events lost; closed flows since last cycle are undercounted.")
+        return deltas
+
+    def load_port_users(self, db):
+        return {int(r[0]): r[1] for r in db.execute(
+            'SELECT port, username FROM users WHERE port IS NOT NULL AND port != ""').fetchall()
+            if str(r[0]).isdigit()}
+
+    def flush(self, deltas):
+        """Port deltas များကို users အလိုက် ပြောင်းပြီး SQLite ထဲ batch ဖြင့် ရေးသည်။"""
+        for port, b in deltas.items():
+            self.pending[port] = self.pending.get(port, 0) + b
+        if not self.pending:
+            return 0
+        db = self.get_db()
+        try:
+            port_users = self.load_port_users(db)
+            usage = {}
+            unattributed = 0
+            for port, b in self.pending.items():
+                username = port_users.get(port)
+                if username is None:
+                    # Default listen port (users မျှဝေသုံးသည်) သို့မဟုတ် user မရှိသော port
+                    unattributed += b
+                    continue
+                usage[username] = usage.get(username, 0) + b
+            written = record_usage(db, usage)
+            self.pending = {}
+        finally:
+            db.close()
+        self.last_stats = {'users': written, 'bytes': sum(usage.values()), 'unattributed_bytes': unattributed,
+                           'flows': len(self.flows), 'at': time.time()}
+        return written
+
+    def run_once(self):
+        deltas = self.collect()
+        try:
+            return self.flush(deltas)
+        except Exception as e:
+            # Deltas များကို pending ထဲတွင် ထားပြီး နောက် cycle တွင် ပြန်ရေးသည်။
+            print(f"Accounting flush error: {e}")
+            return 0
+
+    def start(self):
+        threading.Thread(target=self.watch_destroyed, daemon=True).start()
+        threading.Thread(target=self._loop, daemon=True).start()
+        print(f"Bandwidth accounting started ({self.flow_source.name}, every {self.interval:g}s).")
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Accounting error: {e}")
+            time.sleep(self.interval)
+
+if __name__ == "__main__":
+    collector = BandwidthCollector()
+    collector.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+ZIVPN backup
+- Web panel / API / Connection Manager တို့ ရေးနေစဉ်မှာပင် SQLite online backup API (`Connection.backup`) ဖြင့်
+  pages အနည်းငယ်စီ (step) ကူးသဖြင့် writers များကို မပိတ်ဆို့ဘဲ consistent snapshot ရသည်။
+- Snapshot ကို fixed-size chunks များအဖြစ် ခွဲပြီး sha256 ဖြင့် dedup လုပ်သည်။ ပြောင်းလဲခြင်းမရှိသော pages
+  (ဥပမာ bandwidth_logs အဟောင်းများ) ကို ပြန်မကူး/ပြန်မ compress ပါ။ Chunk အသစ်များကိုသာ gzip ဖြင့် stream compress လုပ်သည်။
+- Snapshot တစ်ခုစီ၏ manifest (chunks, size, row counts) ကို JSON ဖြင့် သိမ်းပြီး retention ကို manifest ၏
+  created time ဖြင့် တွက်ကာ မည်သည့် snapshot မှ မသုံးတော့သော chunks များကို ဖျက်သည်။
+
+Usage:
+  python3 backup.py                                 # snapshot + prune (zivpn-backup.timer)
+  python3 backup.py list
+  python3 backup.py restore NAME|latest [--verify] [-o PATH]
+      --verify: integrity_check နှင့် row counts များကို manifest နှင့် တိုက်စစ်သည်။
+      -o PATH : ရှိပြီးသား DB (live DB အပါအဝင်) ဆိုလျှင် backup API ဖြင့် ပြန်ထည့်သည်။ -o မပါပါက စစ်ရုံသာ။
+"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import database
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "/etc/zivpn/backups")
+BACKUP_KEEP_DAYS = int(os.environ.get("BACKUP_KEEP_DAYS", "7"))
+BACKUP_KEEP_MIN = 3
+# Step တစ်ခုလျှင် ကူးမည့် pages နှင့် steps ကြား နားချိန် (writers များ lock ရစေရန်)
+BACKUP_STEP_PAGES = int(os.environ.get("BACKUP_STEP_PAGES", "1024"))
+BACKUP_STEP_SLEEP = 0.005
+# အခြား connection က ရေးလိုက်လျှင် stepped backup သည် အစမှ ပြန်စသည်။ ဤအကြိမ်ရေ ကျော်ပါက WAL read snapshot
+# တစ်ခုတည်းဖြင့် (pages=-1) ကူးသည် - WAL mode တွင် readers များသည် writers ကို မပိတ်ဆို့ပါ။
+BACKUP_MAX_RESTARTS = 5
+CHUNK_SIZE = int(os.environ.get("BACKUP_CHUNK_KB", "1024")) * 1024
+LEGACY_PREFIX = "zivpn_backup_"
+
+class BackupError(Exception):
+    pass
+
+class _Restarted(Exception):
+    pass
+
+def chunk_dir(root=BACKUP_DIR):
+    return os.path.join(root, "chunks")
+
+def snapshot_dir(root=BACKUP_DIR):
+    return os.path.join(root, "snapshots")
+
+def chunk_path(digest, root=BACKUP_DIR):
+    return os.path.join(chunk_dir(root), digest[:2], digest + ".gz")
+
+def copy_online(src, dest_path, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP):
+    """src connection မှ dest_path သို့ stepped online backup (restart များလွန်းပါက single step)"""
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] >= BACKUP_MAX_RESTARTS:
+                raise _Restarted()
+        state["remaining"] = remaining
+
+    dest = sqlite3.connect(dest_path)
+    try:
+        try:
+            src.backup(dest, pages=pages, progress=progress, sleep=sleep)
+        except _Restarted:
+            print(f"Backup restarted {state['restarts']} times under writes, copying in one step")
+            src.backup(dest, pages=-1)
+    finally:
+        dest.close()
+    return state["restarts"]
+
+def table_counts(conn):
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()]
+    return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+def inspect(path, full=False):
+    """(integrity result, row counts, page_size, user_version)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        check = "integrity_check" if full else "quick_check"
+        result = "; ".join(r[0] for r in conn.execute(f"PRAGMA {check}").fetchall())
+        return (result, table_counts(conn), conn.execute("PRAGMA page_size").fetchone()[0],
+                conn.execute("PRAGMA user_version").fetchone()[0])
+    finally:
+        conn.close()
+
+def store_chunks(path, root=BACKUP_DIR, chunk_size=CHUNK_SIZE):
+    """File ကို chunks အဖြစ် stream ဖတ်ပြီး မရှိသေးသော chunks များကိုသာ gzip ဖြင့် ရေးသည်။ (digests, new, new_bytes)"""
+    digests, new, new_bytes = [], 0, 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            digest = hashlib.sha256(data).hexdigest()
+            digests.append(digest)
+            target = chunk_path(digest, root)
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(target))
+            try:
+                with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+                    gz.write(data)
+                os.replace(tmp, target)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            new += 1
+            new_bytes += len(data)
+    return digests, new, new_bytes
+
+def snapshot_name(root=BACKUP_DIR):
+    base = "zivpn_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    name, n = base, 1
+    while os.path.exists(os.path.join(snapshot_dir(root), name + ".json")):
+        n += 1
+        name = f"{base}_{n}"
+    return name
+
+def create_snapshot(db_path=DATABASE_PATH, root=BACKUP_DIR):
+    """Consistent snapshot တစ်ခု ယူပြီး manifest ကို ပြန်ပေးသည်။"""
+    os.makedirs(snapshot_dir(root), exist_ok=True)
+    os.makedirs(chunk_dir(root), exist_ok=True)
+    start = time.perf_counter()
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", suffix=".db", dir=root)
+    os.close(fd)
+    db = database.get_db(db_path)
+    try:
+        restarts = copy_online(db.conn, tmp)
+        integrity, counts, page_size, user_version = inspect(tmp)
+        if integrity != "ok":
+            raise BackupError(f"snapshot failed quick_check: {integrity}")
+        digests, new, new_bytes = store_chunks(tmp, root)
+        size = os.path.getsize(tmp)
+    finally:
+        db.close()
+        os.remove(tmp)
+
+    manifest = {
+        "name": snapshot_name(root),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "size": size,
+        "chunk_size": CHUNK_SIZE,
+        "page_size": page_size,
+        "user_version": user_version,
+        "chunks": digests,
+        "counts": counts,
+    }
+    path = os.path.join(snapshot_dir(root), manifest["name"] + ".json")
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=snapshot_dir(root))
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+    print(f"Backup created: {manifest['name']} ({size} bytes, {len(digests)} chunks, {new} new / "
+          f"{new_bytes} bytes written, {restarts} restarts) in {time.perf_counter() - start:.2f}s")
+    return manifest
+
+def list_snapshots(root=BACKUP_DIR):
+    """Manifests များ (created အစဉ်)"""
+    manifests = []
+    if not os.path.isdir(snapshot_dir(root)):
+        return manifests
+    for file in os.listdir(snapshot_dir(root)):
+        if not file.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(snapshot_dir(root), file)) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable manifest {file}: {e}")
+    return sorted(manifests, key=lambda m: (m["created"], m["name"]))
+
+def load_snapshot(name, root=BACKUP_DIR):
+    manifests = list_snapshots(root)
+    if not manifests:
+        raise BackupError("no snapshots")
+    if name == "latest":
+        return manifests[-1]
+    for m in manifests:
+        if m["name"] == name:
+            return m
+    raise BackupError(f"unknown snapshot: {name}")
+
+def prune(root=BACKUP_DIR, keep_days=BACKUP_KEEP_DAYS, keep_min=BACKUP_KEEP_MIN):
+    """keep_days ထက်ဟောင်းသော snapshots (နောက်ဆုံး keep_min ခုမှလွဲ၍) နှင့် မသုံးတော့သော chunks များကို ဖျက်သည်။"""
+    manifests = list_snapshots(root)
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=keep_days)).isoformat(timespec="seconds")
+    removed = 0
+    for m in manifests[:max(0, len(manifests) - keep_min)]:
+        if m["created"] < cutoff:
+            os.remove(os.path.join(snapshot_dir(root), m["name"] + ".json"))
+            removed += 1
+    live = {d for m in list_snapshots(root) for d in m["chunks"]}
+    freed = 0
+    for sub in os.listdir(chunk_dir(root)) if os.path.isdir(chunk_dir(root)) else []:
+        subdir = os.path.join(chunk_dir(root), sub)
+        for file in os.listdir(subdir):
+            if file.endswith(".gz") and file[:-3] not in live:
+                os.remove(os.path.join(subdir, file))
+                freed += 1
+    # ယခင် version ၏ full-file backups (zivpn_backup_YYYYmmdd_HHMMSS.db.gz) - filename ရှိ time ဖြင့်
+    for file in os.listdir(root):
+        if file.startswith(LEGACY_PREFIX) and file.endswith(".db.gz"):
+            try:
+                taken = datetime.datetime.strptime(file[len(LEGACY_PREFIX):-6], "%Y%m%d_%H%M%S")
+            except ValueError:
+                continue
+            if taken.isoformat() < cutoff:
+                os.remove(os.path.join(root, file))
+    if removed or freed:
+        print(f"Pruned {removed} snapshots, {freed} chunks")
+    return removed, freed
+
+def assemble(manifest, dest_path, root=BACKUP_DIR):
+    """Chunks များကို hash စစ်ပြီး dest_path သို့ stream ပြန်ဆက်သည်။"""
+    with open(dest_path, "wb") as out:
+        for digest in manifest["chunks"]:
+            try:
+                with gzip.open(chunk_path(digest, root), "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                raise BackupError(f"chunk {digest[:12]} unreadable: {e}")
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise BackupError(f"chunk {digest[:12]} is corrupt")
+            out.write(data)
+    if os.path.getsize(dest_path) != manifest["size"]:
+        raise BackupError("restored size does not match manifest")
+
+def verify(manifest, path):
+    """integrity_check နှင့် row counts များကို manifest နှင့် တိုက်သည်။ မကိုက်ညီမှုများ list ကို ပြန်ပေးသည်။"""
+    integrity, counts, _, _ = inspect(path, full=True)
+    problems = [] if integrity == "ok" else [f"integrity_check: {integrity}"]
+    for table, expected in manifest["counts"].items():
+        if counts.get(table) != expected:
+            problems.append(f"{table}: {counts.get(table)} rows, expected {expected}")
+    return problems
+
+def restore(name, output=None, check=False, root=BACKUP_DIR):
+    manifest = load_snapshot(name, root)
+    os.makedirs(root, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".restore-", suffix=".db", dir=root)
+    os.close(fd)
+    try:
+        assemble(manifest, tmp, root)
+        if check:
+            problems = verify(manifest, tmp)
+            if problems:
+                raise BackupError("verify failed: " + "; ".join(problems))
+            print(f"Verified {manifest['name']}: integrity ok, {len(manifest['counts'])} tables, "
+                  f"{sum(manifest['counts'].values())} rows match")
+        if not output:
+            return manifest
+        if os.path.exists(output):
+            # ရှိပြီးသား DB (WAL / အခြား connections) ကို file အစားထိုးခြင်းမပြုဘဲ backup API ဖြင့် ပြန်ရေးသည်။
+            src = sqlite3.connect(f"file:{tmp}?mode=ro", uri=True)
+            dest = sqlite3.connect(output, timeout=30)
+            try:
+                src.backup(dest)
+            finally:
+                src.close()
+                dest.close()
+        else:
+            os.replace(tmp, output)
+        print(f"Restored {manifest['name']} to {output}")
+        return manifest
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def main(argv):
+    command = argv[0] if argv else "create"
+    if command == "create":
+        create_snapshot()
+        prune()
+    elif command == "list":
+        for m in list_snapshots():
+            print(f"{m['name']}  {m['created']}  {m['size']:>12} bytes  {len(m['chunks'])} chunks  "
+                  f"{sum(m['counts'].values())} rows")
+    elif command == "restore" and len(argv) >= 2:
+        output = argv[argv.index("-o") + 1] if "-o" in argv[:-1] else None
+        restore(argv[1], output=output, check="--verify" in argv)
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except BackupError as e:
+        print(f"Backup error: {e}")
+        sys.exit(1)
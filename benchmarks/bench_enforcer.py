@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ZIVPN enforcer benchmark
+Synthetic conntrack flows (1k/10k/100k) ဖြင့် enforce_connection_limits tick တစ်ကြိမ်၏ ကြာချိန်ကို တိုင်းသည်။
+conntrack delete မ run ပါ (flow source ၏ drop ကို stub လုပ်ထားသည်)။
+
+Usage: python3 benchmarks/bench_enforcer.py [flows ...]
+"""
+
+import contextlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import connection_manager
+from conntrack import CliFlowSource
+
+FLOW_SIZES = [1000, 10000, 100000]
+USERS = 3000
+REPEAT = 5
+
+class ListFlowSource:
+    name = "list"
+
+    def __init__(self, flows, drops):
+        self.list = flows
+        self.drops = drops
+
+    def flows(self):
+        return iter(self.list)
+
+    def drop(self, victims):
+        self.drops.extend(victims)
+        return len(victims), 0
+
+class ListCliFlowSource(CliFlowSource):
+    def __init__(self, lines, drops):
+        super().__init__(lines=lines)
+        self.drops = drops
+
+    def drop(self, victims):
+        self.drops.extend(victims)
+        return len(victims), 0
+
+def make_db(path, users):
+    db = sqlite3.connect(path)
+    db.execute('''
+        CREATE TABLE users (
+            username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, expires DATE, port INTEGER,
+            status TEXT DEFAULT 'active', concurrent_conn INTEGER DEFAULT 1
+        )
+    ''')
+    db.executemany(
+        'INSERT INTO users (username, password, port, concurrent_conn) VALUES (?, ?, ?, ?)',
+        [(f"user{i}", f"pw{i}", 6000 + i, random.randint(1, 3)) for i in range(users)]
+    )
+    db.commit()
+    db.close()
+
+def make_flows(count, users):
+    rnd = random.Random(count)
+    return [(f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}", 6000 + rnd.randrange(users))
+            for _ in range(count)]
+
+def to_lines(flows):
+    return [f"udp      17 29 src={ip} dst=203.0.113.1 sport={40000 + i % 20000} dport={port} "
+            f"src=203.0.113.1 dst={ip} sport=5667 dport={40000 + i % 20000} mark=0 use=1"
+            for i, (ip, port) in enumerate(flows)]
+
+def best_of(fn):
+    best = None
+    for _ in range(REPEAT):
+        # Drop log lines များကို timing ထဲ မထည့်ပါ။
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or FLOW_SIZES
+    tmp = tempfile.mkdtemp(prefix="zivpn-bench-")
+    connection_manager.DATABASE_PATH = os.path.join(tmp, "zivpn.db")
+    make_db(connection_manager.DATABASE_PATH, USERS)
+
+    manager = connection_manager.ConnectionManager()
+    drops = []
+
+    print(f"{'flows':>8} {'tuples (ms)':>12} {'cli text (ms)':>14} {'drops':>7}")
+    for size in sizes:
+        flows = make_flows(size, USERS)
+        manager.flow_source = ListFlowSource(flows, drops)
+        drops.clear()
+        tick = best_of(manager.enforce_connection_limits)
+        dropped = len(drops) // REPEAT
+        manager.flow_source = ListCliFlowSource(to_lines(flows), drops)
+        cli_tick = best_of(manager.enforce_connection_limits)
+        print(f"{size:>8} {tick * 1000:>12.2f} {cli_tick * 1000:>14.2f} {dropped:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+ZIVPN benchmark suite
+Synthetic zivpn.db (users / billing / bandwidth_logs history + rollups) နှင့် users အရေအတွက်နှင့် ကိုက်ညီသော
+synthetic conntrack dump ဖြင့် Web panel နှင့် enforcer ၏ hot paths များကို တိုင်းပြီး ရလဒ်ကို JSON ဖြင့် ထုတ်သည်။
+systemctl / subprocess.run နှင့် conntrack dump / delete များကို stub လုပ်ထားသဖြင့် မည်သည့် machine တွင်မဆို run နိုင်သည်။
+Commits နှစ်ခု၏ JSON များကို --compare ဖြင့် တိုက်ကြည့်နိုင်သည်။
+
+Usage:
+  python3 benchmarks/bench_suite.py [users ...] [--repeat N] [-o results.json]
+  python3 benchmarks/bench_suite.py --compare base.json new.json
+"""
+
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "templates")]
+
+USER_SIZES = [1000, 10000, 50000]
+REPEAT = 5
+HISTORY_DAYS = 30
+# User တစ်ယောက်လျှင် flows (devices) ပျမ်းမျှ
+FLOWS_PER_USER = 2
+BULK_USERS = 1000
+SEED = 1
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ===== Stubs =====
+
+class StubProcesses:
+    """subprocess.run ကို stub လုပ်သည် (systemctl restart စသည်)။ Run ခဲ့သော commands များကို မှတ်ထားသည်။"""
+
+    def __init__(self):
+        self.commands = []
+        self.real_run = subprocess.run
+
+    def run(self, cmd, *args, **kwargs):
+        self.commands.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    def __enter__(self):
+        subprocess.run = self.run
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.run = self.real_run
+
+def import_web(tmp):
+    """web.py ကို background workers / network / systemctl မပါဘဲ import လုပ်သည်။"""
+    os.environ.update({
+        "DATABASE_PATH": os.path.join(tmp, "import.db"),
+        "TEMPLATE_DIR": os.path.join(ROOT, "templates"),
+        "TEMPLATE_REFRESH_SECONDS": "0",
+        "EXPIRY_SCHEDULER": "0",
+        "FLEET_MODE": "0",
+        "WEB_ADMIN_USER": "",
+        "WEB_ADMIN_PASSWORD": "",
+    })
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        import web
+    web.CONFIG_FILE = os.path.join(tmp, "config.json")
+    web.config_syncer.config_file = web.CONFIG_FILE
+    web.config_syncer.restart_cmd = ["true"]
+    return web
+
+# ===== Synthetic data =====
+
+def make_db(path, users):
+    """users / billing / bandwidth_logs (HISTORY_DAYS ရက်) ပါသော DB (migrations + rollups ပြီးသား)"""
+    import database
+    import migrations
+    import ports
+    import rollups
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        migrations.run(path)
+    rnd = random.Random(SEED)
+    today = date.today()
+    port_count = ports.PORT_MAX - ports.PORT_MIN + 1
+    db = database.get_db(path)
+    try:
+        with db.transaction():
+            db.executemany('''
+                INSERT INTO users (username, password, expires, port, status, bandwidth_limit, bandwidth_used,
+                                   speed_limit_up, concurrent_conn, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(f"user{i}", f"pw{i}",
+                   (today + timedelta(days=rnd.randint(-10, 60))).isoformat() if i % 5 else None,
+                   ports.PORT_MIN + i if i < port_count else None,
+                   "suspended" if i % 17 == 0 else "active",
+                   rnd.choice([0, 0, 50, 100]), rnd.randint(0, 40 * 1024 ** 3), rnd.choice([0, 0, 5]),
+                   rnd.randint(1, 3),
+                   (datetime.now() - timedelta(days=rnd.randint(0, 365))).strftime("%Y-%m-%d %H:%M:%S"))
+                  for i in range(users)])
+            db.executemany('''
+                INSERT INTO billing (username, plan_type, amount, payment_status, created_at, expires_at)
+                VALUES (?, ?, ?, 'paid', ?, ?)
+            ''', [(f"user{i}", rnd.choice(["monthly", "weekly"]), rnd.choice([3000, 5000]),
+                   (datetime.now() - timedelta(days=rnd.randint(0, 365))).strftime("%Y-%m-%d %H:%M:%S"),
+                   (today + timedelta(days=30)).isoformat()) for i in range(users)])
+        # ရက်တိုင်း users ၏ 1/3 ခန့်သည် usage sample တစ်ခုစီ ရှိသည်။
+        for day in range(HISTORY_DAYS, 0, -1):
+            stamp = (datetime.now() - timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S")
+            with db.transaction():
+                db.executemany(
+                    'INSERT INTO bandwidth_logs (username, bytes_used, log_date, created_at) VALUES (?, ?, ?, ?)',
+                    [(f"user{i}", rnd.randint(1, 2 * 1024 ** 3), stamp[:10], stamp)
+                     for i in range(day % 3, users, 3)])
+            rollups.record_server_stats(db, rnd.random() * 100)
+        rollups.rollup_bandwidth(db)
+        rollups.rollup_server_stats(db)
+        rows = db.execute('SELECT COUNT(*) FROM bandwidth_logs').fetchone()[0]
+    finally:
+        db.close()
+    return rows
+
+def make_dump(users):
+    """Users ports များသို့ ဝင်လာသော (src_ip, dport) flows (users * FLOWS_PER_USER)"""
+    import ports
+    from bench_enforcer import make_flows
+    return make_flows(users * FLOWS_PER_USER, min(users, ports.PORT_MAX - ports.PORT_MIN + 1))
+
+# ===== Timing =====
+
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {"best_ms": round(min(times) * 1000, 3), "median_ms": round(statistics.median(times) * 1000, 3),
+            "runs": repeat}
+
+def run_size(web, tmp, users, repeat):
+    import bulk
+    import connection_manager
+    from bench_enforcer import ListFlowSource
+    from conntrack import SnapshotCache
+
+    path = os.path.join(tmp, f"zivpn-{users}.db")
+    start = time.perf_counter()
+    log_rows = make_db(path, users)
+    flows = make_dump(users)
+    setup_seconds = time.perf_counter() - start
+
+    web.DATABASE_PATH = path
+    connection_manager.DATABASE_PATH = path
+    # TTL 0: request တိုင်း synthetic dump ကို ပြန် parse လုပ်သည် (cache miss worst case)
+    web.conntrack_snapshots = SnapshotCache(ttl=0, loader=lambda: iter(flows))
+    client = web.app.test_client()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager = connection_manager.ConnectionManager()
+    drops = []
+    manager.flow_source = ListFlowSource(flows, drops)
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+
+    def get(url):
+        def call():
+            r = client.get(url)
+            assert r.status_code == 200, (url, r.status_code)
+        return call
+
+    def reset_config():
+        with open(web.CONFIG_FILE, "w") as f:
+            json.dump({"auth": {"mode": "passwords", "config": []}}, f)
+
+    def load_users():
+        with web.app.test_request_context("/"):
+            web.set_language_and_translations()
+            web.load_user_page({})
+
+    bulk_targets = [f"user{i}" for i in range(0, users, max(1, users // BULK_USERS))][:BULK_USERS]
+
+    def bulk_extend():
+        db = web.get_db()
+        try:
+            bulk.apply(db, "extend", bulk_targets, {"days": 1})
+        finally:
+            db.close()
+
+    def bulk_set_limit():
+        db = web.get_db()
+        try:
+            bulk.apply(db, "set_limit", bulk_targets, {"concurrent_conn": 2})
+        finally:
+            db.close()
+
+    benches = {
+        "load_users": measure(load_users, repeat),
+        "build_view": measure(get("/"), repeat),
+        "get_server_stats": measure(web.get_server_stats, repeat),
+        "reports_bandwidth": measure(get(f"/api/reports?type=bandwidth&from={month_ago}&to={today}"), repeat),
+        "reports_traffic": measure(get(f"/api/reports?type=traffic&from={month_ago}&to={today}"), repeat),
+        "reports_users": measure(get("/api/reports?type=users"), repeat),
+        "reports_revenue": measure(get("/api/reports?type=revenue"), repeat),
+        "enforce_connection_limits": measure(manager.enforce_connection_limits, repeat),
+        "sync_config_passwords": measure(web.config_syncer.sync_now, repeat, setup=reset_config),
+        "bulk_extend": measure(bulk_extend, repeat),
+        "bulk_set_limit": measure(bulk_set_limit, repeat),
+    }
+    return {
+        "users": users, "bandwidth_logs": log_rows, "flows": len(flows), "bulk_users": len(bulk_targets),
+        "db_bytes": os.path.getsize(path), "setup_seconds": round(setup_seconds, 2),
+        "dropped_devices": len(drops) // repeat, "benchmarks": benches,
+    }
+
+def compare(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    print(f"{'users':>7} {'benchmark':<28} {'base (ms)':>10} {'new (ms)':>10} {'change':>8}")
+    for size, result in new["results"].items():
+        old = base["results"].get(size, {}).get("benchmarks", {})
+        for name, bench in result["benchmarks"].items():
+            if name not in old:
+                continue
+            a, b = old[name]["best_ms"], bench["best_ms"]
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"{size:>7} {name:<28} {a:>10.2f} {b:>10.2f} {change:>8}")
+
+def main(argv):
+    if argv[:1] == ["--compare"] and len(argv) == 3:
+        compare(argv[1], argv[2])
+        return 0
+    repeat, output, sizes = REPEAT, None, []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--repeat":
+            repeat = int(next(args))
+        elif arg in ("-o", "--output"):
+            output = next(args)
+        else:
+            sizes.append(int(arg))
+    sizes = sizes or USER_SIZES
+
+    tmp = tempfile.mkdtemp(prefix="zivpn-bench-")
+    try:
+        # stdout တွင် JSON report သာ ထွက်စေရန် modules များ၏ log lines များကို stderr သို့ လွှဲသည်။
+        with StubProcesses() as stub, contextlib.redirect_stdout(sys.stderr):
+            web = import_web(tmp)
+            results = {}
+            for users in sizes:
+                print(f"Benchmarking {users} users...", file=sys.stderr)
+                results[str(users)] = run_size(web, tmp, users, repeat)
+        report = {
+            "meta": {
+                "commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                "machine": platform.machine(), "repeat": repeat, "stubbed_commands": len(stub.commands),
+            },
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+ZIVPN bulk user operations
+Usernames များကို temp table တစ်ခုထဲ executemany ဖြင့် ထည့်ပြီး action တစ်ခုလုံးကို set-based SQL
+(`WHERE username IN (SELECT username FROM bulk_targets)`) ဖြင့် transaction တစ်ခုတည်းအတွင်း apply လုပ်သည်။
+User တစ်ယောက်ချင်းစီ၏ ရလဒ်ကို ပြန်ပေးပြီး config sync လိုမလို (sync_needed) ကို caller ထံ ပြောသည်။
+"""
+
+import os
+import re
+from datetime import date
+
+import rollups
+from shaping import USAGE_RESET_ON_ACTIVATE
+
+BULK_MAX_USERS = int(os.environ.get("BULK_MAX_USERS", "10000"))
+EXTEND_DEFAULT_DAYS = 7
+TARGETS = "(SELECT username FROM bulk_targets)"
+
+def parse_usernames(value):
+    """List သို့မဟုတ် comma / whitespace ခြားထားသော string မှ usernames (အစဉ်မပြောင်း၊ ထပ်နေသည်များ ဖယ်သည်)"""
+    if isinstance(value, str):
+        value = re.split(r"[\s,]+", value)
+    seen = {}
+    for name in value or []:
+        name = str(name).strip()
+        if name:
+            seen.setdefault(name, None)
+    return list(seen)
+
+def _int_param(params, key, minimum=0):
+    value = params.get(key)
+    if value in (None, ""):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid {key}")
+    if value < minimum:
+        raise ValueError(f"invalid {key}")
+    return value
+
+def extend_sql(params):
+    days = _int_param(params, "days", 1) or EXTEND_DEFAULT_DAYS
+    # Expiry မရှိသော (unlimited) users များသည် unlimited အတိုင်း ကျန်သည်။ သက်တမ်းတိုးခြင်းသည် quota period အသစ် စသည်။
+    return [(f'UPDATE users SET expires = date(expires, ?), bandwidth_used = 0, updated_at = CURRENT_TIMESTAMP '
+             f'WHERE username IN {TARGETS} AND IFNULL(expires, "") != ""', (f"+{days} days",))]
+
+def status_sql(status):
+    # Suspended users ကို ပြန် activate လုပ်ပါက quota period အသစ် စသည်။
+    reset = f"{USAGE_RESET_ON_ACTIVATE}, " if status == "active" else ""
+    def build(params):
+        return [(f'UPDATE users SET status = ?, {reset}updated_at = CURRENT_TIMESTAMP WHERE username IN {TARGETS}',
+                 (status,))]
+    return build
+
+def delete_sql(params):
+    tables = ["users", "billing", "bandwidth_logs"] + [table for table, _, _ in rollups.BANDWIDTH_LEVELS]
+    return [(f'DELETE FROM {table} WHERE username IN {TARGETS}', ()) for table in tables]
+
+def set_limit_sql(params):
+    columns = {
+        "bandwidth_limit": ("bandwidth_limit", _int_param(params, "bandwidth_limit")),
+        "speed_limit": ("speed_limit_up", _int_param(params, "speed_limit")),
+        "concurrent_conn": ("concurrent_conn", _int_param(params, "concurrent_conn", 1)),
+    }
+    sets = [(column, value) for column, value in columns.values() if value is not None]
+    if not sets:
+        raise ValueError("set_limit requires bandwidth_limit, speed_limit or concurrent_conn")
+    assignments = ", ".join(f"{column} = ?" for column, _ in sets)
+    return [(f'UPDATE users SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE username IN {TARGETS}',
+             tuple(value for _, value in sets))]
+
+def set_expiry_sql(params):
+    expires = (params.get("expires") or "").strip()
+    if expires:
+        try:
+            expires = date.fromisoformat(expires).isoformat()
+        except ValueError:
+            raise ValueError("invalid expires (YYYY-MM-DD)")
+    # "" = unlimited။ Expiry ကို နောက်ရွှေ့ပါက (unlimited သို့ ပြောင်းခြင်း အပါအဝင်) quota period အသစ် စသည်။
+    return [(f'UPDATE users SET expires = ?1, '
+             f'bandwidth_used = CASE WHEN IFNULL(?1, "9999-12-31") > IFNULL(NULLIF(expires, ""), "9999-12-31") '
+             f'THEN 0 ELSE bandwidth_used END, '
+             f'updated_at = CURRENT_TIMESTAMP WHERE username IN {TARGETS}',
+             (expires or None,))]
+
+# action -> (SQL builder, config.json ကို ပြန် sync လုပ်ရန် လိုမလို)
+ACTIONS = {
+    "extend": (extend_sql, True),
+    "suspend": (status_sql("suspended"), True),
+    "activate": (status_sql("active"), True),
+    "delete": (delete_sql, True),
+    "set_limit": (set_limit_sql, False),
+    "set_expiry": (set_expiry_sql, True),
+}
+
+# Users များ၏ expiry / active status ကို ပြောင်းသဖြင့် expiry scheduler ကို ပြန်တွက်စေရမည့် actions
+RESCHEDULE_ACTIONS = {"extend", "set_expiry", "activate"}
+
+def load_targets(db, usernames):
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_targets (username TEXT PRIMARY KEY) WITHOUT ROWID")
+    db.execute("DELETE FROM bulk_targets")
+    db.executemany("INSERT OR IGNORE INTO bulk_targets (username) VALUES (?)", [(u,) for u in usernames])
+
+def apply(db, action, usernames, params=None):
+    """
+    Bulk action ကို transaction တစ်ခုတည်းဖြင့် apply လုပ်သည်။
+    (results, sync_needed) ကို ပြန်ပေးသည်။ results = [{"user", "ok", "status", "expires"} | {"user", "ok": False, "error"}]
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"unknown action: {action}")
+    usernames = parse_usernames(usernames)
+    if not usernames:
+        raise ValueError("no users given")
+    if len(usernames) > BULK_MAX_USERS:
+        raise ValueError(f"too many users (max {BULK_MAX_USERS})")
+    build, sync = ACTIONS[action]
+    statements = build(params or {})
+
+    with db.transaction():
+        load_targets(db, usernames)
+        found = {r[0] for r in db.execute(f"SELECT username FROM users WHERE username IN {TARGETS}").fetchall()}
+        for sql, args in statements:
+            db.execute(sql, args)
+        after = {}
+        if action != "delete":
+            after = {r["username"]: r for r in db.execute(
+                f"SELECT username, status, expires FROM users WHERE username IN {TARGETS}").fetchall()}
+        db.execute("DELETE FROM bulk_targets")
+
+    results = []
+    for name in usernames:
+        if name not in found:
+            results.append({"user": name, "ok": False, "error": "not_found"})
+        elif action == "delete":
+            results.append({"user": name, "ok": True, "status": "deleted"})
+        else:
+            row = after[name]
+            results.append({"user": name, "ok": True, "status": row["status"], "expires": row["expires"]})
+    return results, sync and bool(found)
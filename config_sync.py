@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ZIVPN config sync engine
+Active passwords များကို config.json နှင့် နှိုင်းယှဉ်ပြီး ပြောင်းလဲမှုရှိမှသာ ရေး/restart လုပ်သည်။
+ဆက်တိုက်ဝင်လာသော edits များကို debounce window အတွင်း reload တစ်ကြိမ်တည်းအဖြစ် ပေါင်းသည်။
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+CONFIG_FILE = "/etc/zivpn/config.json"
+RESTART_CMD = ["systemctl", "restart", "zivpn.service"]
+DEBOUNCE_SECONDS = float(os.environ.get("CONFIG_SYNC_DEBOUNCE", "2"))
+# Edits မရပ်မနား ဝင်နေလျှင်ပင် ဤအချိန်ထက် ပိုမစောင့်ပါ။
+MAX_DELAY_SECONDS = float(os.environ.get("CONFIG_SYNC_MAX_DELAY", "10"))
+
+ACTIVE_PASSWORDS_SQL = '''
+    SELECT password FROM users
+    WHERE status = "active" AND password IS NOT NULL AND password != ""
+          AND (expires IS NULL OR expires >= date('now', 'localtime'))
+'''
+
+def read_json(path, default):
+    try:
+        with open(path,"r") as f: return json.load(f)
+    except Exception:
+        return default
+
+def write_json_atomic(path, data):
+    d=json.dumps(data, ensure_ascii=False, indent=2)
+    dirn=os.path.dirname(path); fd,tmp=tempfile.mkstemp(prefix=".tmp-", dir=dirn)
+    try:
+        with os.fdopen(fd,"w") as f: f.write(d)
+        os.replace(tmp,path)
+    finally:
+        try: os.remove(tmp)
+        except: pass
+
+def active_passwords(db):
+    return sorted({str(u[0]) for u in db.execute(ACTIVE_PASSWORDS_SQL).fetchall()})
+
+def build_config(cfg, users_pw):
+    """လက်ရှိ config ပေါ်တွင် passwords နှင့် default fields များကို ထည့်ထားသော config အသစ်ကို ပြန်ပေးသည်။"""
+    cfg = json.loads(json.dumps(cfg))
+    if not isinstance(cfg.get("auth"),dict): cfg["auth"]={}
+    cfg["auth"]["mode"]="passwords"
+    cfg["auth"]["config"]=users_pw
+    cfg["listen"]=cfg.get("listen") or ":5667"
+    cfg["cert"]=cfg.get("cert") or "/etc/zivpn/zivpn.crt"
+    cfg["key"]=cfg.get("key") or "/etc/zivpn/zivpn.key"
+    cfg["obfs"]=cfg.get("obfs") or "zivpn"
+    return cfg
+
+class ConfigSyncer:
+    """
+    sync_now(): DB ထဲရှိ passwords နှင့် deploy လုပ်ထားသော config.json ကို diff လုပ်ပြီး ပြောင်းလဲမှုရှိမှ ရေး/restart လုပ်သည်။
+    request(): background worker ထံ sync တောင်းဆိုသည် (HTTP request ကို systemctl ဖြင့် မပိတ်ဆို့ပါ)။
+    """
+
+    def __init__(self, get_db, config_file=CONFIG_FILE, debounce=DEBOUNCE_SECONDS,
+                 max_delay=MAX_DELAY_SECONDS, restart_cmd=RESTART_CMD):
+        self.get_db = get_db
+        self.config_file = config_file
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.restart_cmd = restart_cmd
+        self.cond = threading.Condition()
+        self.first_request = None
+        self.last_request = None
+        self.worker = None
+        self.syncs = 0
+        self.restarts = 0
+
+    def sync_now(self):
+        """ပြောင်းလဲမှုရှိ၍ restart လုပ်ခဲ့ပါက True ပြန်ပေးသည်။"""
+        db = self.get_db()
+        try:
+            users_pw = active_passwords(db)
+        finally:
+            db.close()
+        self.syncs += 1
+
+        cfg = read_json(self.config_file, {})
+        new_cfg = build_config(cfg, users_pw)
+        if new_cfg == cfg:
+            return False
+
+        write_json_atomic(self.config_file, new_cfg)
+        result = subprocess.run(self.restart_cmd, capture_output=True, text=True)
+        self.restarts += 1
+        if result.returncode != 0:
+            print(f"CONFIG SYNC ERROR: {' '.join(self.restart_cmd)} failed: {result.stderr.strip()}")
+        else:
+            print(f"CONFIG SYNC: {len(users_pw)} passwords deployed, zivpn.service restarted.")
+        return True
+
+    def request(self):
+        """Debounce window ပြီးဆုံးသည့်အခါ sync တစ်ကြိမ် run ရန် schedule လုပ်သည်။"""
+        with self.cond:
+            now = time.monotonic()
+            if self.first_request is None:
+                self.first_request = now
+            self.last_request = now
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.first_request is None:
+                    self.cond.wait()
+                # နောက်ဆုံး edit ပြီး debounce စက္ကန့် ငြိမ်သည်အထိ (သို့) max_delay ပြည့်သည်အထိ စောင့်သည်။
+                while True:
+                    deadline = min(self.last_request + self.debounce, self.first_request + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                self.first_request = self.last_request = None
+            try:
+                self.sync_now()
+            except Exception as e:
+                print(f"CONFIG SYNC ERROR: {e}")
@@ -1,126 +1,276 @@
-import sqlite3
-import subprocess
 import time
 import threading
 from datetime import datetime
 import os
 
+import database
+import metrics
+import migrations
+import notifications
+from accounting import BandwidthCollector
+from shaping import ShapingController
+from rollups import RollupWorker
+from conntrack import get_flow_source, get_event_source, block_devices, EVENT_NEW, EVENT_OVERFLOW
+
 # Configuration
 DATABASE_PATH = "/etc/zivpn/zivpn.db"
 LISTEN_FALLBACK = "5667"
+# poll: 10 စက္ကန့်တိုင်း table အပြည့်စစ်သည်။ events: conntrack NEW/DESTROY events ဖြင့် ချက်ချင်း စစ်သည်။
+MONITOR_MODE = os.environ.get("CONN_MONITOR_MODE", "poll")
+RESYNC_INTERVAL = int(os.environ.get("CONN_RESYNC_INTERVAL", "300"))
+USERS_REFRESH_INTERVAL = 30
+# 0 မဟုတ်ပါက drop လုပ်လိုက်သော devices များကို ipset ဖြင့် ယခု စက္ကန့်အတွင်း block ထားသည်။
+DROP_BLOCK_SECONDS = int(os.environ.get("DROP_BLOCK_SECONDS", "0"))
+# User တစ်ယောက်အတွက် device limit notification ကို ယခု စက္ကန့်အတွင်း တစ်ကြိမ်သာ ထည့်သည်။
+NOTIFY_COOLDOWN = int(os.environ.get("NOTIFY_LIMIT_COOLDOWN", "900"))
+# 1 ဖြစ်ပါက conntrack byte counters မှ per-user bandwidth ကို စုဆောင်းသည်။
+BANDWIDTH_ACCOUNTING = os.environ.get("BANDWIDTH_ACCOUNTING", "1") == "1"
+# 1 ဖြစ်ပါက speed / bandwidth limits များကို nftables ဖြင့် enforce လုပ်သည်။
+TRAFFIC_SHAPING = os.environ.get("TRAFFIC_SHAPING", "1") == "1"
+# 0 မဟုတ်ပါက Prometheus /metrics ကို ဤ port (CM_METRICS_LISTEN, default localhost) တွင် ပေးသည်။
+METRICS_PORT = int(os.environ.get("CM_METRICS_PORT", "9101"))
+METRICS_LISTEN = os.environ.get("CM_METRICS_LISTEN", "127.0.0.1")
+
+ENFORCE_TICK = metrics.REGISTRY.histogram("zivpn_enforcer_tick_seconds", "Connection limit enforcement pass", ["mode"])
+CONNTRACK_DUMP = metrics.REGISTRY.histogram("zivpn_conntrack_dump_seconds", "Full conntrack dump and bucketing")
+CONNTRACK_FLOWS = metrics.REGISTRY.gauge("zivpn_enforcer_flows",
+                                         "ZIVPN flows in the enforcer's last full conntrack dump")
+CONNTRACK_EVENTS = metrics.REGISTRY.counter("zivpn_conntrack_events_total", "conntrack events handled", ["event"])
+DEVICES_DROPPED = metrics.REGISTRY.counter("zivpn_devices_dropped_total", "Devices dropped for exceeding a device limit")
+FLOWS_DROPPED = metrics.REGISTRY.counter("zivpn_flows_dropped_total", "conntrack flows deleted for dropped devices")
+DROP_FAILURES = metrics.REGISTRY.counter("zivpn_drop_failures_total", "conntrack flow deletions that failed")
+DROP_SECONDS = metrics.REGISTRY.histogram("zivpn_drop_seconds", "Batch device drop duration")
+
+def group_flows(flows):
+    """(src_ip, dport) stream ကို pass တစ်ကြိမ်တည်းဖြင့် port -> {src_ip: flow count} အဖြစ် bucket လုပ်သည်။"""
+    port_ips = {}
+    for src_ip, dport in flows:
+        ips = port_ips.get(dport)
+        if ips is None:
+            ips = port_ips[dport] = {}
+        ips[src_ip] = ips.get(src_ip, 0) + 1
+    return port_ips
 
 class ConnectionManager:
     def __init__(self):
         self.lock = threading.Lock()
+        self.flow_source = get_flow_source()
+        # Event mode state: port -> {src_ip: flow count} (dict order = device ဝင်လာသည့် အစဉ်)
+        self.port_ips = {}
+        # port -> (username, concurrent_conn)
+        self.port_limits = {}
+        self.resync_event = threading.Event()
+        # နောက်ဆုံး drop batch ၏ devices / flows / latency
+        self.last_drop_stats = None
+        # username -> နောက်ဆုံး notification ထည့်ခဲ့သည့်အချိန် (monotonic)၊ drop ပြီးမှ ရေးမည့် notifications
+        self.notified = {}
+        self.pending_notices = []
+        print(f"Using conntrack backend: {self.flow_source.name}")
 
     def get_db(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return database.get_db(DATABASE_PATH)
         
     def get_active_connections(self):
         """
-        conntrack ကိုသုံးပြီး 'src=IP' နှင့် 'dport=PORT' ပါသော UDP connections များကို ရယူသည်။
+        Flow source (netlink သို့မဟုတ် conntrack CLI) မှ ZIVPN ports များ (5667 or 6000-19999) သို့
+        ဝင်လာသော UDP connections များကို port -> {src_ip: flow count} အဖြစ် တစ်ကြိမ်တည်း bucket လုပ်သည်။
         """
         try:
-            # conntrack -L -p udp: UDP connections list ကို ပြသည်။
-            # grep -E 'dport=(...)' : ZIVPN ports များ (5667 or 6000-19999) ကို စစ်သည်။
-            result = subprocess.run(
-                "conntrack -L -p udp 2>/dev/null | grep -E 'dport=(5667|[6-9][0-9]{3}|[1-9][0-9]{4})'",
-                shell=True, capture_output=True, text=True
-            )
-            
-            connections = {}
-            for line in result.stdout.split('\n'):
-                if 'src=' in line and 'dport=' in line:
-                    try:
-                        parts = line.split()
-                        src_ip = None
-                        dport = None
-                        
-                        for part in parts:
-                            if part.startswith('src='):
-                                src_ip = part.split('=')[1]
-                            elif part.startswith('dport='):
-                                dport = part.split('=')[1]
-                        
-                        if src_ip and dport:
-                            key = f"{src_ip}:{dport}"
-                            if key not in connections:
-                                connections[key] = line 
-                    except:
-                        continue
-            return connections
+            return self.dump_flows()
         except Exception as e:
             print(f"Error fetching conntrack data: {e}")
             return {}
             
+    def dump_flows(self):
+        with CONNTRACK_DUMP.time():
+            port_ips = group_flows(self.flow_source.flows())
+        CONNTRACK_FLOWS.set(sum(sum(ips.values()) for ips in port_ips.values()))
+        return port_ips
+
     def enforce_connection_limits(self):
         """Unique Source IP အရေအတွက်ကို စစ်ဆေးပြီး Max Connections ကို ထိန်းချုပ်သည်။"""
+        with ENFORCE_TICK.time("poll"):
+            self._enforce_connection_limits()
+
+    def _enforce_connection_limits(self):
+        try:
+            port_limits = self.load_port_limits()
+            port_ips = self.get_active_connections()
+
+            # User တစ်ယောက်ချင်းစီအတွက် port bucket ကို O(1) ဖြင့် ရှာသည်။
+            victims = []
+            for port, (username, max_connections) in port_limits.items():
+                ips = port_ips.get(port)
+                if ips and len(ips) > max_connections:
+                    victims.extend(self.excess_devices(username, port, ips, max_connections))
+
+            # Tick တစ်ခုလုံး၏ excess devices များကို တစ်ကြိမ်တည်း ဖြတ်ချသည်။
+            self.drop_devices(victims)
+
+        except Exception as e:
+            print(f"An error occurred during connection limit enforcement: {e}")
+
+    def excess_devices(self, username, port, ips, max_connections):
+        """ပထမဆုံး ဝင်လာသော 'max_connections' devices ကိုသာ ထားပြီး ကျန် devices များကို (ip, port) အဖြစ် ပြန်ပေးသည်။"""
+        excess = list(ips)[max_connections:]
+        print(f"Limit Exceeded for {username} (Port {port}). IPs found: {len(ips)}, Max: {max_connections}")
+        for ip in excess:
+            print(f"  Dropping excess device IP: {ip} for user {username}")
+        self.note_limit_exceeded(username, len(ips), max_connections)
+        return [(ip, port) for ip in excess]
+
+    def note_limit_exceeded(self, username, devices, max_connections):
+        """Reconnect လုပ်နေသော devices ကြောင့် notifications မလျှံစေရန် user တစ်ယောက်လျှင် NOTIFY_COOLDOWN ခြားမှ တစ်ကြိမ်"""
+        now = time.monotonic()
+        with self.lock:
+            last = self.notified.get(username)
+            if last is not None and now - last < NOTIFY_COOLDOWN:
+                return
+            self.notified[username] = now
+            self.pending_notices.append(
+                (username, f"🚫 {username} connected {devices} devices (max {max_connections}); extra devices were dropped"))
+
+    def flush_notices(self):
+        with self.lock:
+            items, self.pending_notices = self.pending_notices, []
+        notifications.notify(self.get_db, notifications.CONN_LIMIT, items)
+
+    def drop_devices(self, victims):
+        """(ip, port) devices အားလုံး၏ connections များကို batch operation တစ်ခုတည်းဖြင့် ဖြတ်ချသည်။"""
+        if not victims:
+            return None
+        start = time.perf_counter()
+        try:
+            if DROP_BLOCK_SECONDS > 0:
+                # Flow ပြန်မဖွင့်နိုင်စေရန် ဖျက်ခြင်းမပြုမီ block လုပ်သည်။
+                block_devices(victims, DROP_BLOCK_SECONDS)
+            deleted, failed = self.flow_source.drop(victims)
+        except Exception as e:
+            print(f"Error dropping connections: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        DROP_SECONDS.observe(elapsed)
+        DEVICES_DROPPED.inc(len(victims))
+        FLOWS_DROPPED.inc(deleted)
+        if failed:
+            DROP_FAILURES.inc(failed)
+        self.last_drop_stats = {
+            'devices': len(victims), 'flows': deleted, 'failed': failed, 'seconds': elapsed
+        }
+        print(f"Dropped {len(victims)} devices ({deleted} flows, {failed} failed) in {elapsed * 1000:.1f} ms")
+        # DB write ကို drop ပြီးမှ လုပ်သဖြင့် enforcement latency ကို မထိခိုက်ပါ။
+        self.flush_notices()
+        return self.last_drop_stats
+
+    def drop_connection(self, ip, port):
+        """Drop a specific device's connections using conntrack"""
+        return self.drop_devices([(ip, port)])
+
+    def load_port_limits(self):
+        """Active users များ၏ port -> (username, concurrent_conn) map ကို DB မှ ရယူသည်။"""
         db = self.get_db()
         try:
-            # Get all active users with their connection limits
             users = db.execute('''
-                SELECT username, concurrent_conn, port 
+                SELECT username, IFNULL(concurrent_conn, 1) AS concurrent_conn, port
                 FROM users 
-                WHERE status = "active" AND (expires IS NULL OR expires >= CURRENT_DATE)
+                WHERE status = "active" AND (expires IS NULL OR expires >= date('now', 'localtime'))
             ''').fetchall()
-            
-            active_connections = self.get_active_connections()
-            
-            for user in users:
-                username = user['username']
-                max_connections = user['concurrent_conn']
-                user_port = str(user['port'] or LISTEN_FALLBACK)
-                
-                # Dictionary to map unique IPs connected to this user's port
-                # Key: Source IP (Device), Value: List of full connection keys (IP:PORT)
-                connected_ips = {} 
-
-                # 1. Group connections by unique Source IP hitting the User's Port
-                for conn_key in active_connections:
-                    if conn_key.endswith(f":{user_port}"):
-                        ip = conn_key.split(':')[0]
-                        if ip not in connected_ips:
-                            connected_ips[ip] = []
-                        connected_ips[ip].append(conn_key)
-                
-                num_unique_ips = len(connected_ips)
-
-                # 2. Enforce the limit based on unique devices (Source IPs)
-                if num_unique_ips > max_connections:
-                    print(f"Limit Exceeded for {username} (Port {user_port}). IPs found: {num_unique_ips}, Max: {max_connections}")
-
-                    # Determine which IPs to drop (Keep the first 'max_connections' found)
-                    ips_to_keep = list(connected_ips.keys())[:max_connections]
-                    
-                    for ip, conn_keys in connected_ips.items():
-                        if ip not in ips_to_keep:
-                            # This IP is an excess device. Drop ALL its connections.
-                            print(f"  Dropping excess device IP: {ip} for user {username}")
-                            for conn_key in conn_keys:
-                                self.drop_connection(conn_key)
-
-        except Exception as e:
-            print(f"An error occurred during connection limit enforcement: {e}")
-            
         finally:
             db.close()
-            
-    def drop_connection(self, connection_key):
-        """Drop a specific connection using conntrack"""
-        try:
-            # connection_key format: "IP:PORT"
-            ip, port = connection_key.split(':')
-            # conntrack -D command ဖြင့် သက်ဆိုင်ရာ source IP နှင့် destination port ကို ဖြတ်ချသည်။
-            subprocess.run(
-                f"conntrack -D -p udp --dport {port} --src {ip}",
-                shell=True, capture_output=True, text=True
-            )
-            print(f"Dropped connection: {connection_key}")
-        except Exception as e:
-            print(f"Error dropping connection {connection_key}: {e}")
-            
+        # Port မရှိသော users များသည် LISTEN_FALLBACK port ကို မျှသုံးသဖြင့် အတင်းကျပ်ဆုံး limit ကို ထားသည်။
+        port_limits = {}
+        for u in users:
+            port = int(u['port'] or LISTEN_FALLBACK)
+            current = port_limits.get(port)
+            if current is None or u['concurrent_conn'] < current[1]:
+                port_limits[port] = (u['username'], u['concurrent_conn'])
+        return port_limits
+
+    def resync(self):
+        """Full dump ဖြင့် in-memory state ကို ပြန်တည်ဆောက်ပြီး drift ကို ပြင်ကာ limit များကို စစ်သည်။"""
+        with ENFORCE_TICK.time("resync"):
+            self._resync()
+
+    def _resync(self):
+        port_ips = self.dump_flows()
+        port_limits = self.load_port_limits()
+        with self.lock:
+            self.port_ips = port_ips
+            self.port_limits = port_limits
+            ports = list(port_ips)
+        victims = []
+        for port in ports:
+            victims.extend(self.enforce_port(port))
+        self.drop_devices(victims)
+
+    def enforce_port(self, port):
+        """Port တစ်ခု၏ devices အရေအတွက် limit ကျော်ပါက အသစ်ဝင်လာသော devices များကို ပြန်ပေးသည်။"""
+        with self.lock:
+            limit = self.port_limits.get(port)
+            ips = self.port_ips.get(port)
+            if not limit or not ips or len(ips) <= limit[1]:
+                return []
+            ips = dict(ips)
+        return self.excess_devices(limit[0], port, ips, limit[1])
+
+    def handle_event(self, event, src_ip, dport):
+        CONNTRACK_EVENTS.inc(1, "new" if event == EVENT_NEW else "destroy")
+        with self.lock:
+            ips = self.port_ips.setdefault(dport, {})
+            if event == EVENT_NEW:
+                is_new_device = src_ip not in ips
+                ips[src_ip] = ips.get(src_ip, 0) + 1
+            else:
+                is_new_device = False
+                count = ips.get(src_ip, 0) - 1
+                if count > 0:
+                    ips[src_ip] = count
+                else:
+                    ips.pop(src_ip, None)
+                    if not ips:
+                        del self.port_ips[dport]
+        # Device အသစ် ပေါ်လာသည့်အခိုက်မှာပင် limit ကို စစ်သည်။
+        if is_new_device:
+            self.drop_devices(self.enforce_port(dport))
+
+    def start_event_monitoring(self):
+        """conntrack NEW/DESTROY events ဖြင့် limit များကို ချက်ချင်း ထိန်းချုပ်ပြီး အချိန်အနည်းငယ်ခြား resync လုပ်သည်။"""
+        def event_loop():
+            while True:
+                try:
+                    for event, src_ip, dport in get_event_source().events():
+                        if event == EVENT_OVERFLOW:
+                            CONNTRACK_EVENTS.inc(1, "overflow")
+                            print("Conntrack event buffer overflowed. Scheduling resync...")
+                            self.resync_event.set()
+                        else:
+                            self.handle_event(event, src_ip, dport)
+                except Exception as e:
+                    print(f"Event stream failed: {e}")
+                self.resync_event.set()
+                time.sleep(5)
+
+        def resync_loop():
+            last_resync = 0
+            while True:
+                triggered = self.resync_event.wait(USERS_REFRESH_INTERVAL)
+                self.resync_event.clear()
+                try:
+                    if triggered or time.time() - last_resync >= RESYNC_INTERVAL:
+                        self.resync()
+                        last_resync = time.time()
+                    else:
+                        # Users အသစ် / limit ပြောင်းလဲမှုများကိုသာ ပြန်ဖတ်သည်။
+                        port_limits = self.load_port_limits()
+                        with self.lock:
+                            self.port_limits = port_limits
+                except Exception as e:
+                    print(f"Resync failed: {e}")
+
+        self.resync_event.set()
+        threading.Thread(target=resync_loop, daemon=True).start()
+        threading.Thread(target=event_loop, daemon=True).start()
+
     def start_monitoring(self):
         """Start the connection monitoring loop"""
         def monitor_loop():
@@ -139,8 +289,23 @@ class ConnectionManager:
 connection_manager = ConnectionManager()
 
 if __name__ == "__main__":
-    print("Starting ZIVPN Connection Manager...")
-    connection_manager.start_monitoring()
+    print(f"Starting ZIVPN Connection Manager ({MONITOR_MODE} mode)...")
+    migrations.run(DATABASE_PATH)
+    if MONITOR_MODE == "events":
+        connection_manager.start_event_monitoring()
+    else:
+        connection_manager.start_monitoring()
+    if BANDWIDTH_ACCOUNTING:
+        BandwidthCollector(flow_source=connection_manager.flow_source, db_path=DATABASE_PATH).start()
+    if TRAFFIC_SHAPING:
+        shaping = ShapingController(db_path=DATABASE_PATH)
+        metrics.register_config_syncer(shaping.config_syncer)
+        shaping.start()
+    RollupWorker(db_path=DATABASE_PATH).start()
+    if METRICS_PORT:
+        metrics.register_db_metrics()
+        metrics.register_user_counts(connection_manager.get_db)
+        metrics.serve(METRICS_PORT, METRICS_LISTEN)
     try:
         while True:
             time.sleep(60)
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+ZIVPN conntrack helpers
+UDP conntrack table ကို တစ်ကြိမ်တည်း dump လုပ်ပြီး dport -> {src IPs} map အဖြစ် index လုပ်သည်။
+Web panel (Online/Offline) နှင့် Connection Manager တို့ မျှဝေသုံးသည်။
+"""
+
+import errno
+import os
+import subprocess
+import threading
+import time
+
+import ctnetlink
+
+# Configuration
+LISTEN_FALLBACK = "5667"
+PORT_RANGE = (6000, 19999)
+SNAPSHOT_TTL = float(os.environ.get("CONNTRACK_SNAPSHOT_TTL", "5"))
+DUMP_TIMEOUT = 5
+BLOCK_SET = "zivpn_block"
+CONNTRACK_BACKEND = os.environ.get("CONNTRACK_BACKEND", "auto")
+EVENT_NEW = "new"
+EVENT_DESTROY = "destroy"
+EVENT_OVERFLOW = "overflow"
+# udp.sh က ZIVPN ports များကို CONNMARK ဖြင့် mark လုပ်ထားသည် (eg: 0x5a000000/0xff000000)
+CONNTRACK_MARK = os.environ.get("CONNTRACK_MARK", "")
+
+def is_zivpn_port(port):
+    """Default listen port (5667) သို့မဟုတ် 6000-19999 DNAT range ထဲရှိမရှိ စစ်သည်။"""
+    return port == int(LISTEN_FALLBACK) or PORT_RANGE[0] <= port <= PORT_RANGE[1]
+
+def parse_flow_line(line):
+    """
+    `conntrack -L` text line တစ်ကြောင်းမှ original direction ၏ (src_ip, dport) ကို ရယူသည်။
+    Reply direction (line ၏ ဒုတိယ src=/dport=) ကို ထည့်မစဉ်းစားပါ။
+    """
+    src_ip = None
+    dport = None
+    for part in line.split():
+        if src_ip is None and part.startswith('src='):
+            src_ip = part[4:]
+        elif dport is None and part.startswith('dport='):
+            dport = part[6:]
+        if src_ip is not None and dport is not None:
+            break
+    if src_ip is None or dport is None or not dport.isdigit():
+        return None
+    return src_ip, int(dport)
+
+def parse_flows(lines):
+    """Text lines မှ ZIVPN ports သို့ ဝင်လာသော (src_ip, dport) tuples များကို yield လုပ်သည်။"""
+    for line in lines:
+        flow = parse_flow_line(line)
+        if flow and is_zivpn_port(flow[1]):
+            yield flow
+
+def parse_counter_line(line):
+    """
+    `conntrack -L -o id` / `conntrack -E -o id` line မှ (ct_id, dport, bytes) ကို ရယူသည်။
+    bytes သည် original + reply direction နှစ်ခုပေါင်း ဖြစ်သည် (nf_conntrack_acct=1 လိုအပ်သည်)။
+    """
+    ct_id = None
+    dport = None
+    total = 0
+    for part in line.split():
+        if dport is None and part.startswith('dport='):
+            dport = part[6:]
+        elif part.startswith('bytes=') and part[6:].isdigit():
+            total += int(part[6:])
+        elif part.startswith('id=') and part[3:].isdigit():
+            ct_id = int(part[3:])
+    if ct_id is None or dport is None or not dport.isdigit():
+        return None
+    return ct_id, int(dport), total
+
+def parse_counters(lines):
+    """Text lines မှ ZIVPN ports များ၏ (ct_id, dport, bytes) counters များကို yield လုပ်သည်။"""
+    for line in lines:
+        counter = parse_counter_line(line)
+        if counter and is_zivpn_port(counter[1]):
+            yield counter
+
+class CliFlowSource:
+    """
+    `conntrack -L -p udp` text output ကို stream အဖြစ်ဖတ်သည် (shell/grep မသုံးပါ)။
+    Netlink မရနိုင်သည့် host များအတွက် fallback ဖြစ်သည်။
+    """
+    name = "cli"
+
+    def __init__(self, mark=None, lines=None):
+        self.mark = mark
+        self.lines = lines
+
+    @classmethod
+    def from_file(cls, path):
+        """Record လုပ်ထားသော `conntrack -L` output file ကို replay လုပ်သည်။"""
+        with open(path, "r") as f:
+            return cls(lines=f.read().splitlines())
+
+    def _lines(self, extra=()):
+        if self.lines is not None:
+            yield from self.lines
+            return
+        cmd = ["conntrack", "-L", "-p", "udp", *extra]
+        if self.mark is not None:
+            cmd += ["--mark", f"{self.mark[0]:#x}/{self.mark[1]:#x}"]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            yield from proc.stdout
+        finally:
+            proc.stdout.close()
+            try:
+                proc.wait(timeout=DUMP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def flows(self):
+        yield from parse_flows(self._lines())
+
+    def counters(self):
+        """Flow တစ်ခုချင်းစီ၏ (ct_id, dport, bytes) accounting counters"""
+        yield from parse_counters(self._lines(("-o", "id")))
+
+    # `conntrack -R` (batch file) ကို ထောက်ပံ့ခြင်း ရှိ/မရှိ - process တစ်ခုလျှင် တစ်ကြိမ်သာ စစ်သည်။
+    batch_supported = None
+
+    @classmethod
+    def supports_batch(cls):
+        if cls.batch_supported is None:
+            try:
+                # Empty batch ကို ဖတ်ခိုင်းသည်။ -R မသိသော ဗားရှင်းဟောင်းများသည် usage error ဖြင့် non-zero ထွက်သည်။
+                probe = subprocess.run(["conntrack", "-R", "-"], input="", capture_output=True, text=True,
+                                       timeout=DUMP_TIMEOUT)
+                cls.batch_supported = probe.returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                cls.batch_supported = False
+            if not cls.batch_supported:
+                print("conntrack -R is not supported; deleting devices one at a time")
+        return cls.batch_supported
+
+    def drop(self, victims):
+        """
+        (src_ip, dport) devices အားလုံးကို `conntrack -R -` invocation တစ်ခုတည်းဖြင့် ဖျက်ပြီး (deleted, failed) ကို ပြန်ပေးသည်။
+        -R မရှိသော conntrack-tools ဗားရှင်းဟောင်းများတွင်သာ device တစ်ခုချင်းစီ ဖျက်သည်။
+        """
+        victims = list(victims)
+        if self.supports_batch():
+            lines = "".join(f"-D -p udp --orig-src {ip} --orig-port-dst {port}\n" for ip, port in victims)
+            result = subprocess.run(["conntrack", "-R", "-"], input=lines, capture_output=True, text=True,
+                                    timeout=DUMP_TIMEOUT)
+            if result.returncode == 0:
+                return len(victims), 0
+            # Batch ထဲ မည်သည့် line တွင် ရပ်သွားသည်ကို မသိနိုင်သဖြင့် batch တစ်ခုလုံးကို failed ဟု report လုပ်သည်။
+            # နောက် tick / resync တွင် ကျန်နေသော devices များကို ပြန်ဖြတ်မည်။
+            print(f"conntrack -R failed ({result.returncode}): {result.stderr.strip()}")
+            return 0, len(victims)
+        failed = 0
+        for ip, port in victims:
+            try:
+                result = subprocess.run(["conntrack", "-D", "-p", "udp", "--orig-src", ip,
+                                         "--orig-port-dst", str(port)],
+                                        capture_output=True, text=True, timeout=DUMP_TIMEOUT)
+                if result.returncode != 0:
+                    failed += 1
+            except Exception:
+                failed += 1
+        return len(victims) - failed, failed
+
+class NetlinkFlowSource:
+    """
+    NFNETLINK conntrack dump ကို kernel မှ တိုက်ရိုက်ဖတ်သည်။
+    CONNTRACK_MARK သတ်မှတ်ထားပါက ZIVPN ports များကို kernel ထဲတွင်ပင် filter လုပ်သည်။
+    """
+    name = "netlink"
+
+    def __init__(self, mark=None, data=None):
+        self.mark = mark
+        self.data = data
+
+    @classmethod
+    def from_file(cls, path):
+        """Record လုပ်ထားသော raw netlink dump file ကို replay လုပ်သည်။"""
+        with open(path, "rb") as f:
+            return cls(data=f.read())
+
+    _available = None
+
+    @classmethod
+    def available(cls):
+        """Netlink dump လုပ်ခွင့် (CAP_NET_ADMIN) ရှိမရှိကို တစ်ကြိမ်သာ probe လုပ်သည်။"""
+        if cls._available is None:
+            try:
+                with ctnetlink.CtNetlink() as nl:
+                    # မည်သည့် flow နှင့်မျှ မကိုက်သော mark ဖြင့် dump ကို စမ်းသည်။
+                    for _ in nl.dump(mark=(0xffffffff, 0xffffffff)):
+                        pass
+                cls._available = True
+            except OSError:
+                cls._available = False
+        return cls._available
+
+    def _records(self, record=None):
+        if self.data is not None:
+            records = ctnetlink.parse_dump(self.data)
+        else:
+            records = self._stream(ctnetlink.CtNetlink(), record)
+        for flow in records:
+            if flow.proto == ctnetlink.IPPROTO_UDP and is_zivpn_port(flow.dport):
+                yield flow
+
+    def flows(self, record=None):
+        for flow in self._records(record):
+            yield flow.src, flow.dport
+
+    def counters(self):
+        """Flow တစ်ခုချင်းစီ၏ (ct_id, dport, bytes) accounting counters"""
+        for flow in self._records():
+            yield flow.ct_id, flow.dport, flow.orig_bytes + flow.reply_bytes
+
+    def _stream(self, nl, record):
+        with nl:
+            yield from nl.dump(mark=self.mark, record=record)
+
+    def drop(self, victims):
+        """
+        (src_ip, dport) devices များ၏ flows အားလုံးကို dump တစ်ကြိမ်ဖြင့် ရှာပြီး
+        netlink delete messages များကို batch အလိုက် socket တစ်ခုတည်းမှ ပို့သည်။
+        """
+        victims = set(victims)
+        with ctnetlink.CtNetlink() as nl:
+            targets = [flow for flow in nl.dump(mark=self.mark)
+                       if flow.proto == ctnetlink.IPPROTO_UDP and (flow.src, flow.dport) in victims]
+            return nl.delete(targets)
+
+def block_devices(victims, seconds):
+    """
+    Drop လုပ်လိုက်သော devices များ flow အသစ်ချက်ချင်း ပြန်မဖွင့်နိုင်စေရန် ipset (timeout) ထဲသို့
+    `ipset restore` invocation တစ်ခုတည်းဖြင့် ထည့်သည်။ Set နှင့် raw PREROUTING rule ကို udp.sh က ဖန်တီးသည်။
+    """
+    lines = "".join(f"add {BLOCK_SET} {ip},udp:{port} timeout {seconds}\n"
+                    for ip, port in victims if ":" not in ip)
+    if lines:
+        subprocess.run(["ipset", "restore", "-exist"], input=lines, capture_output=True, text=True,
+                       timeout=DUMP_TIMEOUT)
+
+def get_flow_source(backend=None):
+    """
+    CONNTRACK_BACKEND (auto | netlink | cli) အလိုက် flow source ကို ရွေးသည်။
+    auto ဖြစ်ပါက netlink socket ဖွင့်နိုင်လျှင် netlink၊ မဖွင့်နိုင်လျှင် CLI ကို သုံးသည်။
+    """
+    backend = backend or CONNTRACK_BACKEND
+    mark = ctnetlink.parse_mark(CONNTRACK_MARK)
+    if backend == "netlink" or (backend == "auto" and NetlinkFlowSource.available()):
+        return NetlinkFlowSource(mark=mark)
+    return CliFlowSource(mark=mark)
+
+class NetlinkEventSource:
+    """ctnetlink NEW/DESTROY multicast events များကို (event, src_ip, dport) အဖြစ် stream လုပ်သည်။"""
+    name = "netlink"
+
+    def events(self):
+        groups = ctnetlink.NF_NETLINK_CONNTRACK_NEW | ctnetlink.NF_NETLINK_CONNTRACK_DESTROY
+        with ctnetlink.CtNetlink(groups=groups) as nl:
+            while True:
+                try:
+                    for msg_type, flow in nl.events():
+                        if flow.proto != ctnetlink.IPPROTO_UDP or not is_zivpn_port(flow.dport):
+                            continue
+                        event = EVENT_DESTROY if msg_type == ctnetlink.IPCTNL_MSG_CT_DELETE else EVENT_NEW
+                        yield event, flow.src, flow.dport
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    # Kernel က events များကို drop လုပ်လိုက်သည်။ Caller က full resync လုပ်ရမည်။
+                    yield EVENT_OVERFLOW, None, None
+
+    def destroyed(self):
+        """
+        DESTROY events မှ flow ၏ နောက်ဆုံး (ct_id, dport, bytes) counters များ။
+        Events ပျောက်သွားပါက (None, None, None) ကို yield လုပ်သည်။
+        """
+        with ctnetlink.CtNetlink(groups=ctnetlink.NF_NETLINK_CONNTRACK_DESTROY) as nl:
+            while True:
+                try:
+                    for _msg_type, flow in nl.events():
+                        if flow.proto == ctnetlink.IPPROTO_UDP and is_zivpn_port(flow.dport):
+                            yield flow.ct_id, flow.dport, flow.orig_bytes + flow.reply_bytes
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    yield None, None, None
+
+class CliEventSource:
+    """`conntrack -E -p udp -e NEW,DESTROY` text stream ကို ဖတ်သည်။"""
+    name = "cli"
+
+    def __init__(self, lines=None):
+        self.lines = lines
+
+    def events(self):
+        if self.lines is not None:
+            yield from parse_events(self.lines)
+            return
+        proc = subprocess.Popen(
+            ["conntrack", "-E", "-p", "udp", "-e", "NEW,DESTROY"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+        )
+        try:
+            yield from parse_events(proc.stdout)
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def destroyed(self):
+        """`conntrack -E -e DESTROY -o id` မှ flow ၏ နောက်ဆုံး (ct_id, dport, bytes) counters များ"""
+        if self.lines is not None:
+            yield from parse_counters(line for line in self.lines if line.lstrip().startswith("[DESTROY]"))
+            return
+        proc = subprocess.Popen(
+            ["conntrack", "-E", "-p", "udp", "-e", "DESTROY", "-o", "id"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+        )
+        try:
+            yield from parse_counters(proc.stdout)
+        finally:
+            proc.kill()
+            proc.wait()
+
+def parse_events(lines):
+    """'[NEW] udp 17 30 src=... dport=...' lines မှ (event, src_ip, dport) ကို yield လုပ်သည်။"""
+    for line in lines:
+        line = line.strip()
+        if line.startswith("[NEW]"):
+            event = EVENT_NEW
+        elif line.startswith("[DESTROY]"):
+            event = EVENT_DESTROY
+        else:
+            continue
+        flow = parse_flow_line(line)
+        if flow and is_zivpn_port(flow[1]):
+            yield event, flow[0], flow[1]
+
+def get_event_source(backend=None):
+    backend = backend or CONNTRACK_BACKEND
+    if backend == "netlink" or (backend == "auto" and NetlinkFlowSource.available()):
+        return NetlinkEventSource()
+    return CliEventSource()
+
+def dump_udp_flows():
+    """Flow source မှ ZIVPN ports များသို့ ဝင်လာသော (src_ip, dport) tuples များကို stream အဖြစ်ပေးသည်။"""
+    return get_flow_source().flows()
+
+class ConntrackSnapshot:
+    """Point-in-time UDP flow table, indexed as dport -> {src IPs}."""
+
+    def __init__(self, flows, taken_at=None):
+        self.taken_at = taken_at if taken_at is not None else time.time()
+        self.flow_count = 0
+        self.ports = {}
+        for src_ip, dport in flows:
+            self.ports.setdefault(dport, set()).add(src_ip)
+            self.flow_count += 1
+
+    @property
+    def age(self):
+        """Snapshot ယူခဲ့သည်မှ ကြာချိန် (seconds)"""
+        return max(0.0, time.time() - self.taken_at)
+
+    def ips_for_port(self, port):
+        try:
+            return self.ports.get(int(port), set())
+        except (TypeError, ValueError):
+            return set()
+
+    def is_online(self, port):
+        return bool(self.ips_for_port(port))
+
+class SnapshotCache:
+    """
+    TTL window အတွင်း snapshot တစ်ခုတည်းကို မျှဝေသုံးသည်။
+    Request များ တပြိုင်နက် ဝင်လာလျှင်လည်း dump တစ်ကြိမ်သာ run မည်။
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, loader=dump_udp_flows):
+        self.ttl = ttl
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.snapshot = None
+        # /metrics အတွက်: dump အရေအတွက်နှင့် dump + index ကြာချိန် စုစုပေါင်း
+        self.dumps = 0
+        self.dump_seconds = 0.0
+
+    def get(self):
+        with self.lock:
+            if self.snapshot is None or self.snapshot.age >= self.ttl:
+                try:
+                    start = time.perf_counter()
+                    self.snapshot = ConntrackSnapshot(self.loader())
+                    self.dumps += 1
+                    self.dump_seconds += time.perf_counter() - start
+                except Exception as e:
+                    print(f"Error fetching conntrack data: {e}")
+                    # Dump မရပါက ယခင် snapshot ကိုသာ ဆက်သုံးသည်။ မရှိပါက Offline အဖြစ်ပြမည်။
+                    if self.snapshot is None:
+                        return ConntrackSnapshot([])
+            return self.snapshot
+
+    def invalidate(self):
+        with self.lock:
+            self.snapshot = None
+
+if __name__ == "__main__":
+    # Fixture record / replay: python3 conntrack.py [netlink|cli] [--record FILE | --replay FILE]
+    import sys
+    args = sys.argv[1:]
+    backend = args.pop(0) if args and not args[0].startswith("--") else None
+    if "--replay" in args:
+        path = args[args.index("--replay") + 1]
+        source = NetlinkFlowSource.from_file(path) if backend == "netlink" else CliFlowSource.from_file(path)
+        flows = source.flows()
+    elif "--record" in args:
+        path = args[args.index("--record") + 1]
+        if backend == "cli":
+            with open(path, "w") as f:
+                f.write(subprocess.run(["conntrack", "-L", "-p", "udp"], capture_output=True, text=True).stdout)
+            flows = CliFlowSource.from_file(path).flows()
+        else:
+            with open(path, "wb") as f:
+                flows = list(NetlinkFlowSource(mark=ctnetlink.parse_mark(CONNTRACK_MARK)).flows(record=f))
+    else:
+        flows = get_flow_source(backend).flows()
+    snapshot = ConntrackSnapshot(flows)
+    print(f"{snapshot.flow_count} flows on {len(snapshot.ports)} ports")
+    for port in sorted(snapshot.ports):
+        print(f"  {port}: {', '.join(sorted(snapshot.ports[port]))}")
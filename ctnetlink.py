@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+ZIVPN ctnetlink reader
+NFNETLINK conntrack dump များကို `conntrack` CLI မလိုဘဲ kernel မှ တိုက်ရိုက်ဖတ်သည်။
+Text parsing မရှိဘဲ attribute များကို struct ဖြင့် decode လုပ်သည်။
+"""
+
+import socket
+import struct
+from collections import namedtuple
+
+NETLINK_NETFILTER = 12
+NFNL_SUBSYS_CTNETLINK = 1
+NFNETLINK_V0 = 0
+
+IPCTNL_MSG_CT_NEW = 0
+IPCTNL_MSG_CT_GET = 1
+IPCTNL_MSG_CT_DELETE = 2
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+
+NLA_F_NESTED = 0x8000
+NLA_TYPE_MASK = 0x3fff
+
+CTA_TUPLE_ORIG = 1
+CTA_MARK = 8
+CTA_COUNTERS_ORIG = 9
+CTA_COUNTERS_REPLY = 10
+CTA_ID = 12
+CTA_MARK_MASK = 21
+
+CTA_TUPLE_IP = 1
+CTA_TUPLE_PROTO = 2
+CTA_IP_V4_SRC = 1
+CTA_IP_V4_DST = 2
+CTA_IP_V6_SRC = 3
+CTA_IP_V6_DST = 4
+CTA_PROTO_NUM = 1
+CTA_PROTO_SRC_PORT = 2
+CTA_PROTO_DST_PORT = 3
+CTA_COUNTERS_PACKETS = 1
+CTA_COUNTERS_BYTES = 2
+
+# Multicast groups (bind() bitmask) - NFNLGRP_CONNTRACK_NEW / NFNLGRP_CONNTRACK_DESTROY
+NF_NETLINK_CONNTRACK_NEW = 0x1
+NF_NETLINK_CONNTRACK_DESTROY = 0x4
+
+IPPROTO_UDP = 17
+RECV_BUFSIZE = 1 << 20
+DELETE_BATCH = 256
+
+NLMSG_HDR = struct.Struct("=IHHII")
+NFGEN_HDR = struct.Struct("=BBH")
+NLA_HDR = struct.Struct("=HH")
+
+# Original direction tuple + accounting counters (nf_conntrack_acct=0 ဖြစ်ပါက bytes = 0)
+Flow = namedtuple("Flow", "src dst sport dport proto ct_id orig_bytes reply_bytes")
+
+def _align(n):
+    return (n + 3) & ~3
+
+def iter_attrs(buf, start, end):
+    """(type, value_start, value_end) ကို yield လုပ်သည်။ Parent ၏ နယ်ကျော်နေသော (truncated) attribute တွင် ရပ်သည်။"""
+    end = min(end, len(buf))
+    while start + NLA_HDR.size <= end:
+        nla_len, nla_type = NLA_HDR.unpack_from(buf, start)
+        if nla_len < NLA_HDR.size or start + nla_len > end:
+            break
+        yield nla_type & NLA_TYPE_MASK, start + NLA_HDR.size, start + nla_len
+        start += _align(nla_len)
+
+def _parse_tuple(buf, start, end):
+    src = dst = None
+    proto = sport = dport = 0
+    for t, s, e in iter_attrs(buf, start, end):
+        if t == CTA_TUPLE_IP:
+            for it, vs, ve in iter_attrs(buf, s, e):
+                if ve - vs not in (4, 16):
+                    continue
+                if it in (CTA_IP_V4_SRC, CTA_IP_V6_SRC):
+                    src = socket.inet_ntop(socket.AF_INET if ve - vs == 4 else socket.AF_INET6, buf[vs:ve])
+                elif it in (CTA_IP_V4_DST, CTA_IP_V6_DST):
+                    dst = socket.inet_ntop(socket.AF_INET if ve - vs == 4 else socket.AF_INET6, buf[vs:ve])
+        elif t == CTA_TUPLE_PROTO:
+            for pt, vs, ve in iter_attrs(buf, s, e):
+                if pt == CTA_PROTO_NUM and ve > vs:
+                    proto = buf[vs]
+                elif ve - vs < 2:
+                    continue
+                elif pt == CTA_PROTO_SRC_PORT:
+                    sport = struct.unpack_from("!H", buf, vs)[0]
+                elif pt == CTA_PROTO_DST_PORT:
+                    dport = struct.unpack_from("!H", buf, vs)[0]
+    return src, dst, sport, dport, proto
+
+def _parse_bytes(buf, start, end):
+    for t, s, e in iter_attrs(buf, start, end):
+        if t == CTA_COUNTERS_BYTES and e - s >= 8:
+            return struct.unpack_from("!Q", buf, s)[0]
+    return 0
+
+def parse_ct_message(buf, start, end):
+    """ctnetlink message payload (nfgenmsg ပြီးနောက်) မှ Flow တစ်ခုကို decode လုပ်သည်။"""
+    tup = None
+    ct_id = orig_bytes = reply_bytes = 0
+    for t, s, e in iter_attrs(buf, start, end):
+        if t == CTA_TUPLE_ORIG:
+            tup = _parse_tuple(buf, s, e)
+        elif t == CTA_ID and e - s >= 4:
+            ct_id = struct.unpack_from("!I", buf, s)[0]
+        elif t == CTA_COUNTERS_ORIG:
+            orig_bytes = _parse_bytes(buf, s, e)
+        elif t == CTA_COUNTERS_REPLY:
+            reply_bytes = _parse_bytes(buf, s, e)
+    if tup is None or tup[0] is None:
+        return None
+    src, dst, sport, dport, proto = tup
+    return Flow(src, dst, sport, dport, proto, ct_id, orig_bytes, reply_bytes)
+
+def iter_messages(buf):
+    """
+    Netlink buffer ထဲရှိ ctnetlink messages များကို (msg_type, flags, Flow) အဖြစ် yield လုပ်သည်။
+    NLMSG_DONE တွေ့လျှင် ရပ်ပြီး NLMSG_ERROR (errno != 0) ဖြစ်လျှင် OSError ပစ်သည်။
+    Buffer အဆုံးတွင် ပြတ်နေသော (truncated) message ကို ကျော်သည်။
+    """
+    off = 0
+    size = len(buf)
+    while off + NLMSG_HDR.size <= size:
+        length, msg_type, flags, _seq, _pid = NLMSG_HDR.unpack_from(buf, off)
+        end = off + length
+        if length < NLMSG_HDR.size or end > size:
+            break
+        if msg_type == NLMSG_DONE:
+            yield NLMSG_DONE, flags, None
+            return
+        if msg_type == NLMSG_ERROR:
+            if length < NLMSG_HDR.size + 4:
+                break
+            errno = -struct.unpack_from("=i", buf, off + NLMSG_HDR.size)[0]
+            if errno:
+                raise OSError(errno, f"ctnetlink error {errno}")
+            yield NLMSG_ERROR, flags, None
+        elif (msg_type >> 8) == NFNL_SUBSYS_CTNETLINK:
+            flow = parse_ct_message(buf, off + NLMSG_HDR.size + NFGEN_HDR.size, end)
+            if flow is not None:
+                yield msg_type & 0xff, flags, flow
+        off += _align(length)
+
+def parse_dump(data):
+    """Record လုပ်ထားသော dump bytes (recv buffers ဆက်တိုက်) မှ Flow များကို yield လုပ်သည်။"""
+    for _msg_type, _flags, flow in iter_messages(data):
+        if flow is not None:
+            yield flow
+
+def _attr(nla_type, payload):
+    hdr = NLA_HDR.pack(NLA_HDR.size + len(payload), nla_type)
+    return hdr + payload + b"\0" * (_align(len(payload)) - len(payload))
+
+def _nested(nla_type, *children):
+    return _attr(nla_type | NLA_F_NESTED, b"".join(children))
+
+def build_message(msg_type, flags, seq, family=socket.AF_INET, attrs=b""):
+    body = NFGEN_HDR.pack(family, NFNETLINK_V0, 0) + attrs
+    return NLMSG_HDR.pack(NLMSG_HDR.size + len(body), (NFNL_SUBSYS_CTNETLINK << 8) | msg_type,
+                          flags, seq, 0) + body
+
+def _ip_attr(v4_type, v6_type, addr):
+    if ":" in addr:
+        return _attr(v6_type, socket.inet_pton(socket.AF_INET6, addr))
+    return _attr(v4_type, socket.inet_aton(addr))
+
+def build_orig_tuple(flow):
+    """Flow ၏ original direction ကို CTA_TUPLE_ORIG nested attribute အဖြစ် encode လုပ်သည်။"""
+    return _nested(CTA_TUPLE_ORIG,
+                   _nested(CTA_TUPLE_IP,
+                           _ip_attr(CTA_IP_V4_SRC, CTA_IP_V6_SRC, flow.src),
+                           _ip_attr(CTA_IP_V4_DST, CTA_IP_V6_DST, flow.dst)),
+                   _nested(CTA_TUPLE_PROTO,
+                           _attr(CTA_PROTO_NUM, bytes([flow.proto])),
+                           _attr(CTA_PROTO_SRC_PORT, struct.pack("!H", flow.sport)),
+                           _attr(CTA_PROTO_DST_PORT, struct.pack("!H", flow.dport))))
+
+def parse_mark(spec):
+    """'0x5a000000/0xff000000' ပုံစံ mark/mask ကို (mark, mask) အဖြစ် ပြောင်းသည်။ Empty ဖြစ်ပါက None"""
+    if not spec:
+        return None
+    mark, _, mask = spec.partition("/")
+    return int(mark, 0), int(mask or "0xffffffff", 0)
+
+class CtNetlink:
+    """NETLINK_NETFILTER socket (CAP_NET_ADMIN လိုအပ်သည်)"""
+
+    def __init__(self, groups=0):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_NETFILTER)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFSIZE)
+        self.sock.bind((0, groups))
+        self.seq = 0
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def dump(self, family=socket.AF_INET, mark=None, record=None):
+        """
+        Conntrack table ကို dump လုပ်ပြီး Flow များကို stream အဖြစ် yield လုပ်သည်။
+        mark=(value, mask) ပေးထားပါက kernel ထဲတွင်ပင် filter လုပ်သည် (CTA_MARK/CTA_MARK_MASK)။
+        record ပေးထားပါက raw recv buffers များကို file ထဲသို့ ရေးသည် (replay fixture အတွက်)။
+        """
+        attrs = b""
+        if mark is not None:
+            attrs = _attr(CTA_MARK, struct.pack("!I", mark[0])) + _attr(CTA_MARK_MASK, struct.pack("!I", mark[1]))
+        self.sock.send(build_message(IPCTNL_MSG_CT_GET, NLM_F_REQUEST | NLM_F_DUMP, self.next_seq(), family, attrs))
+        while True:
+            data = self.sock.recv(RECV_BUFSIZE)
+            if record is not None:
+                record.write(data)
+            for msg_type, _flags, flow in iter_messages(data):
+                if msg_type == NLMSG_DONE:
+                    return
+                if flow is not None:
+                    yield flow
+
+    def delete(self, flows):
+        """
+        Flows များကို IPCTNL_MSG_CT_DELETE messages အဖြစ် DELETE_BATCH ခုစီ datagram တစ်ခုတည်းဖြင့် ပို့သည်။
+        (deleted, failed) ကို ပြန်ပေးသည်။ ENOENT (ဖျက်ပြီးသား flow) ကို deleted အဖြစ် ယူဆသည်။
+        """
+        deleted = failed = 0
+        flows = list(flows)
+        for i in range(0, len(flows), DELETE_BATCH):
+            chunk = flows[i:i + DELETE_BATCH]
+            seqs = set()
+            parts = []
+            for flow in chunk:
+                seq = self.next_seq()
+                seqs.add(seq)
+                family = socket.AF_INET6 if ":" in flow.src else socket.AF_INET
+                parts.append(build_message(IPCTNL_MSG_CT_DELETE, NLM_F_REQUEST | NLM_F_ACK, seq,
+                                           family, build_orig_tuple(flow)))
+            self.sock.send(b"".join(parts))
+            while seqs:
+                data = self.sock.recv(RECV_BUFSIZE)
+                off = 0
+                while off + NLMSG_HDR.size <= len(data):
+                    length, msg_type, _flags, seq, _pid = NLMSG_HDR.unpack_from(data, off)
+                    if length < NLMSG_HDR.size:
+                        break
+                    if msg_type == NLMSG_ERROR and seq in seqs:
+                        seqs.discard(seq)
+                        err = -struct.unpack_from("=i", data, off + NLMSG_HDR.size)[0]
+                        if err in (0, 2):  # 0 = ACK, 2 = ENOENT
+                            deleted += 1
+                        else:
+                            failed += 1
+                    off += _align(length)
+        return deleted, failed
+
+    def events(self):
+        """
+        bind() လုပ်ထားသော multicast groups မှ (msg_type, Flow) events များကို အဆုံးမရှိ yield လုပ်သည်။
+        Receive buffer ပြည့်သွားပါက OSError(ENOBUFS) ပစ်သည် (events ပျောက်သွားသဖြင့် resync လိုအပ်သည်)။
+        """
+        while True:
+            data = self.sock.recv(RECV_BUFSIZE)
+            for msg_type, _flags, flow in iter_messages(data):
+                if flow is not None:
+                    yield msg_type, flow
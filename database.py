@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+ZIVPN shared data-access layer
+Web panel, API, Telegram bot, cleanup နှင့် Connection Manager တို့ မျှဝေသုံးသော SQLite access layer။
+- Thread တစ်ခုလျှင် connection တစ်ခုကို pool ထားပြီး ပြန်သုံးသည် (sqlite3 statement cache ကြောင့်
+  hot queries များသည် prepare ပြီးသားအဖြစ် ကျန်နေသည်)။
+- WAL journal + busy_timeout ဖြင့် process များစွာ တပြိုင်နက်ရေးသော်လည်း 'database is locked' မဖြစ်စေရန်။
+- Query latency နှင့် lock wait metrics များကို စုဆောင်းသည်။
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import Histogram
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+STATEMENT_CACHE_SIZE = 256
+# Write statement တစ်ခု ဤထက်ကြာပါက lock စောင့်ရသည်ဟု မှတ်သည်။
+LOCK_WAIT_THRESHOLD = 0.05
+SLOW_QUERY_SECONDS = 0.5
+
+_WS = re.compile(r"\s+")
+
+class DbMetrics:
+    """Process တစ်ခုလုံး၏ query latency / lock wait counters (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # /metrics ၏ zivpn_db_query_duration_seconds (statement အလိုက် မခွဲပါ)
+        self.latency = Histogram("zivpn_db_query_duration_seconds", "SQLite statement latency")
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.queries = 0
+            self.query_seconds = 0.0
+            self.max_query_seconds = 0.0
+            self.slow_queries = 0
+            self.lock_waits = 0
+            self.lock_wait_seconds = 0.0
+            self.lock_errors = 0
+            self.statements = {}
+        with self.latency.lock:
+            self.latency.values.clear()
+
+    def record(self, sql, elapsed, write):
+        key = _WS.sub(" ", sql).strip()[:80]
+        with self.lock:
+            self.queries += 1
+            self.query_seconds += elapsed
+            if elapsed > self.max_query_seconds:
+                self.max_query_seconds = elapsed
+            if elapsed >= SLOW_QUERY_SECONDS:
+                self.slow_queries += 1
+            if write and elapsed >= LOCK_WAIT_THRESHOLD:
+                self.lock_waits += 1
+                self.lock_wait_seconds += elapsed
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+        self.latency.observe(elapsed)
+
+    def record_lock_wait(self, elapsed):
+        with self.lock:
+            self.lock_waits += 1
+            self.lock_wait_seconds += elapsed
+
+    def record_lock_error(self):
+        with self.lock:
+            self.lock_errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'queries': self.queries,
+                'query_seconds': round(self.query_seconds, 6),
+                'avg_query_ms': round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0,
+                'max_query_ms': round(self.max_query_seconds * 1000, 3),
+                'slow_queries': self.slow_queries,
+                'lock_waits': self.lock_waits,
+                'lock_wait_seconds': round(self.lock_wait_seconds, 6),
+                'lock_errors': self.lock_errors,
+                'statements': {k: {'count': v[0], 'seconds': round(v[1], 6)} for k, v in self.statements.items()},
+            }
+
+metrics = DbMetrics()
+
+def _is_locked(e):
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def _is_write(sql):
+    head = sql.lstrip()[:7].upper()
+    return not (head.startswith("SELECT") or head.startswith("PRAGMA") or head.startswith("WITH"))
+
+class PooledConnection:
+    """
+    sqlite3.Connection ကို wrap လုပ်ထားသည်။ close() သည် connection ကို မပိတ်ဘဲ pool ထံ ပြန်ပေးသည်
+    (commit မလုပ်ရသေးသော transaction ရှိပါက rollback လုပ်သည်)။ ထို့ကြောင့် `db = get_db() ... db.close()`
+    ပုံစံ code ဟောင်းများ ပြောင်းစရာမလိုပါ။
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        # get_db() ကို nested ခေါ်ထားသော callers အရေအတွက် (အပြင်ဆုံး close() တွင်သာ rollback လုပ်သည်)
+        self.users = 0
+        # Nested transaction() အတွက် SAVEPOINT names
+        self.savepoints = 0
+
+    def _timed(self, fn, sql, args):
+        start = time.perf_counter()
+        try:
+            return fn(sql, *args)
+        except sqlite3.OperationalError as e:
+            if _is_locked(e):
+                metrics.record_lock_error()
+            raise
+        finally:
+            metrics.record(sql, time.perf_counter() - start, _is_write(sql))
+
+    def execute(self, sql, *args):
+        return self._timed(self.conn.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._timed(self.conn.executemany, sql, args)
+
+    def executescript(self, script):
+        return self.conn.executescript(script)
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            self.conn.commit()
+        except sqlite3.OperationalError as e:
+            if _is_locked(e):
+                metrics.record_lock_error()
+            raise
+        elapsed = time.perf_counter() - start
+        if elapsed >= LOCK_WAIT_THRESHOLD:
+            metrics.record_lock_wait(elapsed)
+
+    def rollback(self):
+        self.conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self.conn.in_transaction
+
+    @property
+    def total_changes(self):
+        return self.conn.total_changes
+
+    def close(self):
+        self.users = max(0, self.users - 1)
+        if self.users == 0 and self.conn.in_transaction:
+            self.conn.rollback()
+
+    @contextmanager
+    def transaction(self):
+        """
+        BEGIN IMMEDIATE ... COMMIT (write lock ရရန် စောင့်ချိန်ကို lock wait အဖြစ် တိုင်းသည်)။
+        Caller ၏ transaction ဖွင့်ထားပြီးဖြစ်ပါက SAVEPOINT အဖြစ် nest လုပ်ပြီး commit ကို caller ထံ ချန်ထားသည်။
+        """
+        if self.conn.in_transaction:
+            with self._savepoint():
+                yield self
+            return
+        start = time.perf_counter()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if _is_locked(e):
+                metrics.record_lock_error()
+            raise
+        elapsed = time.perf_counter() - start
+        if elapsed >= LOCK_WAIT_THRESHOLD:
+            metrics.record_lock_wait(elapsed)
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.commit()
+
+    @contextmanager
+    def _savepoint(self):
+        self.savepoints += 1
+        name = f"sp_{self.savepoints}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            self.conn.execute(f"RELEASE {name}")
+        finally:
+            self.savepoints -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+class Database:
+    """DB file တစ်ခုအတွက် per-thread connection pool"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.OperationalError as e:
+            # Read-only filesystem စသည်ဖြင့် WAL မရပါက default journal ဖြင့် ဆက်သုံးသည်။
+            print(f"WARNING: WAL mode ကို ဖွင့်မရပါ ({self.path}): {e}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return PooledConnection(conn)
+
+    def get(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+        conn.users += 1
+        return conn
+
+    def close_thread(self):
+        """လက်ရှိ thread ၏ connection ကို တကယ်ပိတ်သည်။"""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.conn.close()
+            self.local.conn = None
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def get_database(path=None):
+    path = path or DATABASE_PATH
+    db = _databases.get(path)
+    if db is None:
+        with _databases_lock:
+            db = _databases.get(path)
+            if db is None:
+                db = _databases[path] = Database(path)
+    return db
+
+def get_db(path=None):
+    """Thread ၏ pooled connection ကို ရယူသည်။ (db.close() သည် pool ထံ ပြန်ပေးခြင်းသာ ဖြစ်သည်)"""
+    return get_database(path).get()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+ZIVPN expiry scheduler
+users.expires (YYYY-MM-DD) သည် ထိုနေ့ ကုန်ဆုံးသည်အထိ သုံးခွင့်ရှိသည်။ Scheduler သည် active users ၏ အနီးဆုံး expiry ကို
+idx_users_status_expires ဖြင့် `MIN(expires)` lookup တစ်ခုတည်းဖြင့် ရှာပြီး နောက်တစ်နေ့ 00:00 (local time) တိတိတွင် နိုးသည်။
+ထိုအချိန် expire ဖြစ်သော users အားလုံး (cohort) ကို set-based `UPDATE ... WHERE expires < ?` တစ်ခုဖြင့် suspend လုပ်ကာ
+notifications ထည့်ပြီး cohort တစ်ခုလျှင် config sync တစ်ကြိမ်သာ လုပ်သည်။
+Expiry ပြောင်းသော edits (bulk extend စသည်) ပြီးလျှင် reschedule() ကို ခေါ်ပါ။
+Web panel process ထဲတွင် run ပြီး daily cleanup.py သည် suspend_expired() ကို standalone job အဖြစ် သုံးသည်။
+Expiry dates များသည် local calendar dates ဖြစ်၍ ဤ module (date.today()) နှင့် enforcer / config sync ၏ SQL
+(`date('now', 'localtime')`) တို့သည် local clock တစ်ခုတည်းကို သုံးသည်။ (UTC CURRENT_DATE ကို မသုံးပါနှင့်)
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import database
+import notifications
+from config_sync import ConfigSyncer
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+# အခြား processes (API, bot, CSV import) မှ ထည့်သော expiries များကို ဤစက္ကန့်အတွင်း သိရှိသည်။
+EXPIRY_RECHECK_SECONDS = float(os.environ.get("EXPIRY_RECHECK_SECONDS", "60"))
+LOG_NAMES = 20
+
+EXPIRED_SQL = '''
+    SELECT username, expires FROM users
+    WHERE status = 'active' AND expires != '' AND expires < ?
+'''
+
+def suspend_expired(db, today=None):
+    """expires < today ဖြစ်သော active users အားလုံးကို transaction တစ်ခုတည်းဖြင့် suspend လုပ်သည်။ [(username, expires)]"""
+    today = (today or date.today()).isoformat()
+    if not db.execute(EXPIRED_SQL + ' LIMIT 1', (today,)).fetchone():
+        return []
+    with db.transaction():
+        rows = db.execute(EXPIRED_SQL, (today,)).fetchall()
+        db.execute('''
+            UPDATE users SET status = 'suspended', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'active' AND expires != '' AND expires < ?
+        ''', (today,))
+        # Bot dispatcher က "N user(s) expired" message တစ်စောင်အဖြစ် ပေါင်းပို့မည်။
+        notifications.add(db, notifications.EXPIRED, [
+            (r[0], f"⏰ {r[0]} expired on {r[1]} and was suspended") for r in rows])
+    return [(r[0], r[1]) for r in rows]
+
+def next_expiry(db, today=None):
+    """နောက်တစ်ကြိမ် suspend လုပ်ရမည့်အချိန် (datetime) - active user ၏ အနီးဆုံး expiry နေ့ ပြီးဆုံးချိန်။ မရှိပါက None"""
+    today = (today or date.today()).isoformat()
+    row = db.execute('''
+        SELECT MIN(expires) FROM users WHERE status = 'active' AND expires >= ?
+    ''', (today,)).fetchone()
+    if not row or not row[0]:
+        return None
+    try:
+        last_day = date.fromisoformat(row[0])
+    except ValueError:
+        return None
+    return datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+
+class ExpiryScheduler:
+    def __init__(self, get_db=None, config_syncer=None, recheck=EXPIRY_RECHECK_SECONDS):
+        self.get_db = get_db or (lambda: database.get_db(DATABASE_PATH))
+        self.config_syncer = config_syncer or ConfigSyncer(self.get_db)
+        self.recheck = recheck
+        self.wake = threading.Event()
+        self.next_run = None
+        self.last_stats = None
+
+    def reschedule(self):
+        """Expiry များ ပြောင်းသွားသည် - next_run ကို ချက်ချင်း ပြန်တွက်ရန် worker ကို နှိုးသည်။"""
+        self.wake.set()
+
+    def run_once(self):
+        """Expire ဖြစ်ပြီးသော cohort ကို suspend လုပ်ပြီး next_run ကို ပြန်တွက်သည်။ Suspend လုပ်ခဲ့သော users ကို ပြန်ပေးသည်။"""
+        start = time.perf_counter()
+        db = self.get_db()
+        try:
+            expired = suspend_expired(db)
+            self.next_run = next_expiry(db)
+        finally:
+            db.close()
+        if expired:
+            names = ", ".join(u for u, _ in expired[:LOG_NAMES])
+            more = f" (+{len(expired) - LOG_NAMES} more)" if len(expired) > LOG_NAMES else ""
+            print(f"Expiry: suspended {len(expired)} users: {names}{more}")
+            self.config_syncer.request()
+        self.last_stats = {'suspended': len(expired), 'next_run': self.next_run.isoformat() if self.next_run else None,
+                           'seconds': time.perf_counter() - start}
+        return expired
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+        print("Expiry scheduler started.")
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Expiry scheduler error: {e}")
+            # အနီးဆုံး expiry အချိန် (သို့) recheck interval - စောသည့်အချိန်အထိ (reschedule() ဖြင့် စောစော နိုးနိုင်သည်)
+            timeout = self.recheck
+            if self.next_run is not None:
+                timeout = min(timeout, max(0.0, (self.next_run - datetime.now()).total_seconds()))
+            self.wake.wait(timeout)
+            self.wake.clear()
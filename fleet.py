@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+ZIVPN fleet mode
+Web panel တစ်ခုမှ ZIVPN servers များစွာကို ၎င်းတို့၏ api.py (/api/v1/stats, /api/v1/users) မှတစ်ဆင့် စီမံသည်။
+- Nodes များကို SQLite `fleet_nodes` table ထဲ register လုပ်ထားသည်။
+- Queries များကို pooled HTTP session (keep-alive) နှင့် timeouts ဖြင့် nodes အားလုံးထံ တပြိုင်နက် fan out လုပ်သည်။
+  မတုံ့ပြန်သော node တစ်ခုကြောင့် dashboard တစ်ခုလုံး မရပ်ပါ (ထို node ကို error အဖြစ်သာ ပြသည်)။
+- Users များကို username အစဉ်အတိုင်း merge လုပ်ပြီး username cursor ဖြင့် page ခွဲသည်။
+- User အသစ်ကို active users အနည်းဆုံး (load နည်းသော) node ပေါ်တွင် ချပေးသည်။
+"""
+
+import heapq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FLEET_CONNECT_TIMEOUT = float(os.environ.get("FLEET_CONNECT_TIMEOUT", "2"))
+FLEET_READ_TIMEOUT = float(os.environ.get("FLEET_READ_TIMEOUT", "5"))
+FLEET_WORKERS = int(os.environ.get("FLEET_WORKERS", "16"))
+FLEET_PAGE_SIZE = 50
+FLEET_PAGE_MAX = 500
+# Panel ကိုယ်တိုင်၏ api.py (node "local" အဖြစ် အမြဲ ပါဝင်သည်)
+LOCAL_NODE_URL = os.environ.get("FLEET_LOCAL_API", "http://127.0.0.1:8081")
+LOCAL_NODE_NAME = "local"
+
+class FleetError(Exception):
+    pass
+
+def node_key(stats):
+    """Placement အတွက် load: active users နည်းသော node ကို ဦးစားပေးပြီး တူပါက CPU load နည်းသော node"""
+    return (stats.get("active_users") or 0, stats.get("load1") or 0.0, stats.get("total_users") or 0)
+
+class FleetClient:
+    def __init__(self, get_db, local_token=None, timeout=(FLEET_CONNECT_TIMEOUT, FLEET_READ_TIMEOUT),
+                 workers=FLEET_WORKERS, local_url=LOCAL_NODE_URL):
+        self.get_db = get_db
+        self.local_token = local_token if local_token is not None else os.environ.get("API_TOKEN", "")
+        self.local_url = local_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet")
+
+    # ===== Node registry =====
+
+    def nodes(self):
+        """[{name, url, token}] - local node + enabled registered nodes"""
+        db = self.get_db()
+        try:
+            rows = db.execute('SELECT name, url, token FROM fleet_nodes WHERE enabled = 1 ORDER BY name').fetchall()
+        finally:
+            db.close()
+        nodes = [{"name": LOCAL_NODE_NAME, "url": self.local_url, "token": self.local_token}]
+        return nodes + [{"name": r["name"], "url": r["url"].rstrip("/"), "token": r["token"] or ""} for r in rows]
+
+    def register(self, name, url, token=""):
+        """Node ၏ /api/v1/stats ကို ခေါ်ကြည့်ပြီးမှ register လုပ်သည် (URL / token မှားပါက FleetError)။"""
+        name, url = (name or "").strip(), (url or "").strip().rstrip("/")
+        if not name or name == LOCAL_NODE_NAME or not url.startswith(("http://", "https://")):
+            raise FleetError("name and http(s) url are required")
+        stats = self.call({"name": name, "url": url, "token": token}, "GET", "/api/v1/stats")
+        db = self.get_db()
+        try:
+            with db.transaction():
+                db.execute('''
+                    INSERT INTO fleet_nodes (name, url, token) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET url = excluded.url, token = excluded.token, enabled = 1
+                ''', (name, url, token))
+        finally:
+            db.close()
+        return stats
+
+    def unregister(self, name):
+        db = self.get_db()
+        try:
+            with db.transaction():
+                return db.execute('DELETE FROM fleet_nodes WHERE name = ?', (name,)).rowcount
+        finally:
+            db.close()
+
+    # ===== HTTP =====
+
+    def call(self, node, method, path, params=None, json=None):
+        headers = {"Authorization": f"Bearer {node['token']}"} if node.get("token") else {}
+        try:
+            r = self.session.request(method, node["url"] + path, params=params, json=json,
+                                     headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise FleetError(f"{node['name']}: {e.__class__.__name__}")
+        if r.status_code >= 400:
+            try:
+                detail = r.json().get("error") or r.status_code
+            except ValueError:
+                detail = r.status_code
+            raise FleetError(f"{node['name']}: {detail}")
+        try:
+            return r.json()
+        except ValueError:
+            raise FleetError(f"{node['name']}: invalid response")
+
+    def fan_out(self, method, path, params=None, nodes=None):
+        """Nodes အားလုံးထံ တပြိုင်နက် ခေါ်သည်။ [(node, result, error)] ကို nodes အစဉ်အတိုင်း ပြန်ပေးသည်။"""
+        nodes = self.nodes() if nodes is None else nodes
+        futures = [(node, self.pool.submit(self.call, node, method, path, params)) for node in nodes]
+        results = []
+        for node, future in futures:
+            try:
+                results.append((node, future.result(), None))
+            except FleetError as e:
+                results.append((node, None, str(e)))
+        return results
+
+    # ===== Merged views =====
+
+    def stats(self):
+        """Nodes တစ်ခုချင်း stats နှင့် စုစုပေါင်း"""
+        start = time.perf_counter()
+        per_node, totals = [], {"total_users": 0, "active_users": 0, "total_bandwidth_bytes": 0}
+        for node, data, error in self.fan_out("GET", "/api/v1/stats"):
+            entry = {"node": node["name"], "url": node["url"], "ok": error is None, "error": error}
+            if data:
+                entry.update(data)
+                for key in totals:
+                    totals[key] += data.get(key) or 0
+            per_node.append(entry)
+        totals["nodes"] = len(per_node)
+        totals["nodes_up"] = sum(1 for n in per_node if n["ok"])
+        return {"totals": totals, "nodes": per_node, "seconds": round(time.perf_counter() - start, 3)}
+
+    def users(self, q="", after="", limit=FLEET_PAGE_SIZE):
+        """
+        Nodes အားလုံးမှ users (username > after) ကို limit ခုစီ ယူပြီး username အစဉ်ဖြင့် merge လုပ်သည်။
+        ရလဒ် page ၏ နောက်ဆုံး username ကို next cursor အဖြစ် ပြန်ပေးသည်။
+        """
+        limit = max(1, min(int(limit or FLEET_PAGE_SIZE), FLEET_PAGE_MAX))
+        params = {"limit": limit + 1, "after": after or "", "q": q or ""}
+        streams, errors = [], []
+        for node, data, error in self.fan_out("GET", "/api/v1/users", params=params):
+            if error:
+                errors.append({"node": node["name"], "error": error})
+                continue
+            streams.append([dict(u, node=node["name"]) for u in data])
+        merged = list(heapq.merge(*streams, key=lambda u: (u["username"], u["node"])))
+        page = merged[:limit]
+        # Username တူသော users များ (nodes မတူ) ကို page နှစ်ခုကြား မခွဲပါ (cursor သည် username သာ ဖြစ်သည်)။
+        while page and len(page) < len(merged) and merged[len(page)]["username"] == page[-1]["username"]:
+            page.append(merged[len(page)])
+        next_cursor = page[-1]["username"] if len(merged) > len(page) else None
+        return {"users": page, "next_cursor": next_cursor, "errors": errors}
+
+    def place_user(self, user_data, node_name=None):
+        """
+        node_name မပေးပါက တုံ့ပြန်နိုင်သော nodes ထဲမှ load အနည်းဆုံး node တွင် user ကို ဖန်တီးသည်။
+        (node name, node response) ကို ပြန်ပေးသည်။
+        """
+        nodes = self.nodes()
+        if node_name:
+            candidates = [n for n in nodes if n["name"] == node_name]
+            if not candidates:
+                raise FleetError(f"unknown node: {node_name}")
+            node = candidates[0]
+        else:
+            ranked = [(node_key(data), node["name"], node) for node, data, error in
+                      self.fan_out("GET", "/api/v1/stats", nodes=nodes) if error is None]
+            if not ranked:
+                raise FleetError("no reachable nodes")
+            node = min(ranked, key=lambda r: r[:2])[2]
+        return node["name"], self.call(node, "POST", "/api/v1/users", json=user_data)
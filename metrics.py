@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+ZIVPN metrics
+Web panel, API နှင့် Connection Manager တို့ မျှဝေသုံးသော Prometheus text exposition format (0.0.4) metrics။
+External dependency မလိုပါ။ Hot paths များတွင် counter / histogram update တစ်ခုသည် lock တစ်ခုနှင့် dict lookup
+(histogram ဆိုလျှင် bisect) သာ ဖြစ်သည်။ DB row counts ကဲ့သို့ ကုန်ကျစရိတ်ရှိသော values များကို scrape ချိန်တွင်သာ
+collectors များက တွက်သည်။
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds - HTTP requests, DB queries, conntrack dumps, enforcer ticks
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+class CollectedMetric(Metric):
+    """fn ပေးပါက scrape ချိန်တွင် fn() ကို ခေါ်သည် (value သို့မဟုတ် {labels tuple: value})။"""
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def render(self):
+        if self.fn is None:
+            return super().render()
+        result = self.fn()
+        items = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+class Counter(CollectedMetric):
+    """inc() ဖြင့် တိုးသည် (သို့) process ထဲရှိပြီးသော monotonic counter ကို fn ဖြင့် export လုပ်သည်။"""
+    kind = "counter"
+
+    def inc(self, amount=1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(CollectedMetric):
+    """set() ဖြင့် သတ်မှတ်သည် (သို့) fn ဖြင့် scrape ချိန်တွင် တွက်သည်။"""
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                # [bucket counts (non-cumulative) ..., +Inf], sum
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self.lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self.values.items())
+        lines = self.header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=(), fn=None):
+        return self.register(Counter(name, documentation, labelnames, fn))
+
+    def gauge(self, name, documentation, labelnames=(), fn=None):
+        return self.register(Gauge(name, documentation, labelnames, fn))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # Collector တစ်ခု (ဥပမာ DB locked) ကြောင့် scrape တစ်ခုလုံး မပျက်စေရန်
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# ===== Shared collectors =====
+
+USER_STATUS_SQL = '''
+    SELECT
+        SUM(CASE WHEN status = 'suspended' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN status != 'suspended' AND IFNULL(expires, '') != '' AND expires < date('now', 'localtime') THEN 1 ELSE 0 END),
+        COUNT(*)
+    FROM users
+'''
+
+def register_user_counts(get_db, registry=REGISTRY):
+    """Users by status (active / expired / suspended) - scrape တစ်ကြိမ်လျှင် users table scan တစ်ကြိမ်"""
+    def collect():
+        db = get_db()
+        try:
+            suspended, expired, total = db.execute(USER_STATUS_SQL).fetchone()
+        finally:
+            db.close()
+        suspended, expired = suspended or 0, expired or 0
+        return {("active",): total - suspended - expired, ("expired",): expired, ("suspended",): suspended}
+    registry.gauge("zivpn_users", "Users by status", ["status"], fn=collect)
+
+def register_db_metrics(registry=REGISTRY):
+    """database.metrics (process ၏ SQLite query counters) ကို export လုပ်သည်။"""
+    import database
+    m = database.metrics
+    registry.register(m.latency)
+    registry.counter("zivpn_db_queries_total", "SQLite statements executed", fn=lambda: m.queries)
+    registry.counter("zivpn_db_query_seconds_total", "Time spent in SQLite statements", fn=lambda: m.query_seconds)
+    registry.gauge("zivpn_db_max_query_seconds", "Slowest SQLite statement", fn=lambda: m.max_query_seconds)
+    registry.counter("zivpn_db_slow_queries_total", "SQLite statements slower than the slow query threshold",
+                     fn=lambda: m.slow_queries)
+    registry.counter("zivpn_db_lock_waits_total", "Writes that waited for the SQLite write lock", fn=lambda: m.lock_waits)
+    registry.counter("zivpn_db_lock_errors_total", "Statements that failed with database is locked",
+                     fn=lambda: m.lock_errors)
+
+def register_config_syncer(syncer, registry=REGISTRY):
+    registry.counter("zivpn_config_syncs_total", "config.json sync runs", fn=lambda: syncer.syncs)
+    registry.counter("zivpn_config_restarts_total", "zivpn.service restarts after a config change",
+                     fn=lambda: syncer.restarts)
+
+def instrument_flask(app, registry=REGISTRY):
+    """Flask route (URL rule) အလိုက် request latency histogram နှင့် status counter"""
+    from flask import request
+    latency = registry.histogram("zivpn_http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+    requests_total = registry.counter("zivpn_http_requests_total", "HTTP requests", ["method", "route", "status"])
+
+    @app.before_request
+    def _start_timer():
+        request.environ["zivpn.start"] = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = request.environ.get("zivpn.start")
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            latency.observe(time.perf_counter() - start, request.method, route)
+            requests_total.inc(1, request.method, route, str(response.status_code))
+        return response
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """GET /metrics ကို ပေးသော HTTP listener (daemon thread) - Flask မရှိသော processes အတွက်"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics listening on http://{host}:{port}/metrics")
+    return server
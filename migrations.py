@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+ZIVPN schema migrations
+Schema version ကို `PRAGMA user_version` ထဲတွင် မှတ်ထားပြီး migrations များကို process startup တွင်
+တစ်ကြိမ်သာ အစဉ်လိုက် apply လုပ်သည်။ Web panel, API, bot, cleanup နှင့် Connection Manager တို့ မျှဝေသုံးသည်။
+
+Usage: python3 migrations.py [DATABASE_PATH]
+"""
+
+import sys
+
+import database
+
+BASE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        expires DATE,
+        port INTEGER,
+        status TEXT DEFAULT 'active',
+        bandwidth_limit INTEGER DEFAULT 0,
+        bandwidth_used INTEGER DEFAULT 0,
+        speed_limit_up INTEGER DEFAULT 0,
+        speed_limit_down INTEGER DEFAULT 0,
+        concurrent_conn INTEGER DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS billing (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        plan_type TEXT DEFAULT 'monthly',
+        amount REAL DEFAULT 0,
+        currency TEXT DEFAULT 'MMK',
+        payment_method TEXT,
+        payment_status TEXT DEFAULT 'pending',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        expires_at DATE NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS bandwidth_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        bytes_used INTEGER DEFAULT 0,
+        log_date DATE DEFAULT CURRENT_DATE,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS server_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        total_users INTEGER DEFAULT 0,
+        active_users INTEGER DEFAULT 0,
+        total_bandwidth INTEGER DEFAULT 0,
+        server_load REAL DEFAULT 0,
+        recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS audit_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_user TEXT NOT NULL,
+        action TEXT NOT NULL,
+        target_user TEXT,
+        details TEXT,
+        ip_address TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        message TEXT NOT NULL,
+        type TEXT DEFAULT 'info',
+        read_status INTEGER DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''',
+]
+
+def column_names(db, table):
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})").fetchall()]
+
+def create_base_schema(db):
+    """udp.sh install schema (DB အသစ်ဖြစ်ပါက tables များကို ဖန်တီးသည်)"""
+    for sql in BASE_SCHEMA:
+        db.execute(sql)
+
+def add_hwid_column(db):
+    """'users' table တွင် 'hwid' column မရှိပါက ထည့်သွင်းသည်။"""
+    if 'hwid' not in column_names(db, 'users'):
+        db.execute("ALTER TABLE users ADD COLUMN hwid TEXT DEFAULT ''")
+
+def add_hot_path_indexes(db):
+    """Dashboard, enforcer နှင့် reports queries များအတွက် indexes"""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_status_expires ON users(status, expires)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_port ON users(port)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_bandwidth_logs_user_date ON bandwidth_logs(username, log_date)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_billing_created_at ON billing(created_at)")
+
+def add_user_list_sort_indexes(db):
+    """Web panel user list ၏ keyset pagination sort orders များအတွက် expression indexes (web.py USER_SORTS နှင့် တူရမည်)"""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_sort_user ON users(username COLLATE NOCASE, id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_sort_port ON users(IFNULL(port, 0), id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_users_sort_expires ON users(IFNULL(NULLIF(expires, ''), '9999-12-31'), id)")
+
+def add_rollup_tables(db):
+    """bandwidth_logs / server_stats အတွက် hourly, daily, monthly rollup tables (rollups.py)"""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_bandwidth_logs_created ON bandwidth_logs(created_at)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_server_stats_recorded ON server_stats(recorded_at)")
+    for table, key in (("bandwidth_hourly", "hour"), ("bandwidth_daily", "day"), ("bandwidth_monthly", "month")):
+        db.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+            username TEXT NOT NULL,
+            {key} TEXT NOT NULL,
+            bytes_used INTEGER DEFAULT 0,
+            PRIMARY KEY ({key}, username)
+        ) WITHOUT ROWID''')
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table}(username, {key})")
+    db.execute('''CREATE TABLE IF NOT EXISTS server_stats_daily (
+        day TEXT PRIMARY KEY,
+        samples INTEGER DEFAULT 0,
+        max_total_users INTEGER DEFAULT 0,
+        max_active_users INTEGER DEFAULT 0,
+        total_bandwidth INTEGER DEFAULT 0,
+        load_sum REAL DEFAULT 0,
+        max_load REAL DEFAULT 0
+    )''')
+    # Source table တစ်ခုစီ၏ rollup ပြီးသွားသော နောက်ဆုံး row id
+    db.execute('''CREATE TABLE IF NOT EXISTS rollup_state (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER DEFAULT 0
+    )''')
+
+def add_port_allocator(db):
+    """
+    users.port unique index နှင့် free port list (ports.py)။ Port ထပ်နေသော users များထဲမှ
+    အဟောင်းဆုံး user သာ port ကို ဆက်ထားပြီး ကျန်သူများကို free port အသစ် ချပေးသည်။
+    """
+    db.execute("UPDATE users SET port = NULL WHERE port = ''")
+    db.execute("CREATE TABLE IF NOT EXISTS free_ports (port INTEGER PRIMARY KEY)")
+    db.execute("DELETE FROM free_ports")
+    db.execute('''
+        WITH RECURSIVE r(p) AS (SELECT 6000 UNION ALL SELECT p + 1 FROM r WHERE p < 19999)
+        INSERT INTO free_ports (port)
+        SELECT p FROM r WHERE p NOT IN (SELECT port FROM users WHERE port IS NOT NULL)
+    ''')
+    duplicates = db.execute('''
+        SELECT id, username, port FROM users u
+        WHERE port IS NOT NULL AND id > (SELECT MIN(id) FROM users WHERE port = u.port)
+        ORDER BY id
+    ''').fetchall()
+    for user_id, username, old_port in duplicates:
+        row = db.execute("SELECT MIN(port) FROM free_ports").fetchone()
+        new_port = row[0] if row else None
+        db.execute("UPDATE users SET port = ? WHERE id = ?", (new_port, user_id))
+        db.execute("DELETE FROM free_ports WHERE port = ?", (new_port,))
+        print(f"MIGRATION: {username} shared port {old_port}, moved to {new_port}.")
+    db.execute("DROP INDEX IF EXISTS idx_users_port")
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_port_unique ON users(port) WHERE port IS NOT NULL")
+    db.execute('''CREATE TRIGGER IF NOT EXISTS trg_users_port_insert AFTER INSERT ON users
+        WHEN new.port IS NOT NULL
+        BEGIN
+            DELETE FROM free_ports WHERE port = new.port;
+        END''')
+    db.execute('''CREATE TRIGGER IF NOT EXISTS trg_users_port_update AFTER UPDATE OF port ON users
+        WHEN old.port IS NOT new.port
+        BEGIN
+            DELETE FROM free_ports WHERE port = new.port;
+            INSERT OR IGNORE INTO free_ports (port) SELECT old.port WHERE old.port BETWEEN 6000 AND 19999;
+        END''')
+    db.execute('''CREATE TRIGGER IF NOT EXISTS trg_users_port_delete AFTER DELETE ON users
+        WHEN old.port BETWEEN 6000 AND 19999
+        BEGIN
+            INSERT OR IGNORE INTO free_ports (port) VALUES (old.port);
+        END''')
+
+def add_fleet_nodes(db):
+    """Fleet mode ၏ remote nodes (fleet.py)"""
+    db.execute('''CREATE TABLE IF NOT EXISTS fleet_nodes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        url TEXT NOT NULL,
+        token TEXT DEFAULT '',
+        enabled INTEGER DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+def add_notification_queue_index(db):
+    """Bot dispatcher ၏ undelivered notifications lookup (read_status = 0 ORDER BY id)"""
+    db.execute('CREATE INDEX IF NOT EXISTS idx_notifications_pending ON notifications(id) WHERE read_status = 0')
+
+# (version, description, apply) - version များကို အစဉ်လိုက်သာ ထပ်တိုးရမည်။ ရှိပြီးသား migration ကို မပြင်ရ။
+MIGRATIONS = [
+    (1, "base schema", create_base_schema),
+    (2, "users.hwid column", add_hwid_column),
+    (3, "hot path indexes", add_hot_path_indexes),
+    (4, "user list sort indexes", add_user_list_sort_indexes),
+    (5, "bandwidth / server stats rollup tables", add_rollup_tables),
+    (6, "port allocator free-list and unique users.port", add_port_allocator),
+    (7, "fleet nodes", add_fleet_nodes),
+    (8, "pending notifications index", add_notification_queue_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(db):
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(db):
+    """
+    Apply မလုပ်ရသေးသော migrations များကို transaction တစ်ခုတည်းအတွင်း apply လုပ်သည်။
+    Process များ တပြိုင်နက် start ဖြစ်လျှင်လည်း BEGIN IMMEDIATE ကြောင့် တစ်ခုသာ apply လုပ်မည်။
+    """
+    if schema_version(db) >= LATEST_VERSION:
+        return []
+    applied = []
+    with db.transaction():
+        current = schema_version(db)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            apply(db)
+            db.execute(f"PRAGMA user_version = {version}")
+            applied.append((version, description))
+    for version, description in applied:
+        print(f"MIGRATION: v{version} ({description}) applied.")
+    return applied
+
+def run(path=None):
+    """Process startup တွင် ခေါ်ရန်။ Migration မအောင်မြင်ပါက error ကို print ပြီး ဆက်လုပ်သည်။"""
+    db = database.get_db(path)
+    try:
+        return migrate(db)
+    except Exception as e:
+        print(f"MIGRATION ERROR: {e}")
+        return []
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    run(path)
+    db = database.get_db(path)
+    print(f"Schema version: {schema_version(db)} (latest {LATEST_VERSION})")
+    db.close()
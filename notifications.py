@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+ZIVPN notifications
+cleanup.py (expiry suspend), ConnectionManager (device limit drops) နှင့် ShapingController (quota ကုန်ခြင်း)
+တို့က `notifications` table ထဲ rows များ ထည့်သည်။ Telegram bot ၏ dispatcher က undelivered rows (read_status = 0)
+များကို batch ဖြင့် ယူပြီး type တူသော rows များကို message တစ်စောင်တည်းအဖြစ် coalesce လုပ်ကာ
+("37 user(s) expired ..." ကဲ့သို့) ပို့ပြီးမှ delivered (read_status = 1) ဟု မှတ်သည်။
+"""
+
+from collections import OrderedDict
+
+EXPIRED = "expired"
+CONN_LIMIT = "conn_limit"
+QUOTA = "quota_exhausted"
+
+# Rows များစွာကို coalesce လုပ်သောအခါ ခေါင်းစဉ် ({n} = users အရေအတွက်)
+TITLES = {
+    EXPIRED: "⏰ {n} user(s) expired and were suspended",
+    CONN_LIMIT: "🚫 {n} user(s) exceeded their device limit",
+    QUOTA: "📉 {n} user(s) used up their bandwidth quota and were suspended",
+}
+BATCH_SIZE = 500
+# Message တစ်စောင်တွင် ပြမည့် usernames အများဆုံး (Telegram message 4096 chars အတွင်း)
+MAX_NAMES = 40
+DELIVERED_RETENTION_DAYS = 30
+
+def add(db, kind, items):
+    """items = [(username, message)] ကို executemany ဖြင့် ထည့်သည် (caller ၏ transaction အတွင်း ခေါ်နိုင်သည်)။"""
+    db.executemany('INSERT INTO notifications (username, message, type) VALUES (?, ?, ?)',
+                   [(username, message, kind) for username, message in items])
+
+def notify(get_db, kind, items):
+    """Transaction သီးသန့်ဖြင့် ထည့်သည်။ Notification မရေးနိုင်ခြင်းကြောင့် enforcement မရပ်စေရန် error ကို print သာ လုပ်သည်။"""
+    if not items:
+        return
+    db = get_db()
+    try:
+        with db.transaction():
+            add(db, kind, items)
+    except Exception as e:
+        print(f"Error recording notifications: {e}")
+    finally:
+        db.close()
+
+def pending(db, limit=BATCH_SIZE):
+    return db.execute('''
+        SELECT id, username, message, type FROM notifications
+        WHERE read_status = 0 ORDER BY id LIMIT ?
+    ''', (limit,)).fetchall()
+
+def coalesce(rows, max_names=MAX_NAMES):
+    """Rows များကို type အလိုက် စုပြီး [(ids, text)] (type တစ်ခုလျှင် message တစ်စောင်) ကို ပြန်ပေးသည်။"""
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault(row["type"], []).append(row)
+    messages = []
+    for kind, items in groups.items():
+        ids = [r["id"] for r in items]
+        names = list(OrderedDict.fromkeys(r["username"] for r in items))
+        if len(items) == 1:
+            text = items[0]["message"]
+        else:
+            title = TITLES.get(kind, "🔔 {n} user(s): " + kind).format(n=len(names))
+            text = title + "\n" + ", ".join(names[:max_names])
+            if len(names) > max_names:
+                text += f" (+{len(names) - max_names} more)"
+        messages.append((ids, text))
+    return messages
+
+def mark_delivered(db, ids):
+    with db.transaction():
+        db.executemany('UPDATE notifications SET read_status = 1 WHERE id = ?', [(i,) for i in ids])
+
+def prune(db, days=DELIVERED_RETENTION_DAYS):
+    """ပို့ပြီးသော notifications အဟောင်းများကို ဖျက်သည်။"""
+    with db.transaction():
+        return db.execute('''
+            DELETE FROM notifications WHERE read_status = 1 AND created_at < datetime('now', ?)
+        ''', (f"-{days} days",)).rowcount
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+ZIVPN port allocator
+အသုံးမပြုရသေးသော ports (6000-19999) များကို SQLite `free_ports` table (free-list) ထဲ သိမ်းထားသည်။
+users table ပေါ်ရှိ triggers များက INSERT / UPDATE OF port / DELETE တိုင်း free-list ကို အလိုအလျောက် ပြင်သဖြင့်
+Web panel, API, bot, bulk delete, CSV import မည်သည့်နေရာမှ ရေးသည်ဖြစ်စေ ports များ ပြန်ရသည်။
+Allocation သည် caller ၏ transaction (BEGIN IMMEDIATE) အတွင်း `MIN(port)` lookup တစ်ခုသာ ဖြစ်ပြီး
+users.port ပေါ်ရှိ unique index က port တစ်ခုကို users နှစ်ယောက် မရစေရန် ကာကွယ်သည်။
+
+Usage: python3 ports.py [--rebuild]
+"""
+
+import os
+import sys
+
+import database
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+PORT_MIN, PORT_MAX = 6000, 19999
+
+class PortInUse(ValueError):
+    def __init__(self, port, owner):
+        super().__init__(f"port {port} is used by {owner}")
+        self.port = port
+        self.owner = owner
+
+class NoFreePort(ValueError):
+    def __init__(self):
+        super().__init__(f"no free port left in {PORT_MIN}-{PORT_MAX}")
+
+def reserve(db, count, exclude=()):
+    """
+    အငယ်ဆုံး free ports `count` ခုကို ပြန်ပေးသည် (exclude ထဲရှိသော ports များကို ကျော်သည်)။
+    Ports များကို user row ထဲ ရေးလိုက်မှ (trigger ဖြင့်) free-list မှ ဖယ်ရှားသဖြင့် caller ၏ transaction အတွင်း ခေါ်ရမည်။
+    """
+    if count <= 0:
+        return []
+    exclude = set(exclude)
+    rows = db.execute('SELECT port FROM free_ports ORDER BY port LIMIT ?', (count + len(exclude),)).fetchall()
+    return [r[0] for r in rows if r[0] not in exclude][:count]
+
+def allocate(db, exclude=()):
+    """Free port တစ်ခု (မကျန်တော့ပါက None)"""
+    found = reserve(db, 1, exclude)
+    return found[0] if found else None
+
+def owner(db, port):
+    row = db.execute('SELECT username FROM users WHERE port = ?', (port,)).fetchone()
+    return row[0] if row else None
+
+def free_count(db):
+    return db.execute('SELECT COUNT(*) FROM free_ports').fetchone()[0]
+
+def rebuild(db):
+    """users table မှ free-list ကို အသစ်ပြန်တွက်သည် (triggers မရှိမီ ရေးထားသော data ကို ပြင်ရန်)။"""
+    with db.transaction():
+        db.execute('DELETE FROM free_ports')
+        db.execute('''
+            WITH RECURSIVE r(p) AS (SELECT ? UNION ALL SELECT p + 1 FROM r WHERE p < ?)
+            INSERT INTO free_ports (port)
+            SELECT p FROM r WHERE p NOT IN (SELECT port FROM users WHERE port IS NOT NULL)
+        ''', (PORT_MIN, PORT_MAX))
+    return free_count(db)
+
+if __name__ == "__main__":
+    db = database.get_db(DATABASE_PATH)
+    try:
+        if "--rebuild" in sys.argv:
+            rebuild(db)
+        print(f"Free ports: {free_count(db)} / {PORT_MAX - PORT_MIN + 1}")
+    finally:
+        db.close()
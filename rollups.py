@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+ZIVPN time-series rollups
+bandwidth_logs (raw samples - flush/POST တစ်ခုလျှင် row တစ်ခု) ကို hourly / daily / monthly tables ထဲသို့
+incremental (rollup_state.last_id မှစ၍) ပေါင်းထည့်ပြီး retention ကျော်သွားသော raw rows များကို ဖျက်သည်။
+server_stats ကိုလည်း interval တိုင်း snapshot တစ်ခုထည့်ပြီး server_stats_daily ထဲ rollup လုပ်သည်။
+Reports များသည် range အရ သင့်တော်သော rollup level ကိုသာ ဖတ်သည်။
+"""
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import database
+from system_metrics import MetricsSampler
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+ROLLUP_INTERVAL = float(os.environ.get("ROLLUP_INTERVAL", "300"))
+RAW_RETENTION_DAYS = int(os.environ.get("ROLLUP_RAW_RETENTION_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.environ.get("ROLLUP_HOURLY_RETENTION_DAYS", "31"))
+# 0 = မဖျက်ပါ (bandwidth report ၏ လအစ/လဆုံး အပိုင်းများသည် daily ကို ဖတ်သည်)
+DAILY_RETENTION_DAYS = int(os.environ.get("ROLLUP_DAILY_RETENTION_DAYS", "0"))
+SERVER_STATS_RETENTION_DAYS = int(os.environ.get("SERVER_STATS_RETENTION_DAYS", "31"))
+# Transaction တစ်ခုအတွင်း rollup / prune လုပ်မည့် rows (write lock ကို ကြာကြာ မကိုင်ထားရန်)
+BATCH_SIZE = 50000
+GB = 1024 ** 3
+
+# (table, key column, strftime format)
+BANDWIDTH_LEVELS = [
+    ("bandwidth_hourly", "hour", "%Y-%m-%d %H:00"),
+    ("bandwidth_daily", "day", "%Y-%m-%d"),
+    ("bandwidth_monthly", "month", "%Y-%m"),
+]
+
+SERVER_STATS_ROLLUP_SQL = '''
+    INSERT INTO server_stats_daily (day, samples, max_total_users, max_active_users, total_bandwidth, load_sum, max_load)
+    SELECT strftime('%Y-%m-%d', recorded_at), COUNT(*), MAX(total_users), MAX(active_users),
+           MAX(total_bandwidth), SUM(server_load), MAX(server_load)
+    FROM server_stats WHERE id > ? AND id <= ?
+    GROUP BY 1
+    ON CONFLICT(day) DO UPDATE SET
+        samples = samples + excluded.samples,
+        max_total_users = MAX(max_total_users, excluded.max_total_users),
+        max_active_users = MAX(max_active_users, excluded.max_active_users),
+        total_bandwidth = MAX(total_bandwidth, excluded.total_bandwidth),
+        load_sum = load_sum + excluded.load_sum,
+        max_load = MAX(max_load, excluded.max_load)
+'''
+
+def last_rolled_id(db, source):
+    row = db.execute('SELECT last_id FROM rollup_state WHERE source = ?', (source,)).fetchone()
+    return row[0] if row else 0
+
+def set_rolled_id(db, source, last_id):
+    db.execute('''
+        INSERT INTO rollup_state (source, last_id) VALUES (?, ?)
+        ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id
+    ''', (source, last_id))
+
+def _rollup_batches(db, source, apply):
+    """source table ၏ rollup မလုပ်ရသေးသော ids များကို BATCH_SIZE စီ apply(last, top) ဖြင့် ပေါင်းသည်။"""
+    rows = 0
+    while True:
+        with db.transaction():
+            last = last_rolled_id(db, source)
+            top = db.execute(f'SELECT MAX(id) FROM {source}').fetchone()[0] or 0
+            if top <= last:
+                return rows
+            top = min(top, last + BATCH_SIZE)
+            apply(last, top)
+            set_rolled_id(db, source, top)
+        rows += top - last
+
+def rollup_bandwidth(db):
+    def apply(last, top):
+        for table, key, fmt in BANDWIDTH_LEVELS:
+            db.execute(f'''
+                INSERT INTO {table} (username, {key}, bytes_used)
+                SELECT username, strftime('{fmt}', created_at), SUM(bytes_used)
+                FROM bandwidth_logs WHERE id > ? AND id <= ?
+                GROUP BY 1, 2
+                ON CONFLICT({key}, username) DO UPDATE SET bytes_used = bytes_used + excluded.bytes_used
+            ''', (last, top))
+    return _rollup_batches(db, "bandwidth_logs", apply)
+
+def rollup_server_stats(db):
+    return _rollup_batches(db, "server_stats", lambda last, top: db.execute(SERVER_STATS_ROLLUP_SQL, (last, top)))
+
+def record_server_stats(db, server_load=0):
+    """Users table မှ server_stats snapshot တစ်ခု ထည့်သည်။"""
+    with db.transaction():
+        db.execute('''
+            INSERT INTO server_stats (total_users, active_users, total_bandwidth, server_load)
+            SELECT COUNT(*),
+                   SUM(CASE WHEN status = 'active' AND (expires IS NULL OR expires >= date('now', 'localtime')) THEN 1 ELSE 0 END),
+                   IFNULL(SUM(bandwidth_used), 0), ?
+            FROM users
+        ''', (server_load,))
+
+def _prune_rolled(db, source, time_column, days):
+    """Rollup ပြီးသွားပြီး days ရက်ထက် ဟောင်းသော raw rows များကို batch ဖြင့် ဖျက်သည်။"""
+    if days <= 0:
+        return 0
+    last = last_rolled_id(db, source)
+    deleted = 0
+    while True:
+        with db.transaction():
+            cur = db.execute(f'''
+                DELETE FROM {source} WHERE id IN (
+                    SELECT id FROM {source} WHERE {time_column} < datetime('now', ?) AND id <= ? LIMIT ?)
+            ''', (f"-{days} days", last, BATCH_SIZE))
+        deleted += cur.rowcount
+        if cur.rowcount < BATCH_SIZE:
+            return deleted
+
+def prune(db):
+    deleted = {
+        'bandwidth_logs': _prune_rolled(db, "bandwidth_logs", "created_at", RAW_RETENTION_DAYS),
+        'server_stats': _prune_rolled(db, "server_stats", "recorded_at", SERVER_STATS_RETENTION_DAYS),
+    }
+    with db.transaction():
+        if HOURLY_RETENTION_DAYS > 0:
+            deleted['bandwidth_hourly'] = db.execute(
+                "DELETE FROM bandwidth_hourly WHERE hour < strftime('%Y-%m-%d %H:00', 'now', ?)",
+                (f"-{HOURLY_RETENTION_DAYS} days",)).rowcount
+        if DAILY_RETENTION_DAYS > 0:
+            deleted['bandwidth_daily'] = db.execute(
+                "DELETE FROM bandwidth_daily WHERE day < date('now', ?)",
+                (f"-{DAILY_RETENTION_DAYS} days",)).rowcount
+    return deleted
+
+def delete_user_usage(db, username):
+    """User ဖျက်သည့်အခါ raw logs နှင့် rollups အားလုံးမှ ဖယ်ရှားသည် (caller က commit လုပ်ရမည်)။"""
+    db.execute('DELETE FROM bandwidth_logs WHERE username = ?', (username,))
+    for table, _, _ in BANDWIDTH_LEVELS:
+        db.execute(f'DELETE FROM {table} WHERE username = ?', (username,))
+
+# ===== Report queries =====
+
+def parse_day(value, default):
+    try:
+        return date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
+
+def month_start(d):
+    return d.replace(day=1)
+
+def next_month(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def split_range(from_day, to_day):
+    """
+    [from_day, to_day] ကို လပြည့် months (monthly table) နှင့် ကျန်သော အစ/အဆုံး ရက်များ (daily table) အဖြစ် ခွဲသည်။
+    (month range သို့မဟုတ် None, [(day_from, day_to), ...]) ကို ပြန်ပေးသည်။
+    """
+    first_full = from_day if from_day.day == 1 else next_month(from_day)
+    end_full = next_month(to_day) - timedelta(days=1) == to_day
+    last_full = month_start(to_day) if end_full else month_start(month_start(to_day) - timedelta(days=1))
+    if first_full > last_full:
+        return None, [(from_day, to_day)]
+    days = []
+    if from_day < first_full:
+        days.append((from_day, first_full - timedelta(days=1)))
+    after_full = next_month(last_full)
+    if after_full <= to_day:
+        days.append((after_full, to_day))
+    return (first_full.strftime("%Y-%m"), last_full.strftime("%Y-%m")), days
+
+def bandwidth_totals(db, from_day, to_day):
+    """Range အတွင်း user တစ်ယောက်ချင်း၏ usage (GB) - လပြည့် months ကို monthly မှ၊ ကျန်ရက်များကို daily မှ ဖတ်သည်။"""
+    months, days = split_range(from_day, to_day)
+    parts, args = [], []
+    if months:
+        parts.append('SELECT username, bytes_used FROM bandwidth_monthly WHERE month BETWEEN ? AND ?')
+        args += list(months)
+    for start, end in days:
+        parts.append('SELECT username, bytes_used FROM bandwidth_daily WHERE day BETWEEN ? AND ?')
+        args += [start.isoformat(), end.isoformat()]
+    return db.execute(f'''
+        SELECT username, SUM(bytes_used) * 1.0 / {GB} as total_gb_used
+        FROM ({" UNION ALL ".join(parts)})
+        GROUP BY username
+        ORDER BY total_gb_used DESC
+    ''', args).fetchall()
+
+def traffic_level(from_day, to_day):
+    """Range အရှည်အရ series level: 2 ရက်အတွင်း hourly, ~3 လအတွင်း daily, ထို့ထက်ကြာလျှင် monthly"""
+    span = (to_day - from_day).days
+    hourly_cutoff = date.today() - timedelta(days=HOURLY_RETENTION_DAYS)
+    if span <= 2 and (HOURLY_RETENTION_DAYS <= 0 or from_day >= hourly_cutoff):
+        return BANDWIDTH_LEVELS[0]
+    if span <= 92:
+        return BANDWIDTH_LEVELS[1]
+    return BANDWIDTH_LEVELS[2]
+
+def traffic_series(db, from_day, to_day, username=None):
+    """Period အလိုက် စုစုပေါင်း traffic (GB) - username ပေးပါက ထို user ၏ traffic သာ"""
+    table, key, fmt = traffic_level(from_day, to_day)
+    start, end = from_day.strftime(fmt), to_day.strftime(fmt)
+    if key == "hour":
+        end = to_day.strftime("%Y-%m-%d 23:00")
+    sql = f'SELECT {key} as period, SUM(bytes_used) * 1.0 / {GB} as total_gb_used FROM {table} WHERE {key} BETWEEN ? AND ?'
+    args = [start, end]
+    if username:
+        sql += ' AND username = ?'
+        args.append(username)
+    return db.execute(sql + ' GROUP BY period ORDER BY period ASC', args).fetchall()
+
+def server_series(db, from_day, to_day):
+    """2 ရက်အတွင်း raw server_stats snapshots၊ ထို့ထက်ကြာလျှင် server_stats_daily"""
+    if (to_day - from_day).days <= 2 and from_day >= date.today() - timedelta(days=SERVER_STATS_RETENTION_DAYS):
+        return db.execute('''
+            SELECT recorded_at as period, total_users, active_users, total_bandwidth, server_load
+            FROM server_stats WHERE recorded_at BETWEEN ? AND datetime(?, '+1 day')
+            ORDER BY recorded_at ASC
+        ''', (from_day.isoformat(), to_day.isoformat())).fetchall()
+    return db.execute('''
+        SELECT day as period, max_total_users as total_users, max_active_users as active_users,
+               total_bandwidth, ROUND(load_sum / samples, 1) as server_load, max_load
+        FROM server_stats_daily WHERE day BETWEEN ? AND ?
+        ORDER BY day ASC
+    ''', (from_day.isoformat(), to_day.isoformat())).fetchall()
+
+class RollupWorker:
+    def __init__(self, db_path=DATABASE_PATH, interval=ROLLUP_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        # server_load = interval အတွင်း ပျမ်းမျှ CPU % (sample နှစ်ခုကြား /proc/stat delta)
+        self.sampler = MetricsSampler(interval=interval, history=2)
+        self.last_stats = None
+
+    def get_db(self):
+        return database.get_db(self.db_path)
+
+    def run_once(self):
+        start = time.perf_counter()
+        server_load = self.sampler.sample_once().cpu_percent
+        db = self.get_db()
+        try:
+            record_server_stats(db, server_load)
+            rolled = rollup_bandwidth(db)
+            rollup_server_stats(db)
+            deleted = prune(db)
+        finally:
+            db.close()
+        self.last_stats = {'rolled_rows': rolled, 'deleted': deleted, 'seconds': time.perf_counter() - start}
+        return self.last_stats
+
+    def start(self):
+        self.sampler.sample_once()
+        threading.Thread(target=self._loop, daemon=True).start()
+        print(f"Rollups started (every {self.interval:g}s).")
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Rollup error: {e}")
+
+if __name__ == "__main__":
+    worker = RollupWorker()
+    worker.sampler.sample_once()
+    time.sleep(1)
+    print(worker.run_once())
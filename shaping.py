@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+ZIVPN traffic shaping
+users.speed_limit_up / speed_limit_down (MB/s) နှင့် bandwidth_limit (GB) ကို nftables named limit / quota objects
+အဖြစ် port (6000-19999) တစ်ခုလျှင် တစ်စုံ ပြောင်းပေးသည်။ Rules များသည် `limit name ... map` / `quota name ... map`
+lookup တစ်ခုစီသာ ဖြစ်၍ users အရေအတွက် မည်မျှရှိစေ packet path cost မပြောင်းပါ။
+- DB ပြောင်းလဲမှု (PRAGMA data_version) ရှိမှသာ desired state ကို ပြန်တွက်ပြီး ပြောင်းသွားသော ports များကိုသာ
+  `nft -f -` batch တစ်ခုဖြင့် ပြင်သည် (rules အားလုံး ပြန်မဆောက်ပါ)။
+- Quota ကုန်သွားသော users များကို status = 'suspended' သို့ ပြောင်းပြီး config.json ကို sync လုပ်ကာ notification ထည့်သည်။
+
+Quota period: bandwidth_limit သည် subscription period တစ်ခု (user ဖန်တီး/သက်တမ်းတိုးချိန်မှ နောက်တစ်ကြိမ် တိုးသည်အထိ)
+အတွက် ဖြစ်သည်။ သက်တမ်းတိုးခြင်း (extend၊ expiry ကို နောက်ရွှေ့ခြင်း) သို့မဟုတ် suspended user ကို ပြန် activate လုပ်ခြင်းသည်
+period အသစ် စသဖြင့် bandwidth_used ကို 0 သို့ ပြန်ထားသည် (USAGE_RESET_ON_ACTIVATE၊ bulk.py၊ web save_user)။
+Reset ဖြစ်သွားသော ports ၏ kernel quota objects များကိုလည်း used 0 ဖြင့် ပြန်ဆောက်သည်။
+"""
+
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+import database
+import notifications
+from config_sync import ConfigSyncer
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+SHAPING_INTERVAL = float(os.environ.get("SHAPING_INTERVAL", "10"))
+NFT_TABLE = "inet zivpn_shape"
+NFT_TIMEOUT = 30
+GB = 1024 ** 3
+
+# up/down: kbytes per second (0 = unlimited), quota: bytes (0 = unlimited)
+Shape = namedtuple("Shape", "up down quota")
+
+SHAPE_SQL = '''
+    SELECT port, speed_limit_up, speed_limit_down, bandwidth_limit, bandwidth_used
+    FROM users
+    WHERE status != 'suspended' AND port IS NOT NULL AND port != ''
+          AND (IFNULL(expires, '') = '' OR expires >= date('now', 'localtime'))
+          AND (speed_limit_up > 0 OR speed_limit_down > 0 OR bandwidth_limit > 0)
+'''
+
+# Suspended user ကို ပြန် activate လုပ်သော UPDATE ၏ SET clause တွင် ထည့်ရန် (status = old value ဖြင့် စစ်သည်)
+USAGE_RESET_ON_ACTIVATE = "bandwidth_used = CASE WHEN status = 'suspended' THEN 0 ELSE bandwidth_used END"
+
+QUOTA_EXCEEDED_SQL = '''
+    SELECT username, bandwidth_limit FROM users
+    WHERE status = 'active' AND bandwidth_limit > 0 AND bandwidth_used >= bandwidth_limit * ?
+'''
+
+# Original direction (client -> server) ကို DNAT မတိုင်မီ၊ reply direction ကို postrouting တွင် စစ်သည်။
+# Key သည် conntrack ၏ original destination port (user port) ဖြစ်၍ direction နှစ်ခုလုံးတွင် တူသည်။
+TABLE_SKELETON = f'''table {NFT_TABLE} {{
+    map up_limits {{ type inet_service : limit; }}
+    map down_limits {{ type inet_service : limit; }}
+    map quotas {{ type inet_service : quota; }}
+    chain pre {{
+        type filter hook prerouting priority -150; policy accept;
+        meta l4proto udp ct direction original quota name ct original proto-dst map @quotas drop
+        meta l4proto udp ct direction original limit name ct original proto-dst map @up_limits drop
+    }}
+    chain post {{
+        type filter hook postrouting priority 150; policy accept;
+        meta l4proto udp ct direction reply quota name ct original proto-dst map @quotas drop
+        meta l4proto udp ct direction reply limit name ct original proto-dst map @down_limits drop
+    }}
+}}
+'''
+
+def shape_for(row):
+    """DB row မှ Shape။ speed_limit_down မသတ်မှတ်ထားပါက (Web panel သည် up ကိုသာ ရေးသည်) up ကို direction နှစ်ခုလုံးတွင် သုံးသည်။"""
+    up = int(row["speed_limit_up"] or 0)
+    down = int(row["speed_limit_down"] or 0) or up
+    return Shape(up * 1024, down * 1024, int(row["bandwidth_limit"] or 0) * GB)
+
+NO_SHAPE = Shape(0, 0, 0)
+
+# Shape field -> (map name, nft object type)
+OBJECT_KINDS = {
+    "up": ("up_limits", "limit"),
+    "down": ("down_limits", "limit"),
+    "quota": ("quotas", "quota"),
+}
+
+def add_object(port, kind, value, used=0):
+    """Port တစ်ခု၏ limit/quota object တစ်ခုနှင့် ၎င်း၏ map element ကို ထည့်သော nft commands"""
+    map_name, obj_type = OBJECT_KINDS[kind]
+    if obj_type == "limit":
+        spec = f"rate over {value} kbytes/second"
+    else:
+        spec = f"over {value} bytes used {min(used, value)} bytes"
+    return [f"add {obj_type} {NFT_TABLE} {kind}_{port} {{ {spec} }}",
+            f"add element {NFT_TABLE} {map_name} {{ {port} : \"{kind}_{port}\" }}"]
+
+def delete_object(port, kind):
+    map_name, obj_type = OBJECT_KINDS[kind]
+    return [f"delete element {NFT_TABLE} {map_name} {{ {port} }}",
+            f"delete {obj_type} {NFT_TABLE} {kind}_{port}"]
+
+def plan(applied, desired, used, reset=()):
+    """
+    applied -> desired သို့ ရောက်ရန် nft commands များ။ ပြောင်းလဲသော objects များကိုသာ ထိသည်။
+    applied သည် None ဖြစ်ပါက table တစ်ခုလုံးကို ပြန်ဆောက်သည်။
+    reset = bandwidth_used ပြန်စသွားသော ports - quota မပြောင်းသော်လည်း quota object ကို ပြန်ဆောက်သည်။
+    """
+    cmds = []
+    if applied is None:
+        cmds += [f"table {NFT_TABLE}", f"delete table {NFT_TABLE}", TABLE_SKELETON.rstrip()]
+        applied = {}
+    for port in applied.keys() | desired.keys():
+        old = applied.get(port, NO_SHAPE)
+        new = desired.get(port, NO_SHAPE)
+        if old == new:
+            continue
+        for kind in Shape._fields:
+            before, after = getattr(old, kind), getattr(new, kind)
+            if before == after:
+                continue
+            if before:
+                cmds += delete_object(port, kind)
+            if after:
+                cmds += add_object(port, kind, after, used.get(port, 0))
+    for port in reset:
+        old = applied.get(port, NO_SHAPE)
+        new = desired.get(port, NO_SHAPE)
+        if old.quota and old.quota == new.quota:
+            cmds += delete_object(port, "quota") + add_object(port, "quota", new.quota, used.get(port, 0))
+    return cmds
+
+def run_nft(script):
+    result = subprocess.run(["nft", "-f", "-"], input=script, capture_output=True, text=True, timeout=NFT_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"nft exited with {result.returncode}")
+
+class ShapingController:
+    def __init__(self, db_path=DATABASE_PATH, interval=SHAPING_INTERVAL, runner=run_nft, config_syncer=None):
+        self.db_path = db_path
+        self.interval = interval
+        self.runner = runner
+        self.config_syncer = config_syncer or ConfigSyncer(self.get_db)
+        # port -> Shape (kernel ထဲတွင် apply လုပ်ပြီးသား)။ None = မသိ (table ကို ပြန်ဆောက်ရမည်)
+        self.applied = None
+        # port -> bandwidth_used (နောက်ဆုံး reconcile) - usage reset ဖြစ်သွားသော ports များကို သိရန်
+        self.used = {}
+        self.data_version = None
+        self.last_stats = None
+
+    def get_db(self):
+        return database.get_db(self.db_path)
+
+    def suspend_exhausted(self, db):
+        """Quota ကုန်သော active users များကို set-based UPDATE တစ်ခုဖြင့် suspend လုပ်သည်။"""
+        if not db.execute(QUOTA_EXCEEDED_SQL, (GB,)).fetchone():
+            return []
+        with db.transaction():
+            # Write lock ရပြီးမှ ပြန်ဖတ်သဖြင့် notifications သည် suspend လုပ်လိုက်သော users နှင့် အတိအကျ ကိုက်သည်။
+            rows = db.execute(QUOTA_EXCEEDED_SQL, (GB,)).fetchall()
+            db.execute('''
+                UPDATE users SET status = 'suspended', updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'active' AND bandwidth_limit > 0 AND bandwidth_used >= bandwidth_limit * ?
+            ''', (GB,))
+            notifications.add(db, notifications.QUOTA, [
+                (r[0], f"📉 {r[0]} used up the {r[1]} GB bandwidth quota and was suspended") for r in rows])
+        names = [r[0] for r in rows]
+        print(f"Quota exhausted, suspended: {', '.join(names)}")
+        return names
+
+    def desired_state(self, db):
+        desired, used = {}, {}
+        for row in db.execute(SHAPE_SQL).fetchall():
+            try:
+                port = int(row["port"])
+            except (TypeError, ValueError):
+                continue
+            desired[port] = shape_for(row)
+            used[port] = int(row["bandwidth_used"] or 0)
+        return desired, used
+
+    def reconcile(self, force=False):
+        """DB ပြောင်းလဲမှုရှိပါက kernel state ကို desired state နှင့် ကိုက်အောင် ပြင်သည်။ ပြင်ခဲ့သော commands အရေအတွက်ကို ပြန်ပေးသည်။"""
+        db = self.get_db()
+        try:
+            version = db.execute("PRAGMA data_version").fetchone()[0]
+            if not force and self.applied is not None and version == self.data_version:
+                return 0
+            start = time.perf_counter()
+            suspended = self.suspend_exhausted(db)
+            desired, used = self.desired_state(db)
+        finally:
+            db.close()
+
+        if suspended:
+            # Suspend လုပ်လိုက်သော users ၏ passwords များကို config.json ထဲမှ ဖယ်ရှားသည်။
+            self.config_syncer.sync_now()
+
+        reset = [port for port, value in used.items() if value < self.used.get(port, 0)]
+        cmds = plan(self.applied, desired, used, reset)
+        if cmds:
+            try:
+                self.runner("\n".join(cmds) + "\n")
+            except Exception:
+                # Kernel state မသေချာတော့သဖြင့် နောက်တစ်ကြိမ်တွင် table ကို ပြန်ဆောက်သည်။
+                self.applied = None
+                raise
+        self.applied = desired
+        self.used = used
+        self.data_version = version
+        self.last_stats = {'ports': len(desired), 'commands': len(cmds), 'suspended': len(suspended),
+                           'seconds': time.perf_counter() - start}
+        return len(cmds)
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+        print(f"Traffic shaping started (every {self.interval:g}s).")
+
+    def _loop(self):
+        while True:
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Traffic shaping error: {e}")
+            time.sleep(self.interval)
+
+    def remove(self):
+        """Shaping table ကို ဖျက်သည် (TRAFFIC_SHAPING ပိတ်လိုက်သည့်အခါ)။"""
+        self.runner(f"table {NFT_TABLE}\ndelete table {NFT_TABLE}\n")
+        self.applied = None
+
+if __name__ == "__main__":
+    import sys
+    controller = ShapingController()
+    if "--remove" in sys.argv:
+        controller.remove()
+    elif "--dry-run" in sys.argv:
+        controller.runner = print
+        controller.reconcile(force=True)
+    else:
+        print(f"{controller.reconcile(force=True)} nft commands applied.")
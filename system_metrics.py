@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+ZIVPN system metrics sampler
+/proc/loadavg, /proc/meminfo, /proc/stat နှင့် os.statvfs ကို process အတွင်းမှ တိုက်ရိုက်ဖတ်သည် (shell pipelines မသုံးပါ)။
+Background interval ဖြင့် sample ယူပြီး နောက်ဆုံး samples များကို ring buffer ထဲ သိမ်းထားသဖြင့်
+Web panel က CPU/RAM/Disk trends များကို ပြသနိုင်သည်။
+"""
+
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+SAMPLE_INTERVAL = float(os.environ.get("SYSTEM_METRICS_INTERVAL", "5"))
+# 5 စက္ကန့် interval ဖြင့် ၁ နာရီစာ
+HISTORY_SIZE = int(os.environ.get("SYSTEM_METRICS_HISTORY", "720"))
+DISK_PATH = "/"
+
+Sample = namedtuple("Sample", "ts load1 load5 load15 cpu_percent mem_total mem_used "
+                              "swap_total swap_used disk_total disk_used disk_avail")
+
+def read_loadavg(path="/proc/loadavg"):
+    with open(path) as f:
+        parts = f.read().split()
+    return float(parts[0]), float(parts[1]), float(parts[2])
+
+def read_meminfo(path="/proc/meminfo"):
+    """/proc/meminfo ကို {key: bytes} အဖြစ် ပြန်ပေးသည်။"""
+    info = {}
+    with open(path) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            fields = rest.split()
+            if fields:
+                info[key] = int(fields[0]) * (1024 if len(fields) > 1 else 1)
+    return info
+
+def read_cpu_times(path="/proc/stat"):
+    """Aggregate 'cpu' line မှ (busy, total) jiffies"""
+    with open(path) as f:
+        fields = f.readline().split()
+    values = [int(v) for v in fields[1:]]
+    # user nice system idle iowait irq softirq steal (guest များသည် user ထဲတွင် ပါပြီးသား)
+    values = values[:8]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    total = sum(values)
+    return total - idle, total
+
+def read_disk(path=DISK_PATH):
+    """(total, used, avail) bytes - df ကဲ့သို့ avail သည် root reserved blocks များကို မပါဝင်ပါ။"""
+    st = os.statvfs(path)
+    total = st.f_blocks * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    return total, used, st.f_bavail * st.f_frsize
+
+def percent(used, total):
+    return round(used / total * 100, 1) if total > 0 else 0
+
+def disk_percent(sample):
+    """df ၏ Use% နှင့် တူသည် (used / (used + avail))"""
+    return percent(sample.disk_used, sample.disk_used + sample.disk_avail)
+
+class MetricsSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL, history=HISTORY_SIZE, disk_path=DISK_PATH):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.samples = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.prev_cpu = None
+        self.thread = None
+
+    def sample_once(self):
+        """Sample တစ်ခုယူပြီး ring buffer ထဲ ထည့်သည်။ ဖတ်မရသော source များကို 0 အဖြစ် မှတ်သည်။"""
+        try:
+            load1, load5, load15 = read_loadavg()
+        except (OSError, ValueError, IndexError):
+            load1 = load5 = load15 = 0.0
+
+        cpu_percent = 0.0
+        try:
+            busy, total = read_cpu_times()
+            with self.lock:
+                prev, self.prev_cpu = self.prev_cpu, (busy, total)
+            if prev and total > prev[1]:
+                cpu_percent = round((busy - prev[0]) / (total - prev[1]) * 100, 1)
+        except (OSError, ValueError, IndexError):
+            pass
+
+        try:
+            mem = read_meminfo()
+            mem_total = mem.get("MemTotal", 0)
+            # free(1) ကဲ့သို့ used = total - available
+            mem_used = mem_total - mem.get("MemAvailable", mem.get("MemFree", 0))
+            swap_total = mem.get("SwapTotal", 0)
+            swap_used = swap_total - mem.get("SwapFree", 0)
+        except (OSError, ValueError):
+            mem_total = mem_used = swap_total = swap_used = 0
+
+        try:
+            disk_total, disk_used, disk_avail = read_disk(self.disk_path)
+        except OSError:
+            disk_total = disk_used = disk_avail = 0
+
+        sample = Sample(time.time(), load1, load5, load15, cpu_percent, mem_total, mem_used,
+                        swap_total, swap_used, disk_total, disk_used, disk_avail)
+        with self.lock:
+            self.samples.append(sample)
+        return sample
+
+    def latest(self):
+        with self.lock:
+            if self.samples:
+                return self.samples[-1]
+        return self.sample_once()
+
+    def history(self, limit=None):
+        with self.lock:
+            samples = list(self.samples)
+        return samples[-limit:] if limit else samples
+
+    def start(self):
+        """Background sampling thread ကို စတင်သည် (ထပ်ခေါ်လျှင် thread အသစ် မဖွင့်ပါ)။"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.sample_once()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"SYSTEM METRICS ERROR: {e}")
+
+if __name__ == "__main__":
+    sampler = MetricsSampler()
+    sampler.sample_once()
+    time.sleep(1)
+    print(sampler.sample_once())
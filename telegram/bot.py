@@ -5,12 +5,19 @@ Downloaded from: https://github.com/zivpn/web-panel/main/telegram/bot.py
 """
 
 import telegram
+from telegram.error import NetworkError, RetryAfter, TelegramError
 from telegram.ext import Application, CommandHandler
-import sqlite3
+import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
+import database
+import migrations
+import notifications
 
 # Configure logging
 logging.basicConfig(
@@ -33,14 +40,26 @@ except Exception as e:
 # Configuration
 DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
+# polling: getUpdates long polling | webhook: local listener (reverse proxy / tunnel ၏ နောက်တွင် ထားရန်)
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+POLL_INTERVAL = float(os.environ.get("BOT_POLL_INTERVAL", "1.0"))
+WEBHOOK_LISTEN = os.environ.get("BOT_WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("BOT_WEBHOOK_PORT", "8443"))
+WEBHOOK_URL = os.environ.get("BOT_WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.environ.get("BOT_WEBHOOK_SECRET", "")
+CACHE_TTL = float(os.environ.get("BOT_CACHE_TTL", "30"))
+CACHE_SIZE = 256
+# Notifications ပို့မည့် admin chat IDs (comma ခြား)။ /start ၏ reply တွင် chat ID ကို ပြသည်။
+ADMIN_CHAT_IDS = [c.strip() for c in os.environ.get("TELEGRAM_ADMIN_CHAT_IDS", "").split(",") if c.strip()]
+NOTIFY_INTERVAL = float(os.environ.get("NOTIFY_INTERVAL", "30"))
+# Telegram: chat တစ်ခုသို့ 1 msg/s ခန့်သာ ပို့သင့်သည်။
+SEND_DELAY = 1.1
 
 # --- Utility Functions (These can remain sync as they don't block I/O) ---
 
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get pooled database connection (WAL mode, shared with web panel / API)"""
+    return database.get_db(DATABASE_PATH)
 
 def format_bytes(size):
     """Format bytes to human readable format"""
@@ -52,6 +71,140 @@ def format_bytes(size):
         n += 1
     return f"{size:.2f} {power_labels[n]}B"
 
+# --- Data Access (event loop အပြင်ဘက် DB thread တွင် run သည်) ---
+
+class QueryCache:
+    """
+    Query ရလဒ်များကို TTL ဖြင့် cache လုပ်သည်။ DB thread တစ်ခုတည်းမှသာ ခေါ်သဖြင့် lock မလိုပါ။
+    Web panel / API / Connection Manager တို့က DB ကို ရေးလိုက်ပါက (PRAGMA data_version ပြောင်းသည်)
+    cache အားလုံးကို ချက်ချင်း ရှင်းသည်။
+    """
+
+    def __init__(self, ttl=CACHE_TTL, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, key, query, *args):
+        db = get_db()
+        try:
+            version = db.execute("PRAGMA data_version").fetchone()[0]
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            now = time.monotonic()
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+            value = query(db, *args)
+            self.entries[key] = (now + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            return value
+        finally:
+            db.close()
+
+db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-db")
+query_cache = QueryCache()
+
+async def cached_query(key, query, *args):
+    """query(db, *args) ကို DB thread တွင် (cache ဖြင့်) run ပြီး event loop ကို မပိတ်ဆို့ပါ။"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, query_cache.fetch, key, query, *args)
+
+def query_stats(db):
+    """Users table ကို scan တစ်ကြိမ်တည်းဖြင့် stats (today's new users ပါ)"""
+    row = db.execute('''
+        SELECT 
+            COUNT(*) as total_users,
+            SUM(CASE WHEN status = "active" AND (expires IS NULL OR expires >= date('now', 'localtime')) THEN 1 ELSE 0 END) as active_users,
+            SUM(bandwidth_used) as total_bandwidth,
+            SUM(CASE WHEN created_at >= date('now') THEN 1 ELSE 0 END) as today_users
+        FROM users
+    ''').fetchone()
+    return dict(row)
+
+def query_recent_users(db, limit=20):
+    # id (rowid) အစဉ်သည် created_at အစဉ်နှင့် တူပြီး sort မလိုပါ။
+    return [dict(u) for u in db.execute('''
+        SELECT username, status, expires, bandwidth_used, concurrent_conn
+        FROM users 
+        ORDER BY id DESC 
+        LIMIT ?
+    ''', (limit,)).fetchall()]
+
+def query_user(db, username):
+    user = db.execute('''
+        SELECT username, status, expires, bandwidth_used, bandwidth_limit,
+                speed_limit_up, concurrent_conn, created_at
+        FROM users WHERE username = ?
+    ''', (username,)).fetchone()
+    return dict(user) if user else None
+
+# --- Notification Dispatcher ---
+
+def fetch_notifications():
+    db = get_db()
+    try:
+        return notifications.coalesce(notifications.pending(db))
+    finally:
+        db.close()
+
+def mark_notifications_delivered(ids):
+    db = get_db()
+    try:
+        notifications.mark_delivered(db, ids)
+    finally:
+        db.close()
+
+async def send_to_admins(bot, text):
+    """Admin chats အားလုံးသို့ ပို့သည်။ RetryAfter ဆိုလျှင် Telegram ပြောသည့်အတိုင်း စောင့်ပြီး ပြန်ပို့သည်။"""
+    for chat_id in ADMIN_CHAT_IDS:
+        while True:
+            try:
+                await bot.send_message(chat_id=chat_id, text=text)
+                break
+            except RetryAfter as e:
+                delay = e.retry_after
+                await asyncio.sleep(delay.total_seconds() if hasattr(delay, "total_seconds") else delay)
+            except NetworkError:
+                raise
+            except TelegramError as e:
+                # Chat မရှိ / bot ကို block ထားခြင်း စသည် - ပြန်ပို့၍ မရနိုင်သဖြင့် ကျော်သည်။
+                logger.warning(f"Cannot notify chat {chat_id}: {e}")
+                break
+        await asyncio.sleep(SEND_DELAY)
+
+async def dispatch_notifications(application):
+    """Undelivered notifications များကို type အလိုက် ပေါင်း၍ ပို့ပြီး delivered ဟု မှတ်သည်။"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            messages = await loop.run_in_executor(db_executor, fetch_notifications)
+            for ids, text in messages:
+                await send_to_admins(application.bot, text)
+                await loop.run_in_executor(db_executor, mark_notifications_delivered, ids)
+        except NetworkError as e:
+            # မပို့ရသေးသော rows များသည် undelivered အတိုင်း ကျန်ပြီး နောက် round တွင် ပြန်ပို့မည်။
+            logger.warning(f"Notification dispatch paused: {e}")
+        except Exception as e:
+            logger.error(f"Notification dispatch error: {e}")
+        await asyncio.sleep(NOTIFY_INTERVAL)
+
+async def start_dispatcher(application):
+    if not ADMIN_CHAT_IDS:
+        logger.info("TELEGRAM_ADMIN_CHAT_IDS not set, push notifications disabled")
+        return
+    application.create_task(dispatch_notifications(application))
+    logger.info(f"🔔 Notification dispatcher started ({len(ADMIN_CHAT_IDS)} chats, every {NOTIFY_INTERVAL:g}s)")
+
 # --- Command Handlers (Converted to async def) ---
 
 async def start(update, context):
@@ -72,7 +225,9 @@ async def start(update, context):
 /users - အသုံးပြုသူအားလုံးကိုပြပါ
 /myinfo <username> - အသုံးပြုသူအချက်အလက်ရယူရန်
 /help - အကူအညီစာကိုပြပါ
-    """
+
+Chat ID: `{chat_id}`
+    """.format(chat_id=update.effective_chat.id)
     await update.message.reply_text(welcome_text, parse_mode='Markdown')
 
 async def help_command(update, context):
@@ -96,28 +251,13 @@ async def help_command(update, context):
 
 async def stats_command(update, context):
     """Show server statistics"""
-    db = get_db()
     try:
-        # Get total statistics (Database calls are sync and fast, so we don't await)
-        stats = db.execute('''
-            SELECT 
-                COUNT(*) as total_users,
-                SUM(CASE WHEN status = "active" AND (expires IS NULL OR expires >= date('now')) THEN 1 ELSE 0 END) as active_users,
-                SUM(bandwidth_used) as total_bandwidth
-            FROM users
-        ''').fetchone()
-
-        # Get today's new users
-        today_users = db.execute('''
-            SELECT COUNT(*) as today_users 
-            FROM users 
-            WHERE date(created_at) = date('now')
-        ''').fetchone()
+        stats = await cached_query("stats", query_stats)
 
         total_users = stats['total_users'] or 0
         active_users = stats['active_users'] or 0
         total_bandwidth = stats['total_bandwidth'] or 0
-        today_new_users = today_users['today_users'] or 0
+        today_new_users = stats['today_users'] or 0
 
         stats_text = f"""
 📊 *Server Statistics*
@@ -140,19 +280,11 @@ async def stats_command(update, context):
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         await update.message.reply_text("❌ Error retrieving statistics") # Await I/O call
-    finally:
-        db.close()
 
 async def users_command(update, context):
     """List all users"""
-    db = get_db()
     try:
-        users = db.execute('''
-            SELECT username, status, expires, bandwidth_used, concurrent_conn
-            FROM users 
-            ORDER BY created_at DESC 
-            LIMIT 20
-        ''').fetchall()
+        users = await cached_query("recent_users", query_recent_users)
 
         if not users:
             await update.message.reply_text("📭 No users found") # Await I/O call
@@ -178,8 +310,6 @@ async def users_command(update, context):
     except Exception as e:
         logger.error(f"Error getting users: {e}")
         await update.message.reply_text("❌ Error retrieving users list") # Await I/O call
-    finally:
-        db.close()
 
 async def myinfo_command(update, context):
     """Get user information"""
@@ -188,13 +318,8 @@ async def myinfo_command(update, context):
         return
 
     username = context.args[0]
-    db = get_db()
     try:
-        user = db.execute('''
-            SELECT username, status, expires, bandwidth_used, bandwidth_limit,
-                    speed_limit_up, concurrent_conn, created_at
-            FROM users WHERE username = ?
-        ''', (username,)).fetchone()
+        user = await cached_query(("user", username), query_user, username)
 
         if not user:
             await update.message.reply_text(f"❌ User '{username}' not found") # Await I/O call
@@ -238,8 +363,6 @@ async def myinfo_command(update, context):
     except Exception as e:
         logger.error(f"Error getting user info: {e}")
         await update.message.reply_text("❌ Error retrieving user information") # Await I/O call
-    finally:
-        db.close()
 
 async def error_handler(update, context):
     """Log errors. MUST be async in PTB v20+."""
@@ -261,9 +384,12 @@ def main():
         logger.error("❌ TELEGRAM_BOT_TOKEN not set in environment variables or /etc/zivpn/web.env")
         return
 
+    # Schema migrations (process startup တွင် တစ်ကြိမ်သာ)
+    migrations.run(DATABASE_PATH)
+
     try:
         # Create Application instance using the builder pattern
-        application = Application.builder().token(BOT_TOKEN).build()
+        application = Application.builder().token(BOT_TOKEN).post_init(start_dispatcher).build()
 
         # Add command handlers
         application.add_handler(CommandHandler("start", start))
@@ -276,9 +402,21 @@ def main():
         application.add_error_handler(error_handler)
 
         # Start the bot
-        logger.info("🤖 ZIVPN Telegram Bot Started Successfully")
-        
-        application.run_polling(poll_interval=1.0) 
+        if BOT_MODE == "webhook":
+            if not WEBHOOK_URL:
+                logger.error("❌ BOT_MODE=webhook requires BOT_WEBHOOK_URL (public https URL)")
+                return
+            logger.info(f"🤖 ZIVPN Telegram Bot Started Successfully (webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT})")
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path="telegram",
+                webhook_url=WEBHOOK_URL.rstrip("/") + "/telegram",
+                secret_token=WEBHOOK_SECRET or None,
+            )
+        else:
+            logger.info("🤖 ZIVPN Telegram Bot Started Successfully")
+            application.run_polling(poll_interval=POLL_INTERVAL)
 
     except Exception as e:
         logger.error(f"Failed to start bot: {e}")
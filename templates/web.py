@@ -1,13 +1,28 @@
 #!/usr/bin/env python3
 """
-ZIVPN Enterprise Web Panel - Remote HTML Template Edition (Fixed Internal Server Error)
+ZIVPN Enterprise Web Panel - Cached HTML Template Edition
 Added database migration logic to ensure the 'hwid' column exists.
+HTML template is loaded from disk and compiled once at startup (optional GitHub refresh).
 """
 
-from flask import Flask, jsonify, render_template_string, request, redirect, url_for, session, make_response, g
-import json, re, subprocess, os, tempfile, hmac, sqlite3, datetime
-from datetime import datetime, timedelta
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, session, g
+import json, re, os, tempfile, threading, time, hmac, datetime, base64, queue, csv
+from collections import namedtuple
+from datetime import date, datetime, timedelta
 import requests
+from conntrack import SnapshotCache
+from config_sync import ConfigSyncer
+from system_metrics import MetricsSampler, percent, disk_percent
+import database
+import migrations
+import rollups
+import shaping
+import bulk
+import user_io
+import ports
+import fleet
+import expiry
+import metrics
 
 # Configuration
 USERS_FILE = "/etc/zivpn/users.json"
@@ -39,16 +54,24 @@ TRANSLATIONS = {
         'required_fields': 'User and Password are required',
         'invalid_exp': 'Invalid Expires format',
         'invalid_port': 'Port range must be 6000-19999',
+        'port_taken': 'Port {port} is already used by {user}',
+        'no_free_port': f'No free port left ({ports.PORT_MIN}-{ports.PORT_MAX}); delete unused users first',
+        'fleet': 'Fleet', 'fleet_nodes': 'Nodes', 'fleet_users': 'Fleet Users', 'node': 'Node',
+        'node_name': 'Node Name', 'node_url': 'API URL (http://IP:8081)', 'node_token': 'API Token',
+        'add_node': 'Add Node', 'auto_node': 'Auto (least loaded)', 'nodes_up': 'Nodes Up',
         'delete_confirm': 'Are you sure you want to delete {user}?',
         'deleted': 'Deleted: {user}', 'success_save': 'User saved successfully',
         'select_action': 'Select Action', 'extend_exp': 'Extend Expiry (+7 days)',
         'suspend_users': 'Suspend Users', 'activate_users': 'Activate Users',
         'delete_users': 'Delete Users', 'execute': 'Execute',
+        'set_limits': 'Set Limits', 'set_expiry': 'Set Expiry Date', 'bulk_not_found': 'Not found',
         'user_search': 'Search users (User/HWID)...', 'search': 'Search',
         'export_csv': 'Export Users CSV', 'import_users': 'Import Users',
+        'dry_run': 'Dry run (validate only)', 'import_result': 'Inserted: {inserted}, Updated: {updated}, Errors: {errors}',
         'bulk_success': 'Bulk action {action} completed',
         'report_range': 'Date Range Required', 'report_bw': 'Bandwidth Usage',
         'report_users': 'User Activity', 'report_revenue': 'Revenue',
+        'report_traffic': 'Traffic Over Time', 'report_server': 'Server History',
         'home': 'Home', 'manage': 'Manage Users', 'settings': 'Settings',
         'dashboard': 'Dashboard', 'system_status': 'System Status',
         'quick_actions': 'Quick Actions', 'recent_activity': 'Recent Activity',
@@ -56,7 +79,11 @@ TRANSLATIONS = {
         'active_connections': 'Active Connections',
         'save_login': 'Save Login (14 Days)',
         'hwid': 'HWID (Hardware ID)',
-        'cpu': 'CPU Load', 'ram': 'RAM Usage', 'swap': 'Swap Usage', 'disk': 'Disk Used'
+        'cpu': 'CPU Load', 'ram': 'RAM Usage', 'swap': 'Swap Usage', 'disk': 'Disk Used',
+        'snapshot_age': 'Connection status updated {age}s ago',
+        'all_users': 'All', 'filter_active': 'Active', 'sort_newest': 'Newest first',
+        'next_page': 'Next', 'first_page': 'First page',
+        'users_shown': 'Showing {count} of {total} users'
     },
     'my': {
         'title': 'ZIVPN စီမံခန့်ခွဲမှု Panel', 'login_title': 'ZIVPN Panel ဝင်ရန်',
@@ -75,16 +102,24 @@ TRANSLATIONS = {
         'required_fields': 'အသုံးပြုသူအမည်နှင့် စကားဝှက် လိုအပ်သည်',
         'invalid_exp': 'သက်တမ်းကုန်ဆုံးရက်ပုံစံ မမှန်ကန်ပါ',
         'invalid_port': 'Port အကွာအဝေး 6000-19999 သာ ဖြစ်ရမည်',
+        'port_taken': 'Port {port} ကို {user} သုံးနေပြီး ဖြစ်သည်',
+        'no_free_port': f'အသုံးပြုနိုင်သော port ({ports.PORT_MIN}-{ports.PORT_MAX}) မကျန်တော့ပါ၊ မသုံးတော့သော users များကို အရင်ဖျက်ပါ',
+        'fleet': 'Fleet', 'fleet_nodes': 'Servers (Nodes)', 'fleet_users': 'Server အားလုံးမှ အသုံးပြုသူများ', 'node': 'Node',
+        'node_name': 'Node အမည်', 'node_url': 'API URL (http://IP:8081)', 'node_token': 'API Token',
+        'add_node': 'Node ထည့်မည်', 'auto_node': 'အလိုအလျောက် (Load အနည်းဆုံး)', 'nodes_up': 'အလုပ်လုပ်နေသော Nodes',
         'delete_confirm': '{user} ကို ဖျက်ရန် သေချာပါသလား?',
         'deleted': 'ဖျက်လိုက်သည်: {user}', 'success_save': 'အသုံးပြုသူကို အောင်မြင်စွာ သိမ်းဆည်းလိုက်သည်',
         'select_action': 'လုပ်ဆောင်ချက် ရွေးပါ', 'extend_exp': 'သက်တမ်းတိုးမည် (+၇ ရက်)',
         'suspend_users': 'အသုံးပြုသူများ ဆိုင်းငံ့မည်', 'activate_users': 'အသုံးပြုသူများ ဖွင့်မည်',
         'delete_users': 'အသုံးပြုသူများ ဖျက်မည်', 'execute': 'စတင်လုပ်ဆောင်မည်',
+        'set_limits': 'ကန့်သတ်ချက်များ သတ်မှတ်မည်', 'set_expiry': 'သက်တမ်းကုန်ရက် သတ်မှတ်မည်', 'bulk_not_found': 'မတွေ့ပါ',
         'user_search': 'အသုံးပြုသူ / HWID ရှာဖွေပါ...', 'search': 'ရှာဖွေပါ',
         'export_csv': 'အသုံးပြုသူများ CSV ထုတ်ယူမည်', 'import_users': 'အသုံးပြုသူများ ထည့်သွင်းမည်',
+        'dry_run': 'စစ်ဆေးရုံသာ (Dry run)', 'import_result': 'အသစ်: {inserted}, ပြင်ဆင်: {updated}, အမှား: {errors}',
         'bulk_success': 'အစုလိုက် လုပ်ဆောင်ချက် {action} ပြီးမြောက်ပါပြီ',
         'report_range': 'ရက်စွဲ အပိုင်းအခြား လိုအပ်သည်', 'report_bw': 'Bandwidth အသုံးပြုမှု',
         'report_users': 'အသုံးပြုသူ လှုပ်ရှားမှု', 'report_revenue': 'ဝင်ငွေ',
+        'report_traffic': 'အချိန်အလိုက် Traffic', 'report_server': 'Server မှတ်တမ်း',
         'home': 'ပင်မစာမျက်နှာ', 'manage': 'အသုံးပြုသူများ စီမံခန့်ခွဲမှု',
         'settings': 'ချိန်ညှိချက်များ', 'dashboard': 'ပင်မစာမျက်နှာ',
         'system_status': 'စနစ်အခြေအနေ', 'quick_actions': 'အမြန်လုပ်ဆောင်ချက်များ',
@@ -92,22 +127,98 @@ TRANSLATIONS = {
         'vpn_status': 'VPN အခြေအနေ', 'active_connections': 'တက်ကြွလင့်ချိတ်ဆက်မှုများ',
         'save_login': 'လော့ဂ်အင် အချက်အလက် သိမ်းမည် (၁၄ ရက်)',
         'hwid': 'HWID (ဟာ့ဒ်ဝဲလ် အမှတ်အသား)',
-        'cpu': 'CPU ဝန်ပမာဏ', 'ram': 'RAM အသုံးပြုမှု', 'swap': 'Swap အသုံးပြုမှု', 'disk': 'Disk အသုံးပြုမှု'
+        'cpu': 'CPU ဝန်ပမာဏ', 'ram': 'RAM အသုံးပြုမှု', 'swap': 'Swap အသုံးပြုမှု', 'disk': 'Disk အသုံးပြုမှု',
+        'snapshot_age': 'ချိတ်ဆက်မှု အခြေအနေ - {age} စက္ကန့် အရင်က မွမ်းမံထားသည်',
+        'all_users': 'အားလုံး', 'filter_active': 'သက်တမ်းရှိ', 'sort_newest': 'အသစ်ဆုံး အရင်',
+        'next_page': 'နောက်တစ်မျက်နှာ', 'first_page': 'ပထမ စာမျက်နှာ',
+        'users_shown': 'အသုံးပြုသူ {total} ဦးအနက် {count} ဦး ပြသထားသည်'
     }
 }
 
-def load_html_template():
-    """HTML Template ကို GitHub မှ ဒေါင်းလုပ်ဆွဲသည်။ ချိတ်ဆက်မှု မရပါက အမှားပြမည်။"""
+class TemplateStore:
+    """
+    index.html ကို startup တွင် disk မှ တစ်ကြိမ်ဖတ်ပြီး Jinja template အဖြစ် compile လုပ်ထားသည်။
+    refresh_seconds > 0 ဖြစ်ပါက GitHub မှ ETag/If-Modified-Since ဖြင့် background တွင် update စစ်ပြီး
+    fetch မရပါက နောက်ဆုံးအောင်မြင်ခဲ့သော copy ကိုသာ ဆက်သုံးသည်။
+    """
+
+    def __init__(self, path, url, refresh_seconds=0):
+        self.path = path
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.template = None
+        self.etag = None
+        self.last_modified = None
+        self.error = None
+
+    def load(self, env):
+        self.env = env
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.template = env.from_string(f.read())
+        except OSError as e:
+            # Local copy မရှိသေးပါက (install အဟောင်း) GitHub မှ တစ်ကြိမ် ဒေါင်းလုပ်ဆွဲသည်။
+            print(f"Template {self.path} ကို ဖတ်မရပါ ({e}) - GitHub မှ fetch လုပ်ပါမည်။")
+            self.refresh_remote()
+        if self.refresh_seconds > 0:
+            threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def get(self):
+        if self.template is None:
+            raise RuntimeError(f"Could not load HTML template from {self.path} or {self.url}: {self.error}")
+        return self.template
+
+    def refresh_remote(self):
+        headers = {}
+        if self.etag: headers["If-None-Match"] = self.etag
+        if self.last_modified: headers["If-Modified-Since"] = self.last_modified
+        try:
+            response = requests.get(self.url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            template = self.env.from_string(response.text)  # Compile မအောင်မြင်ပါက copy ဟောင်းကို ထားမည်။
+        except Exception as e:
+            self.error = e
+            print(f"ERROR: HTML template ကို GitHub မှ fetch လုပ်မရပါ: {e}")
+            return False
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        try:
+            write_text_atomic(self.path, response.text)
+        except OSError as e:
+            print(f"WARNING: Template ကို {self.path} သို့ သိမ်းမရပါ: {e}")
+        self.template = template
+        return True
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            if self.refresh_remote():
+                print("Template updated from GitHub.")
+
+def write_text_atomic(path, text):
+    fd,tmp=tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
     try:
-        response = requests.get(f"{HTML_TEMPLATE_URL}?t={datetime.now().timestamp()}", timeout=10)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        return response.text
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: HTML template ကို GitHub မှ fetch လုပ်မရပါ: {e}")
-        # Server ကို crash ခိုင်းလိုက်ပါသည်၊ အဘယ်ကြောင့်ဆိုသော် template သည် မဖြစ်မနေလိုအပ်ပါသည်။
-        raise RuntimeError(f"Could not fetch HTML template from {HTML_TEMPLATE_URL}: {e}")
-
-app = Flask(__name__)
+        with os.fdopen(fd,"w",encoding="utf-8") as f: f.write(text)
+        os.replace(tmp,path)
+    finally:
+        try: os.remove(tmp)
+        except: pass
+
+def default_template_dir():
+    """Install layout: /etc/zivpn/templates/index.html, Repo layout: templates/web.py နှင့် index.html တစ်နေရာတည်း"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    nested = os.path.join(here, "templates")
+    return nested if os.path.isdir(nested) else here
+
+TEMPLATE_DIR = os.environ.get("TEMPLATE_DIR") or default_template_dir()
+TEMPLATE_REFRESH_SECONDS = int(os.environ.get("TEMPLATE_REFRESH_SECONDS", "0"))
+template_store = TemplateStore(os.path.join(TEMPLATE_DIR, "index.html"), HTML_TEMPLATE_URL, TEMPLATE_REFRESH_SECONDS)
+
+app = Flask(__name__, template_folder=TEMPLATE_DIR)
+template_store.load(app.jinja_env)
+metrics.instrument_flask(app)
 app.secret_key = os.environ.get("WEB_SECRET","dev-secret-change-me")
 ADMIN_USER = os.environ.get("WEB_ADMIN_USER","").strip()
 ADMIN_PASS = os.environ.get("WEB_ADMIN_PASSWORD","").strip()
@@ -116,34 +227,19 @@ DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
 # Permanent sessions (14 days)
 app.permanent_session_lifetime = timedelta(days=14)
 
-# --- Database Migration Function ---
+# CPU/RAM/Swap/Disk ကို background တွင် sample ယူပြီး ring buffer ထဲ သိမ်းသည် (page load တိုင်း shell-out မလုပ်ပါ)။
+system_sampler = MetricsSampler()
+system_sampler.start()
 
-def check_and_migrate_db(conn):
-    """'users' table တွင် လိုအပ်သည့် 'hwid' column ရှိမရှိ စစ်ဆေးပြီး မရှိပါက ထည့်သွင်းသည်။"""
-    cursor = conn.cursor()
-    
-    # Check for 'hwid' column
-    cursor.execute("PRAGMA table_info(users)")
-    columns = [row[1] for row in cursor.fetchall()]
-    
-    if 'hwid' not in columns:
-        print("MIGRATION: 'hwid' column မတွေ့ပါ။ ယခု ထည့်သွင်းပါမည်။")
-        try:
-            # Add 'hwid' column with default empty string
-            cursor.execute("ALTER TABLE users ADD COLUMN hwid TEXT DEFAULT ''")
-            conn.commit()
-            print("MIGRATION: 'hwid' column အောင်မြင်စွာ ထည့်သွင်းပြီးပါပြီ။")
-        except sqlite3.OperationalError as e:
-            print(f"MIGRATION ERROR: hwid column ထည့်သွင်းရာတွင် အမှား: {e}")
+# --- Database Migration (process startup တွင် တစ်ကြိမ်သာ) ---
+
+migrations.run(DATABASE_PATH)
 
 # --- Utility Functions ---
 
 def get_db():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    # အရင်ဆုံး DB Migration ကို စစ်ဆေးသည်။
-    check_and_migrate_db(conn) 
-    return conn
+    # Thread တစ်ခုလျှင် WAL-mode pooled connection တစ်ခုကို ပြန်သုံးသည်။
+    return database.get_db(DATABASE_PATH)
 
 def read_json(path, default):
     try:
@@ -151,50 +247,52 @@ def read_json(path, default):
     except Exception:
         return default
 
-def write_json_atomic(path, data):
-    d=json.dumps(data, ensure_ascii=False, indent=2)
-    dirn=os.path.dirname(path); fd,tmp=tempfile.mkstemp(prefix=".tmp-", dir=dirn)
-    try:
-        with os.fdopen(fd,"w") as f: f.write(d)
-        os.replace(tmp,path)
-    finally:
-        try: os.remove(tmp)
-        except: pass
-
-def load_users():
-    db = get_db()
-    users = db.execute('''
-        SELECT username as user, password, expires, port, status, 
-               bandwidth_limit, bandwidth_used, speed_limit_up as speed_limit,
-               concurrent_conn, hwid
-        FROM users
-    ''').fetchall()
-    db.close()
-    return [dict(u) for u in users]
-
 def save_user(user_data):
+    """
+    User ကို upsert လုပ်ပြီး port ကို ပြန်ပေးသည်။ Port မပါပါက (user ဟောင်း၏ port ကို ထားပြီး) free-list မှ
+    insert နှင့် transaction တစ်ခုတည်းအတွင်း ချပေးသည်။ Port ကို အခြား user သုံးနေပါက ports.PortInUse၊
+    free port မကျန်တော့ပါက (user ကို မသိမ်းဘဲ) ports.NoFreePort။
+    """
     db = get_db()
     try:
-        db.execute('''
-            INSERT OR REPLACE INTO users 
-            (username, password, expires, port, status, bandwidth_limit, speed_limit_up, concurrent_conn, hwid)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user_data['user'], user_data['password'], user_data.get('expires'),
-            user_data.get('port'), 'active', user_data.get('bandwidth_limit', 0),
-            user_data.get('speed_limit', 0), user_data.get('concurrent_conn', 1),
-            user_data.get('hwid', '')
-        ))
-        db.commit()
-        
-        if user_data.get('plan_type'):
-            expires = user_data.get('expires') or (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        with db.transaction():
+            port = user_data.get('port') or None
+            if port is None:
+                current = db.execute('SELECT port FROM users WHERE username = ?', (user_data['user'],)).fetchone()
+                port = current[0] if current and current[0] is not None else ports.allocate(db)
+                if port is None:
+                    raise ports.NoFreePort()
+            else:
+                owner = ports.owner(db, port)
+                if owner not in (None, user_data['user']):
+                    raise ports.PortInUse(port, owner)
             db.execute('''
-                INSERT INTO billing (username, plan_type, expires_at)
-                VALUES (?, ?, ?)
-            ''', (user_data['user'], user_data['plan_type'], expires))
-            db.commit()
-            
+                INSERT INTO users
+                (username, password, expires, port, status, bandwidth_limit, speed_limit_up, concurrent_conn, hwid)
+                VALUES (?, ?, ?, ?, 'active', ?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    password = excluded.password, expires = excluded.expires, port = excluded.port,
+                    bandwidth_used = CASE
+                        WHEN users.status = 'suspended'
+                             OR IFNULL(NULLIF(excluded.expires, ''), '9999-12-31')
+                                > IFNULL(NULLIF(users.expires, ''), '9999-12-31')
+                        THEN 0 ELSE users.bandwidth_used END,
+                    status = excluded.status, bandwidth_limit = excluded.bandwidth_limit,
+                    speed_limit_up = excluded.speed_limit_up, concurrent_conn = excluded.concurrent_conn,
+                    hwid = excluded.hwid, updated_at = CURRENT_TIMESTAMP
+            ''', (
+                user_data['user'], user_data['password'], user_data.get('expires'), port,
+                user_data.get('bandwidth_limit', 0), user_data.get('speed_limit', 0),
+                user_data.get('concurrent_conn', 1), user_data.get('hwid', '')
+            ))
+
+            if user_data.get('plan_type'):
+                expires = user_data.get('expires') or (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+                db.execute('''
+                    INSERT INTO billing (username, plan_type, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (user_data['user'], user_data['plan_type'], expires))
+        return port
     finally:
         db.close()
 
@@ -203,7 +301,7 @@ def delete_user(username):
     try:
         db.execute('DELETE FROM users WHERE username = ?', (username,))
         db.execute('DELETE FROM billing WHERE username = ?', (username,))
-        db.execute('DELETE FROM bandwidth_logs WHERE username = ?', (username,))
+        rollups.delete_user_usage(db, username)
         db.commit()
     finally:
         db.close()
@@ -213,11 +311,13 @@ def get_server_stats():
     try:
         total_users = db.execute('SELECT COUNT(*) FROM users').fetchone()[0]
         # Active users: status is 'active' AND (expires is NULL OR expires >= today)
-        active_users_db = db.execute('SELECT COUNT(*) FROM users WHERE status = "active" AND (expires IS NULL OR expires >= CURRENT_DATE)').fetchone()[0]
+        active_users_db = db.execute('''
+            SELECT COUNT(*) FROM users WHERE status = "active" AND (expires IS NULL OR expires >= date('now', 'localtime'))
+        ''').fetchone()[0]
         total_bandwidth = db.execute('SELECT SUM(bandwidth_used) FROM users').fetchone()[0] or 0
         
-        # Server Load သည် Active Users ပေါ် မူတည်၍ ခန့်မှန်းထားသည်။
-        server_load = min(100, (active_users_db * 5) + 10)
+        # Server Load: system sampler က /proc/stat မှ တိုင်းထားသော CPU %
+        server_load = system_sampler.latest().cpu_percent
         
         return {
             'total_users': total_users,
@@ -229,50 +329,38 @@ def get_server_stats():
         db.close()
 
 def get_system_stats():
-    """VPS ၏ CPU, RAM, Swap, Disk အချက်အလက်များကို ရယူသည်။ (3x-ui ပုံစံ)"""
-    stats = {}
-    
-    # 1. CPU Load (1-minute average from /proc/loadavg)
-    try:
-        load_avg = subprocess.run("cat /proc/loadavg", shell=True, capture_output=True, text=True, timeout=1).stdout.split()[0]
-        stats['cpu_load'] = f"{float(load_avg):.2f}"
-    except Exception:
-        stats['cpu_load'] = "N/A"
+    """VPS ၏ CPU, RAM, Swap, Disk အချက်အလက်များကို background sampler ၏ နောက်ဆုံး sample မှ ရယူသည်။ (3x-ui ပုံစံ)"""
+    s = system_sampler.latest()
+    mb = 1024 * 1024
+    gb = mb * 1024
+    return {
+        # 1. CPU Load (1-minute average from /proc/loadavg) + /proc/stat မှ CPU %
+        'cpu_load': f"{s.load1:.2f}",
+        'cpu_percent': f"{s.cpu_percent}%",
+        # 2. RAM Usage (free(1) ကဲ့သို့ used = total - available)
+        'ram_used': f"{s.mem_used // mb}M / {s.mem_total // mb}M ({percent(s.mem_used, s.mem_total)}%)" if s.mem_total else "N/A",
+        # 3. Swap Usage
+        'swap_used': f"{s.swap_used // mb}M / {s.swap_total // mb}M ({percent(s.swap_used, s.swap_total)}%)" if s.swap_total else "0M / 0M (0%)",
+        # 4. Disk Usage (Root partition /, df ၏ Use% အတိုင်း)
+        'disk_used': f"{s.disk_used / gb:.1f}G / {s.disk_total / gb:.1f}G ({disk_percent(s):.0f}%)" if s.disk_total else "N/A",
+    }
 
-    # 2. RAM Usage
-    try:
-        # total_kb, used_kb, free_kb
-        mem_info = subprocess.run("free -m | awk 'NR==2{print $2,$3,$4}'", shell=True, capture_output=True, text=True, timeout=1).stdout.split()
-        total_m = int(mem_info[0])
-        used_m = int(mem_info[1])
-        ram_percent = round((used_m / total_m) * 100, 1) if total_m > 0 else 0
-        stats['ram_used'] = f"{used_m}M / {total_m}M ({ram_percent}%)"
-    except Exception:
-        stats['ram_used'] = "N/A"
+def trend_points(values, width=100, height=24):
+    """Sparkline အတွက် SVG polyline points (values များကို 0-100 % scale ဖြင့် ဆွဲသည်)"""
+    if len(values) < 2:
+        return ""
+    step = width / (len(values) - 1)
+    return " ".join(f"{i * step:.1f},{height - min(max(v, 0), 100) / 100 * height:.1f}" for i, v in enumerate(values))
 
-    # 3. Swap Usage
-    try:
-        # total_kb, used_kb, free_kb
-        swap_info = subprocess.run("free -m | awk 'NR==3{print $2,$3,$4}'", shell=True, capture_output=True, text=True, timeout=1).stdout.split()
-        total_m = int(swap_info[0])
-        used_m = int(swap_info[1])
-        swap_percent = round((used_m / total_m) * 100, 1) if total_m > 0 else 0
-        stats['swap_used'] = f"{used_m}M / {total_m}M ({swap_percent}%)" if total_m > 0 else "0M / 0M (0%)"
-    except Exception:
-        stats['swap_used'] = "N/A"
-
-    # 4. Disk Usage (Root partition /)
-    try:
-        # total_g, used_g, percent
-        disk_info = subprocess.run("df -h / | awk 'NR==2{print $2,$3,$5}'", shell=True, capture_output=True, text=True, timeout=1).stdout.split()
-        total_g = disk_info[0]
-        used_g = disk_info[1]
-        percent = disk_info[2]
-        stats['disk_used'] = f"{used_g} / {total_g} ({percent})"
-    except Exception:
-        stats['disk_used'] = "N/A"
-        
-    return stats
+def get_system_trends(limit=120):
+    """နောက်ဆုံး samples များမှ CPU / RAM / Disk % trends"""
+    samples = system_sampler.history(limit)
+    return {
+        'cpu': trend_points([s.cpu_percent for s in samples]),
+        'ram': trend_points([percent(s.mem_used, s.mem_total) for s in samples]),
+        'swap': trend_points([percent(s.swap_used, s.swap_total) for s in samples]),
+        'disk': trend_points([disk_percent(s) for s in samples]),
+    }
 
 
 def get_listen_port_from_config():
@@ -281,35 +369,12 @@ def get_listen_port_from_config():
     m=re.search(r":(\d+)$", listen) if listen else None
     return (m.group(1) if m else LISTEN_FALLBACK)
 
-# FIX: Connection Status check logic - use grep -c for robust counting
-def has_recent_udp_activity(port):
-    """conntrack ကိုသုံးပြီး ပေးထားသော port တွင် connection ရှိမရှိ စစ်ဆေးသည်။"""
-    if not port: 
-        return False
-    try:
-        # Check if any connection entry exists for the specific dport
-        command = f"conntrack -L -p udp 2>/dev/null | grep -c 'dport={port}\\b'"
-        
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True, 
-            timeout=5 
-        )
-        
-        # result.stdout should contain the count (e.g., '1', '5', '0')
-        count = int(result.stdout.strip() or '0')
-        return count > 0
-
-    except Exception as e:
-        print(f"Error checking conntrack for port {port}: {e}")
-        # If any error occurs, default to Offline for safety
-        return False
+# Conntrack UDP table ကို request တစ်ခုလျှင် (သို့) TTL window တစ်ခုလျှင် တစ်ကြိမ်သာ dump လုပ်သည်။
+conntrack_snapshots = SnapshotCache()
 
-def status_for_user(u, listen_port):
+def status_for_user(u, listen_port, snapshot):
     """အသုံးပြုသူ၏ အခြေအနေ (Online/Offline/Expired/Suspended) ကို တွက်ချက်သည်။"""
-    port=str(u.get("port",""))
+    port=str(u.get("port") or "")
     check_port=port if port else listen_port
 
     if u.get('status') == 'suspended': return "suspended"
@@ -326,34 +391,247 @@ def status_for_user(u, listen_port):
 
     if is_expired: return "Expired"
 
-    # Connection ရှိမရှိ စစ်ဆေးပြီး Online/Offline ပြသသည်။
-    if has_recent_udp_activity(check_port): return "Online"
+    # Snapshot ထဲတွင် port ရှိမရှိ O(1) ဖြင့် စစ်ဆေးပြီး Online/Offline ပြသသည်။
+    if snapshot.is_online(check_port): return "Online"
     
     return "Offline"
 
-def sync_config_passwords(mode="mirror"):
-    """Active User များ၏ Password များကို ZIVPN config file ထဲသို့ ထည့်သွင်းပြီး service ကို restart လုပ်သည်။"""
+# --- User List (server-side pagination) ---
+
+# Template / JSON API အတွက် user တစ်ယောက်လျှင် view object (namedtuple ဖြစ်၍ __dict__ မရှိ၊ ပေါ့ပါးသည်)
+UserRow = namedtuple("UserRow", "user password expires port status bandwidth_limit bandwidth_used speed_limit concurrent_conn hwid")
+UserPage = namedtuple("UserPage", "users next_cursor total")
+
+USER_PAGE_SIZE = int(os.environ.get("USER_PAGE_SIZE", "50"))
+USER_PAGE_MAX = 500
+
+USER_COLUMNS = '''
+    username as user, password, expires, port, status,
+    bandwidth_limit, bandwidth_used, speed_limit_up as speed_limit,
+    concurrent_conn, hwid
+'''
+
+# sort -> keyset columns (migrations.py ၏ idx_users_sort_* expression indexes နှင့် တူရမည်)
+USER_SORTS = {
+    "user": ("username COLLATE NOCASE", "id"),
+    "port": ("IFNULL(port, 0)", "id"),
+    "expires": ("IFNULL(NULLIF(expires, ''), '9999-12-31')", "id"),
+    "created": ("id",),
+}
+
+# status_for_user() ၏ Suspended / Expired စည်းမျဉ်းများနှင့် တူသည်။ (Online/Offline ကို conntrack snapshot မှ တွက်သည်)
+USER_FILTERS = {
+    "all": "",
+    "active": "status != 'suspended' AND (IFNULL(expires, '') = '' OR expires >= date('now', 'localtime'))",
+    "expired": "status != 'suspended' AND IFNULL(expires, '') != '' AND expires < date('now', 'localtime')",
+    "suspended": "status = 'suspended'",
+}
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, sort):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(USER_SORTS[sort]):
+        raise ValueError("invalid cursor")
+    return values
+
+def user_list_args(args):
+    """Query string မှ user list parameters များကို စစ်ဆေးသည်။ မမှန်ပါက ValueError"""
+    sort = args.get("sort") or "user"
+    order = args.get("order") or "asc"
+    status = args.get("status") or "all"
+    if sort not in USER_SORTS: raise ValueError(f"invalid sort: {sort}")
+    if order not in ("asc", "desc"): raise ValueError(f"invalid order: {order}")
+    if status not in USER_FILTERS: raise ValueError(f"invalid status: {status}")
+    try:
+        limit = int(args.get("limit") or USER_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("invalid limit")
+    cursor = args.get("cursor") or None
+    return {
+        "search": (args.get("q") or "").strip(),
+        "status": status, "sort": sort, "order": order,
+        "limit": max(1, min(limit, USER_PAGE_MAX)),
+        "cursor": decode_cursor(cursor, sort) if cursor else None,
+    }
+
+def query_users(search="", status="all", sort="user", order="asc", limit=USER_PAGE_SIZE, cursor=None):
+    """
+    Users တစ် page ကို SQL ထဲတွင်ပင် filter / search / sort လုပ်ပြီး keyset cursor ဖြင့် ဆွဲယူသည်။
+    (OFFSET မသုံး၍ နောက်ပိုင်း pages များလည်း sort index ပေါ်တွင် တိုက်ရိုက် seek လုပ်သည်)
+    """
+    keys = USER_SORTS[sort]
+    where, params = [], []
+    if USER_FILTERS[status]:
+        where.append(USER_FILTERS[status])
+    if search:
+        like = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where.append("(username LIKE ? ESCAPE '\\' OR hwid LIKE ? ESCAPE '\\')")
+        params += [like, like]
+
     db = get_db()
-    active_users = db.execute('''
-        SELECT password FROM users 
-        WHERE status = "active" AND password IS NOT NULL AND password != "" 
-              AND (expires IS NULL OR expires >= CURRENT_DATE)
-    ''').fetchall()
-    db.close()
-    
-    users_pw = sorted({str(u["password"]) for u in active_users})
-    
-    cfg=read_json(CONFIG_FILE,{})
-    if not isinstance(cfg.get("auth"),dict): cfg["auth"]={}
-    cfg["auth"]["mode"]="passwords"
-    cfg["auth"]["config"]=users_pw
-    cfg["listen"]=cfg.get("listen") or ":5667"
-    cfg["cert"]=cfg.get("cert") or "/etc/zivpn/zivpn.crt"
-    cfg["key"]=cfg.get("key") or "/etc/zivpn/zivpn.key"
-    cfg["obfs"]=cfg.get("obfs") or "zivpn"
-    
-    write_json_atomic(CONFIG_FILE,cfg)
-    subprocess.run("systemctl restart zivpn.service", shell=True)
+    try:
+        total = db.execute(f"SELECT COUNT(*) FROM users {'WHERE ' + ' AND '.join(where) if where else ''}",
+                           params).fetchone()[0]
+        if cursor is not None:
+            op = ">" if order == "asc" else "<"
+            # ပထမ key ပေါ်ရှိ range condition က index seek ဖြစ်စေပြီး row value က tie များကို ခွဲသည်။
+            where.append(f"{keys[0]} {op}= ? AND ({', '.join(keys)}) {op} ({', '.join('?' * len(keys))})")
+            params = params + [cursor[0]] + list(cursor)
+        direction = "ASC" if order == "asc" else "DESC"
+        rows = db.execute(f'''
+            SELECT {USER_COLUMNS}, {', '.join(f"{k} AS sort_{i}" for i, k in enumerate(keys))}
+            FROM users
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY {', '.join(f"{k} {direction}" for k in keys)}
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+    finally:
+        db.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[f"sort_{i}"] for i in range(len(keys))])
+    return UserPage(rows, next_cursor, total)
+
+def user_view(row, listen_port, snapshot):
+    u = dict(row)
+    return UserRow(
+        user=u["user"] or "",
+        password=u["password"] or "",
+        expires=u["expires"] or "",
+        port=u["port"] or "",
+        status=status_for_user(u, listen_port, snapshot),
+        bandwidth_limit=u["bandwidth_limit"] or 0,
+        bandwidth_used=f"{(u['bandwidth_used'] or 0) / 1024 / 1024 / 1024:.2f} GB",
+        speed_limit=u["speed_limit"] or 0,
+        concurrent_conn=u["concurrent_conn"] or 1,
+        hwid=u["hwid"] or "",
+    )
+
+def load_user_page(args):
+    """Request query string အတိုင်း user page တစ်ခုကို view objects အဖြစ် ပြန်ပေးသည်။"""
+    params = user_list_args(args)
+    page = query_users(**params)
+    listen_port = get_listen_port_from_config()
+    snapshot = conntrack_snapshots.get()
+    users = [user_view(row, listen_port, snapshot) for row in page.users]
+    return page._replace(users=users), params, snapshot
+
+# Config sync engine: diff လုပ်ပြီး ပြောင်းလဲမှုရှိမှသာ restart လုပ်သည်။ Edits များကို debounce ဖြင့် ပေါင်းသည်။
+config_syncer = ConfigSyncer(lambda: get_db(), CONFIG_FILE)
+
+def sync_config_passwords(mode="mirror"):
+    """Active User များ၏ Password များကို ZIVPN config file ထဲသို့ background worker မှ ထည့်သွင်းရန် တောင်းဆိုသည်။"""
+    config_syncer.request()
+
+# Expiry scheduler: အနီးဆုံး expiry ပြီးဆုံးချိန် (00:00) တွင် cohort လိုက် suspend လုပ်ပြီး sync တစ်ကြိမ်သာ တောင်းသည်။
+expiry_scheduler = expiry.ExpiryScheduler(lambda: get_db(), config_syncer)
+if os.environ.get("EXPIRY_SCHEDULER", "1") == "1":
+    expiry_scheduler.start()
+
+# --- Live Dashboard Feed (Server-Sent Events) ---
+
+LIVE_INTERVAL = float(os.environ.get("LIVE_UPDATE_INTERVAL", "5"))
+LIVE_HEARTBEAT_SECONDS = 15
+# Client တစ်ခု ဤထက်ပို၍ နောက်ကျနေပါက stream ကို ပိတ်ပြီး reconnect (full state ပြန်ယူ) လုပ်ခိုင်းသည်။
+LIVE_QUEUE_SIZE = 32
+
+class LiveFeed:
+    """
+    Admin tabs အားလုံးအတွက် background producer တစ်ခုတည်းဖြင့် stats / system metrics / user status ကို sample ယူပြီး
+    ပြောင်းလဲမှု (delta) များကိုသာ subscriber queues များထံ broadcast လုပ်သည်။ Subscriber မရှိပါက producer ရပ်နားသည်။
+    """
+
+    def __init__(self, interval=LIVE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.summary = None
+        self.statuses = {}
+        self.ticks = 0
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=LIVE_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(q)
+            # Client အသစ်သည် နောက်ဆုံး state အပြည့်ဖြင့် စတင်ပြီး နောက်ပိုင်း deltas များကို လက်ခံသည်။
+            if self.summary is not None:
+                q.put_nowait(("stats", self.summary))
+                q.put_nowait(("users", {"changed": dict(self.statuses), "removed": []}))
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # နှေးသော client: queue ကို ရှင်းပြီး stream ပိတ်ရန် sentinel ထည့်သည်။
+                self.unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait((None, None))
+
+    def collect(self):
+        snapshot = conntrack_snapshots.get()
+        listen_port = get_listen_port_from_config()
+        db = get_db()
+        try:
+            rows = db.execute('SELECT username, port, status, expires FROM users').fetchall()
+        finally:
+            db.close()
+        statuses = {r["username"]: status_for_user(dict(r), listen_port, snapshot) for r in rows}
+        summary = {"stats": get_server_stats(), "system": get_system_stats(), "snapshot_age": int(snapshot.age)}
+        return summary, statuses
+
+    def tick(self):
+        summary, statuses = self.collect()
+        prev = self.statuses
+        changed = {u: s for u, s in statuses.items() if prev.get(u) != s}
+        removed = [u for u in prev if u not in statuses]
+        with self.lock:
+            summary_changed = summary != self.summary
+            self.summary, self.statuses = summary, statuses
+        self.ticks += 1
+        if summary_changed:
+            self.publish("stats", summary)
+        if changed or removed:
+            self.publish("users", {"changed": changed, "removed": removed})
+
+    def _run(self):
+        while True:
+            with self.lock:
+                idle = not self.subscribers
+            if idle:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"LIVE FEED ERROR: {e}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+live_feed = LiveFeed()
 
 def login_enabled(): return bool(ADMIN_USER and ADMIN_PASS)
 def is_authed(): return session.get("auth") == True
@@ -381,8 +659,6 @@ def set_lang():
 @app.route("/login", methods=["GET","POST"])
 def login():
     t = g.t
-    # Template ကို အပြင်မှ တစ်ခါတည်း fetch လုပ်သည်။
-    html_template = load_html_template() 
     if not login_enabled(): return redirect(url_for('index'))
     
     if request.method=="POST":
@@ -402,7 +678,11 @@ def login():
             return redirect(url_for('login'))
     
     theme = session.get('theme', 'dark')
-    return render_template_string(html_template, authed=False, logo=LOGO_URL, err=session.pop("login_err", None), 
+    try:
+        html_template = template_store.get()
+    except RuntimeError as e:
+        return f"<h1>Error: Cannot load Web Panel Template</h1><p>{e}</p>", 500
+    return render_template(html_template, authed=False, logo=LOGO_URL, err=session.pop("login_err", None), 
                                  t=t, lang=g.lang, theme=theme)
 
 @app.route("/logout", methods=["GET"])
@@ -412,54 +692,43 @@ def logout():
 
 def build_view(msg="", err=""):
     t = g.t
-    # Template ကို အပြင်မှ load လုပ်သည်။
+    # Startup တွင် compile လုပ်ထားသော template ကို သုံးသည်။
     try:
-        html_template = load_html_template() 
+        html_template = template_store.get()
     except RuntimeError as e:
         # Template load မရပါက အမှား message ပြသသည်။
         return f"<h1>Error: Cannot load Web Panel Template</h1><p>{e}</p>", 500
     
     if not require_login():
-        return render_template_string(html_template, authed=False, logo=LOGO_URL, err=session.pop("login_err", None), 
+        return render_template(html_template, authed=False, logo=LOGO_URL, err=session.pop("login_err", None), 
                                      t=t, lang=g.lang, theme=session.get('theme', 'dark'))
     
-    # ဤနေရာမှ စတင်၍ Database မှ data များ ဆွဲယူသည်။
+    # ဤနေရာမှ စတင်၍ Database မှ data များ ဆွဲယူသည်။ (Users ကို page တစ်ခုစာသာ ဆွဲယူ/render လုပ်သည်)
     try:
-        users=load_users()
-        listen_port=get_listen_port_from_config()
+        try:
+            page, list_args, snapshot = load_user_page(request.args)
+        except ValueError:
+            page, list_args, snapshot = load_user_page({})
         stats = get_server_stats()
         system_stats = get_system_stats() # System Stats အသစ်ကို ခေါ်သည်။
+        system_trends = get_system_trends()
     except Exception as e:
         # Database/System Error ဖြစ်ပါက Internal Server Error အစား message ပြသနိုင်သည်။
         return f"<h1>Error: Database or System Access Failed</h1><p>Please check if the ZIVPN services are running and if system commands are accessible. Detail: {e}</p>", 500
 
-    view=[]
-    today_date=datetime.now().date()
-    
-    for u in users:
-        status = status_for_user(u, listen_port)
-        expires_str=u.get("expires","")
-        
-        view.append(type("U",(),{
-            "user":u.get("user",""),
-            "password":u.get("password",""),
-            "expires":expires_str,
-            "port":u.get("port",""),
-            "status":status,
-            "bandwidth_limit": u.get('bandwidth_limit', 0),
-            "bandwidth_used": f"{u.get('bandwidth_used', 0) / 1024 / 1024 / 1024:.2f} GB",
-            "speed_limit": u.get('speed_limit', 0),
-            "concurrent_conn": u.get('concurrent_conn', 1),
-            "hwid": u.get('hwid', '')
-        }))
-    
-    view.sort(key=lambda x:(x.user or "").lower())
-    today=today_date.strftime("%Y-%m-%d")
+    today=datetime.now().date().strftime("%Y-%m-%d")
+    # Pagination / search links များအတွက် လက်ရှိ list parameters
+    list_query = {"q": list_args["search"], "status": list_args["status"],
+                  "sort": list_args["sort"], "order": list_args["order"]}
     
     theme = session.get('theme', 'dark')
-    return render_template_string(html_template, authed=True, logo=LOGO_URL, 
-                                 users=view, msg=msg, err=err, today=today, stats=stats, 
+    return render_template(html_template, authed=True, logo=LOGO_URL, 
+                                 users=page.users, next_cursor=page.next_cursor, users_total=page.total,
+                                 list_query=list_query, paged=list_args["cursor"] is not None,
+                                 msg=msg, err=err, today=today, stats=stats, 
                                  system_stats=system_stats, # System Stats ကို Template ထဲသို့ ထည့်သည်။
+                                 system_trends=system_trends,
+                                 snapshot_age=int(snapshot.age), fleet_mode=FLEET_MODE,
                                  t=t, lang=g.lang, theme=theme)
 
 @app.route("/", methods=["GET"])
@@ -500,24 +769,20 @@ def add_user():
     
     if user_data['port']:
         try:
-            port_num = int(user_data['port'])
-            if not (6000 <= port_num <= 19999):
+            user_data['port'] = int(user_data['port'])
+            if not (ports.PORT_MIN <= user_data['port'] <= ports.PORT_MAX):
                      return build_view(err=t['invalid_port'])
         except ValueError:
              return build_view(err=t['invalid_port'])
 
-    
-    if not user_data['port']:
-        used_ports = {str(u.get('port', '')) for u in load_users() if u.get('port')}
-        found_port = None
-        for p in range(6000, 20000):
-            if str(p) not in used_ports:
-                found_port = str(p)
-                break
-        user_data['port'] = found_port or ""
-
-    save_user(user_data)
+    try:
+        save_user(user_data)
+    except ports.PortInUse as e:
+        return build_view(err=t['port_taken'].format(port=e.port, user=e.owner))
+    except ports.NoFreePort:
+        return build_view(err=t['no_free_port'])
     sync_config_passwords()
+    expiry_scheduler.reschedule()
     return build_view(msg=t['success_save'])
 
 @app.route("/delete", methods=["POST"])
@@ -549,7 +814,7 @@ def activate_user():
     user = (request.form.get("user") or "").strip()
     if user:
         db = get_db()
-        db.execute('UPDATE users SET status = "active" WHERE username = ?', (user,))
+        db.execute(f'UPDATE users SET status = "active", {shaping.USAGE_RESET_ON_ACTIVATE} WHERE username = ?', (user,))
         db.commit()
         db.close()
         sync_config_passwords()
@@ -559,48 +824,82 @@ def activate_user():
 
 @app.route("/api/bulk", methods=["POST"])
 def bulk_operations():
+    """
+    {"action": extend|suspend|activate|delete|set_limit|set_expiry, "users": [...] or "u1,u2",
+     "days", "expires", "bandwidth_limit", "speed_limit", "concurrent_conn"}
+    Action ကို set-based SQL ဖြင့် transaction တစ်ခုတည်းတွင် apply လုပ်ပြီး config sync ကို အများဆုံး တစ်ကြိမ်သာ တောင်းသည်။
+    """
     t = g.t
     if not require_login(): return jsonify({"ok": False, "err": t['login_err']}), 401
     
     data = request.get_json() or {}
     action = data.get('action')
-    users = data.get('users', [])
     
     db = get_db()
     try:
-        if action == 'extend':
-            for user in users:
-                db.execute('UPDATE users SET expires = date(expires, "+7 days") WHERE username = ?', (user,))
-        elif action == 'suspend':
-            for user in users:
-                db.execute('UPDATE users SET status = "suspended" WHERE username = ?', (user,))
-        elif action == 'activate':
-            for user in users:
-                db.execute('UPDATE users SET status = "active" WHERE username = ?', (user,))
-        elif action == 'delete':
-            for user in users:
-                delete_user(user)
-        
-        db.commit()
-        sync_config_passwords()
-        return jsonify({"ok": True, "message": t['bulk_success'].format(action=action)})
+        results, sync_needed = bulk.apply(db, action, data.get('users', []), data)
+    except ValueError as e:
+        return jsonify({"ok": False, "err": str(e)}), 400
     finally:
         db.close()
 
+    if sync_needed:
+        sync_config_passwords()
+    if action in bulk.RESCHEDULE_ACTIONS:
+        expiry_scheduler.reschedule()
+    done = sum(1 for r in results if r['ok'])
+    return jsonify({"ok": True, "message": t['bulk_success'].format(action=action),
+                    "updated": done, "not_found": len(results) - done, "results": results})
+
+@app.route("/api/users", methods=["GET"])
+def list_users():
+    """Paginated users: ?q=&status=all|active|expired|suspended&sort=user|port|expires|created&order=asc|desc&limit=&cursor="""
+    if not require_login(): return jsonify({"error": "Unauthorized"}), 401
+    try:
+        page, _, snapshot = load_user_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "users": [u._asdict() for u in page.users],
+        "next_cursor": page.next_cursor,
+        "total": page.total,
+        "snapshot_age": int(snapshot.age),
+    })
+
 @app.route("/api/export/users")
 def export_users():
+    """Users CSV ကို DB cursor မှ stream လုပ်သည်။ ?gzip=1 ဖြင့် .csv.gz"""
     if not require_login(): return "Unauthorized", 401
-    
-    users = load_users()
-    csv_data = "User,Password,Expires,Port,HWID,Bandwidth Used (GB),Bandwidth Limit (GB),Speed Limit (MB/s),Max Connections,Status\n"
-    for u in users:
-        csv_data += f"{u['user']},{u['password']},{u.get('expires','')},{u.get('port','')},{u.get('hwid','')},{u.get('bandwidth_used',0):.2f},{u.get('bandwidth_limit',0)},{u.get('speed_limit',0)},{u.get('concurrent_conn',1)},{u.get('status','')}\n"
-    
-    response = make_response(csv_data)
-    response.headers["Content-Disposition"] = "attachment; filename=users_export.csv"
-    response.headers["Content-type"] = "text/csv"
+
+    compress = request.args.get('gzip') == '1'
+    response = Response(user_io.stream_export(get_db, compress=compress),
+                        mimetype="application/gzip" if compress else "text/csv")
+    filename = "users_export.csv.gz" if compress else "users_export.csv"
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
 
+@app.route("/api/import/users", methods=["POST"])
+def import_users():
+    """CSV (multipart 'file' သို့မဟုတ် request body, gzip ဖြစ်လည်းရ) မှ users များကို upsert လုပ်သည်။ ?dry_run=1"""
+    t = g.t
+    if not require_login(): return jsonify({"ok": False, "err": t['login_err']}), 401
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    dry_run = (request.args.get('dry_run') or request.form.get('dry_run')) == '1'
+    db = get_db()
+    try:
+        summary = user_io.import_users(db, user_io.open_csv_text(stream), dry_run=dry_run)
+    except (UnicodeDecodeError, OSError, csv.Error) as e:
+        return jsonify({"ok": False, "err": f"Invalid CSV: {e}"}), 400
+    finally:
+        db.close()
+
+    if not dry_run and (summary['inserted'] or summary['updated']):
+        sync_config_passwords()
+        expiry_scheduler.reschedule()
+    return jsonify({"ok": True, **summary})
+
 @app.route("/api/reports")
 def generate_reports():
     if not require_login(): return jsonify({"error": "Unauthorized"}), 401
@@ -612,14 +911,19 @@ def generate_reports():
     db = get_db()
     try:
         if report_type == 'bandwidth':
-            data = db.execute('''
-                SELECT username, SUM(bytes_used) / 1024 / 1024 / 1024 as total_gb_used 
-                FROM bandwidth_logs 
-                WHERE log_date BETWEEN ? AND ?
-                GROUP BY username
-                ORDER BY total_gb_used DESC
-            ''', (from_date or '2000-01-01', to_date or '2030-12-31')).fetchall()
-        
+            # လပြည့် months ကို monthly rollup မှ၊ ကျန်ရက်များကို daily rollup မှ ဖတ်သည်။
+            data = rollups.bandwidth_totals(db, rollups.parse_day(from_date, date(2000, 1, 1)),
+                                            rollups.parse_day(to_date, date(2030, 12, 31)))
+
+        elif report_type == 'traffic':
+            # Range အရှည်အရ hourly / daily / monthly rollup ကို ရွေးသည်။
+            data = rollups.traffic_series(db, rollups.parse_day(from_date, date.today() - timedelta(days=30)),
+                                          rollups.parse_day(to_date, date.today()), request.args.get('user'))
+
+        elif report_type == 'server':
+            data = rollups.server_series(db, rollups.parse_day(from_date, date.today() - timedelta(days=30)),
+                                         rollups.parse_day(to_date, date.today()))
+
         elif report_type == 'users':
             data = db.execute('''
                 SELECT strftime('%Y-%m-%d', created_at) as date, COUNT(*) as new_users
@@ -645,6 +949,123 @@ def generate_reports():
     finally:
         db.close()
 
+# --- Fleet Mode (nodes များစွာကို api.py မှတစ်ဆင့် စီမံခြင်း) ---
+
+FLEET_MODE = os.environ.get("FLEET_MODE", "0") == "1"
+fleet_client = fleet.FleetClient(get_db) if FLEET_MODE else None
+
+def fleet_guard():
+    if not require_login(): return jsonify({"error": "Unauthorized"}), 401
+    if fleet_client is None: return jsonify({"error": "Fleet mode disabled (FLEET_MODE=1)"}), 404
+    return None
+
+@app.route("/api/fleet/nodes", methods=["GET", "POST"])
+def fleet_nodes():
+    denied = fleet_guard()
+    if denied: return denied
+    if request.method == "POST":
+        data = request.get_json() or {}
+        try:
+            stats = fleet_client.register(data.get('name'), data.get('url'), data.get('token', ''))
+        except fleet.FleetError as e:
+            return jsonify({"ok": False, "err": str(e)}), 400
+        return jsonify({"ok": True, "stats": stats})
+    return jsonify([{"name": n["name"], "url": n["url"]} for n in fleet_client.nodes()])
+
+@app.route("/api/fleet/nodes/<name>", methods=["DELETE"])
+def fleet_remove_node(name):
+    denied = fleet_guard()
+    if denied: return denied
+    return jsonify({"ok": fleet_client.unregister(name) > 0})
+
+@app.route("/api/fleet/stats")
+def fleet_stats():
+    denied = fleet_guard()
+    if denied: return denied
+    return jsonify(fleet_client.stats())
+
+@app.route("/api/fleet/users", methods=["GET", "POST"])
+def fleet_users():
+    """GET: nodes အားလုံး၏ users (?q=&after=&limit=)၊ POST: user ကို load အနည်းဆုံး node (သို့) 'node' တွင် ဖန်တီးသည်။"""
+    denied = fleet_guard()
+    if denied: return denied
+    if request.method == "POST":
+        data = request.get_json() or {}
+        node = data.pop('node', None) or None
+        try:
+            placed, result = fleet_client.place_user(data, node)
+        except fleet.FleetError as e:
+            return jsonify({"ok": False, "err": str(e)}), 502
+        return jsonify({"ok": True, "node": placed, **result})
+    try:
+        return jsonify(fleet_client.users(request.args.get('q', ''), request.args.get('after', ''),
+                                          request.args.get('limit') or fleet.FLEET_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "invalid limit"}), 400
+
+@app.route("/api/live")
+def live_events():
+    """Dashboard live updates (text/event-stream): 'stats' နှင့် 'users' (status deltas) events"""
+    if not require_login(): return jsonify({"error": "Unauthorized"}), 401
+    q = live_feed.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = q.get(timeout=LIVE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            live_feed.unsubscribe(q)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/system/metrics")
+def system_metrics_history():
+    """System sampler ring buffer ထဲမှ နောက်ဆုံး samples များ (?limit=N)"""
+    if not require_login(): return jsonify({"error": "Unauthorized"}), 401
+    try:
+        limit = int(request.args.get("limit", 0)) or None
+    except ValueError:
+        return jsonify({"error": "invalid limit"}), 400
+    return jsonify({
+        "interval": system_sampler.interval,
+        "samples": [s._asdict() for s in system_sampler.history(limit)],
+    })
+
+@app.route("/api/db/metrics")
+def db_metrics():
+    if not require_login(): return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(database.metrics.snapshot())
+
+# Prometheus scrape: login session, localhost, သို့မဟုတ် "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+metrics.register_db_metrics()
+metrics.register_config_syncer(config_syncer)
+metrics.register_user_counts(lambda: get_db())
+metrics.REGISTRY.counter("zivpn_conntrack_dumps_total", "Conntrack table dumps taken for the panel",
+                         fn=lambda: conntrack_snapshots.dumps)
+metrics.REGISTRY.counter("zivpn_conntrack_dump_seconds_total", "Time spent dumping and indexing conntrack",
+                         fn=lambda: conntrack_snapshots.dump_seconds)
+metrics.REGISTRY.gauge("zivpn_conntrack_flows", "UDP flows in the latest conntrack snapshot",
+                       fn=lambda: conntrack_snapshots.snapshot.flow_count if conntrack_snapshots.snapshot else 0)
+
+@app.route("/metrics")
+def prometheus_metrics():
+    auth = request.headers.get("Authorization", "")
+    allowed = (require_login() or request.remote_addr in ("127.0.0.1", "::1")
+               or (METRICS_TOKEN and hmac.compare_digest(auth, f"Bearer {METRICS_TOKEN}")))
+    if not allowed:
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route("/api/user/update", methods=["POST"])
 def update_user():
     t = g.t
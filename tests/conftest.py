@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules များကို /etc/zivpn ထဲတွင်ကဲ့သို့ flat import လုပ်သည်။
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "templates")]
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
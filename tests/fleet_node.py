@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Fleet tests အတွက် api.py stand-in node (stdlib HTTP server)
+/api/v1/stats, /api/v1/users (GET/POST) ကို api.py နှင့် response ပုံစံတူ ပေးသည်။
+Usage: python3 fleet_node.py '<json config>'   (listen port ကို stdout ပထမ line တွင် ထုတ်သည်)
+config: {"users": [...], "active": N, "load1": X, "token": "", "mode": "ok" | "slow" | "error", "delay": seconds}
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+config = json.loads(sys.argv[1])
+users = sorted(config.get("users", []))
+state = {"active": config.get("active", len(users)), "next_port": 6000}
+lock = threading.Lock()
+
+class Handler(BaseHTTPRequestHandler):
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def guard(self):
+        mode = config.get("mode", "ok")
+        if mode == "slow":
+            time.sleep(config.get("delay", 3))
+        if mode == "error":
+            self.reply(500, {"error": "internal error"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.guard():
+            return
+        url = urlparse(self.path)
+        args = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/api/v1/stats":
+            with lock:
+                body = {"total_users": len(users), "active_users": state["active"], "total_bandwidth_bytes": 0,
+                        "load1": config.get("load1", 0.0), "free_ports": 100, "hostname": "stand-in"}
+            self.reply(200, body)
+        elif url.path == "/api/v1/users":
+            with lock:
+                page = [u for u in users if u > args.get("after", "") and args.get("q", "") in u]
+            if args.get("limit"):
+                page = page[:int(args["limit"])]
+            self.reply(200, [{"username": u, "status": "active"} for u in page])
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.guard():
+            return
+        if self.path != "/api/v1/users":
+            self.reply(404, {"error": "not found"})
+            return
+        token = config.get("token")
+        if token and self.headers.get("Authorization") != f"Bearer {token}":
+            self.reply(401, {"error": "Unauthorized"})
+            return
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with lock:
+            if data.get("user") in users:
+                self.reply(409, {"error": "user exists"})
+                return
+            users.append(data["user"])
+            users.sort()
+            state["active"] += 1
+            port = state["next_port"]
+            state["next_port"] += 1
+        self.reply(201, {"user": data["user"], "port": port, "expires": None})
+
+    def log_message(self, format, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+server.daemon_threads = True
+print(server.server_address[1], flush=True)
+server.serve_forever()
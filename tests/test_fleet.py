@@ -0,0 +1,142 @@
+"""
+FleetClient ကို local stand-in node processes (fleet_node.py) ဖြင့် end to end စစ်သည်။
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import database
+import fleet
+import migrations
+
+NODE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fleet_node.py")
+TIMEOUT = (0.5, 0.5)
+
+NODES = {
+    "local": {"users": ["alice", "carol", "erin", "gina", "ivan", "kate"], "active": 6, "load1": 0.2},
+    "east": {"users": ["bob", "carol", "dave", "frank", "hank"], "active": 2, "load1": 0.9, "token": "t-east"},
+    "west": {"users": ["amy", "carol", "jill", "zoe"], "active": 4, "load1": 0.1},
+    "slow": {"users": ["sam"], "active": 0, "mode": "slow", "delay": 3},
+    "broken": {"users": ["bea"], "active": 0, "mode": "error"},
+}
+
+def start_node(config):
+    proc = subprocess.Popen([sys.executable, NODE_SCRIPT, json.dumps(config)], stdout=subprocess.PIPE, text=True)
+    port = int(proc.stdout.readline())
+    return proc, f"http://127.0.0.1:{port}"
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+@pytest.fixture
+def node_urls():
+    procs, urls = [], {}
+    try:
+        for name, config in NODES.items():
+            proc, urls[name] = start_node(config)
+            procs.append(proc)
+        urls["dead"] = closed_port_url()
+        yield urls
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+def make_client(tmp_path, urls, names):
+    path = str(tmp_path / "fleet.db")
+    migrations.run(path)
+    get_db = lambda: database.get_db(path)
+    db = get_db()
+    try:
+        with db.transaction():
+            db.executemany('INSERT INTO fleet_nodes (name, url, token) VALUES (?, ?, ?)',
+                           [(name, urls[name], NODES.get(name, {}).get("token", "")) for name in names])
+    finally:
+        db.close()
+    return fleet.FleetClient(get_db, local_token="", timeout=TIMEOUT, workers=8, local_url=urls["local"])
+
+def test_users_merged_in_order_and_paged(tmp_path, node_urls):
+    client = make_client(tmp_path, node_urls, ["east", "west"])
+    expected = sorted((u, name) for name in ("local", "east", "west") for u in NODES[name]["users"])
+    pages, after = [], ""
+    while True:
+        page = client.users(after=after, limit=4)
+        assert page["errors"] == []
+        pages.append([(u["username"], u["node"]) for u in page["users"]])
+        after = page["next_cursor"]
+        if after is None:
+            break
+        assert after == page["users"][-1]["username"]
+    merged = [row for page in pages for row in page]
+    assert merged == expected
+    # Username တူသော users (carol x3) ကို page နှစ်ခုကြား မခွဲရ
+    carol_pages = [i for i, page in enumerate(pages) if any(u == "carol" for u, _ in page)]
+    assert len(carol_pages) == 1
+    assert all(len(page) <= 4 for i, page in enumerate(pages) if i not in carol_pages)
+
+def test_users_search_across_nodes(tmp_path, node_urls):
+    client = make_client(tmp_path, node_urls, ["east", "west"])
+    page = client.users(q="a", limit=50)
+    names = [u["username"] for u in page["users"]]
+    assert names == sorted(names)
+    assert set(names) == {u for name in ("local", "east", "west") for u in NODES[name]["users"] if "a" in u}
+    assert page["next_cursor"] is None
+
+def test_place_user_picks_fewest_active(tmp_path, node_urls):
+    client = make_client(tmp_path, node_urls, ["east", "west", "broken", "dead"])
+    # east (2 active) -> token ပါမှ ဖန်တီးနိုင်သည်
+    node, response = client.place_user({"user": "newbie1", "password": "pw"})
+    assert node == "east"
+    assert response["user"] == "newbie1"
+    # east: 3, 4 ဖြစ်လာပြီးနောက် west (4 active, load နည်း) နှင့် တူလာသည် - load1 ဖြင့် west ကို ရွေးရမည်
+    assert client.place_user({"user": "newbie2", "password": "pw"})[0] == "east"
+    assert client.place_user({"user": "newbie3", "password": "pw"})[0] == "west"
+    # Node ကို ရွေးပေးထားပါက ထို node တွင်သာ
+    assert client.place_user({"user": "newbie4", "password": "pw"}, node_name="local")[0] == "local"
+    with pytest.raises(fleet.FleetError):
+        client.place_user({"user": "newbie5", "password": "pw"}, node_name="nowhere")
+    with pytest.raises(fleet.FleetError):
+        client.place_user({"user": "newbie6", "password": "pw"}, node_name="broken")
+
+def test_failed_nodes_do_not_break_fan_out(tmp_path, node_urls):
+    client = make_client(tmp_path, node_urls, ["east", "west", "slow", "broken", "dead"])
+    start = time.perf_counter()
+    stats = client.stats()
+    elapsed = time.perf_counter() - start
+    # Nodes များကို တပြိုင်နက် ခေါ်သဖြင့် slow node ၏ timeout တစ်ကြိမ်စာသာ ကြာရမည်
+    assert elapsed < 2
+    by_node = {n["node"]: n for n in stats["nodes"]}
+    assert [n["node"] for n in stats["nodes"]] == ["local", "broken", "dead", "east", "slow", "west"]
+    assert stats["totals"]["nodes"] == 6
+    assert stats["totals"]["nodes_up"] == 3
+    assert "Timeout" in by_node["slow"]["error"]
+    assert by_node["broken"]["error"] == "broken: internal error"
+    assert "ConnectionError" in by_node["dead"]["error"]
+    assert by_node["east"]["ok"] and by_node["east"]["total_users"] == len(NODES["east"]["users"])
+
+    page = client.users(limit=100)
+    assert sorted(e["node"] for e in page["errors"]) == ["broken", "dead", "slow"]
+    assert {u["node"] for u in page["users"]} == {"local", "east", "west"}
+
+def test_register_checks_the_node(tmp_path, node_urls):
+    client = make_client(tmp_path, node_urls, [])
+    assert client.register("west", node_urls["west"] + "/")["total_users"] == len(NODES["west"]["users"])
+    for name in ("broken", "dead"):
+        with pytest.raises(fleet.FleetError):
+            client.register(name, node_urls[name])
+    with pytest.raises(fleet.FleetError):
+        client.register("local", node_urls["west"])
+    with pytest.raises(fleet.FleetError):
+        client.register("ftp", "ftp://example.invalid")
+    assert [n["name"] for n in client.nodes()] == ["local", "west"]
+    assert client.nodes()[1]["url"] == node_urls["west"]
+    assert client.unregister("west") == 1
+    assert [n["name"] for n in client.nodes()] == ["local"]
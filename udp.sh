@@ -54,14 +54,14 @@ systemctl stop zivpn-connection.service 2>/dev/null || true
 say "${Y}📦 Enhanced Packages တင်နေပါတယ်...${Z}"
 apt_guard_start
 apt-get update -y -o APT::Update::Post-Invoke-Success::= -o APT::Update::Post-Invoke::= >/dev/null
-apt-get install -y curl ufw jq python3 python3-flask python3-pip python3-venv iproute2 conntrack ca-certificates sqlite3 >/dev/null || \
+apt-get install -y curl ufw jq python3 python3-flask python3-pip python3-venv iproute2 conntrack ipset nftables ca-certificates sqlite3 >/dev/null || \
 {
   apt-get install -y -o DPkg::Lock::Timeout=60 python3-apt >/dev/null || true
-  apt-get install -y curl ufw jq python3 python3-flask python3-pip iproute2 conntrack ca-certificates sqlite3 >/dev/null
+  apt-get install -y curl ufw jq python3 python3-flask python3-pip iproute2 conntrack ipset nftables ca-certificates sqlite3 >/dev/null
 }
 
 # Additional Python packages
-pip3 install requests python-dateutil python-dotenv python-telegram-bot >/dev/null 2>&1 || true
+pip3 install requests python-dateutil python-dotenv "python-telegram-bot[webhooks]" >/dev/null 2>&1 || true
 apt_guard_end
 
 # ===== Paths =====
@@ -70,6 +70,7 @@ CFG="/etc/zivpn/config.json"
 USERS="/etc/zivpn/users.json"
 DB="/etc/zivpn/zivpn.db"
 ENVF="/etc/zivpn/web.env"
+CT_MARK="0x5a000000/0xff000000"
 BACKUP_DIR="/etc/zivpn/backups"
 CONN_MGR_PATH="/etc/zivpn/connection_manager.py"
 mkdir -p /etc/zivpn "$BACKUP_DIR"
@@ -183,6 +184,13 @@ PY
 )"
 fi
 
+# Fleet panels များက ဤ node ၏ api.py ကို ခေါ်ရန် token
+if command -v openssl >/dev/null 2>&1; then
+  API_TOKEN="$(openssl rand -hex 24)"
+else
+  API_TOKEN="$(python3 -c 'import secrets;print(secrets.token_hex(24))')"
+fi
+
 # Get Telegram Bot Token (optional)
 read -r -p "Telegram Bot Token (Optional, Enter=Skip): " BOT_TOKEN
 BOT_TOKEN="${BOT_TOKEN:-8589710728:AAH92e3A2zoPaH2K2lDXBUlUWp2y7UL0Pvc}"
@@ -194,6 +202,29 @@ BOT_TOKEN="${BOT_TOKEN:-8589710728:AAH92e3A2zoPaH2K2lDXBUlUWp2y7UL0Pvc}"
   echo "DATABASE_PATH=${DB}"
   echo "TELEGRAM_BOT_TOKEN=${BOT_TOKEN}"
   echo "DEFAULT_LANGUAGE=my"
+  echo "TEMPLATE_REFRESH_SECONDS=3600"
+  echo "CONNTRACK_BACKEND=auto"
+  echo "CONNTRACK_MARK=${CT_MARK}"
+  echo "CONN_MONITOR_MODE=events"
+  echo "CONN_RESYNC_INTERVAL=300"
+  echo "DROP_BLOCK_SECONDS=30"
+  echo "BANDWIDTH_ACCOUNTING=1"
+  echo "BANDWIDTH_INTERVAL=60"
+  echo "TRAFFIC_SHAPING=1"
+  echo "SHAPING_INTERVAL=10"
+  echo "ROLLUP_INTERVAL=300"
+  echo "ROLLUP_RAW_RETENTION_DAYS=7"
+  echo "API_TOKEN=${API_TOKEN}"
+  echo "FLEET_MODE=0"
+  echo "BOT_MODE=polling"
+  echo "BOT_CACHE_TTL=30"
+  echo "TELEGRAM_ADMIN_CHAT_IDS="
+  echo "NOTIFY_LIMIT_COOLDOWN=900"
+  echo "BACKUP_DIR=${BACKUP_DIR}"
+  echo "BACKUP_KEEP_DAYS=7"
+  echo "EXPIRY_SCHEDULER=1"
+  echo "METRICS_TOKEN="
+  echo "CM_METRICS_PORT=9101"
 } > "$ENVF"
 chmod 600 "$ENVF"
 
@@ -230,6 +261,19 @@ fi
 [ -f "$USERS" ] || echo "[]" > "$USERS"
 chmod 644 "$CFG" "$USERS"
 
+# ===== Shared Python Modules =====
+say "${Y}📚 GitHub မှ Shared Python Modules ဒေါင်းလုပ်ဆွဲနေပါတယ်...${Z}"
+SHARED_MODULES="conntrack.py ctnetlink.py config_sync.py database.py migrations.py system_metrics.py accounting.py shaping.py rollups.py bulk.py user_io.py ports.py fleet.py notifications.py backup.py expiry.py metrics.py"
+for MOD in $SHARED_MODULES; do
+  if ! curl -fsSL -o "/etc/zivpn/${MOD}" "https://raw.githubusercontent.com/zivpn/web-panel/main/${MOD}"; then
+    echo -e "${R}❌ ${MOD} ဒေါင်းလုပ်ဆွဲ၍မရပါ${Z}"
+  fi
+done
+
+# Schema migrations (hwid column, indexes) - services များ start မဖြစ်ခင် တစ်ကြိမ် apply လုပ်သည်။
+say "${Y}🗃️ Database migrations apply လုပ်နေပါတယ်...${Z}"
+(cd /etc/zivpn && python3 migrations.py "$DB") || echo -e "${R}❌ Database migrations မအောင်မြင်ပါ - services များ startup တွင် ပြန်ကြိုးစားပါမယ်${Z}"
+
 # ===== Download Web Panel from GitHub =====
 say "${Y}🌐 GitHub မှ Web Panel ဒေါင်းလုပ်ဆွဲနေပါတယ်...${Z}"
 curl -fsSL -o /etc/zivpn/web.py "https://raw.githubusercontent.com/zivpn/web-panel/main/templates/web.py"
@@ -238,6 +282,11 @@ if [ $? -ne 0 ]; then
   # Fallback web panel code would go here
 fi
 
+mkdir -p /etc/zivpn/templates
+if ! curl -fsSL -o /etc/zivpn/templates/index.html "https://raw.githubusercontent.com/zivpn/web-panel/main/templates/index.html"; then
+  echo -e "${R}❌ Web Panel Template ဒေါင်းလုပ်ဆွဲ၍မရပါ - Web Panel က startup တွင် ပြန်ကြိုးစားပါမယ်${Z}"
+fi
+
 # ===== Download Telegram Bot from GitHub =====
 say "${Y}🤖 GitHub မှ Telegram Bot ဒေါင်းလုပ်ဆွဲနေပါတယ်...${Z}"
 curl -fsSL -o /etc/zivpn/bot.py "https://raw.githubusercontent.com/zivpn/web-panel/main/telegram/bot.py"
@@ -249,18 +298,49 @@ fi
 # ===== API Service =====
 say "${Y}🔌 API Service ထည့်သွင်းနေပါတယ်...${Z}"
 cat >/etc/zivpn/api.py <<'PY'
-from flask import Flask, jsonify, request
-import sqlite3, datetime
+from flask import Flask, Response, jsonify, request
+import datetime
 from datetime import timedelta
+from functools import wraps
+import hmac
 import os
+import socket
+import database
+import metrics
+import migrations
+import ports
+from accounting import record_usage
+from config_sync import ConfigSyncer
+from system_metrics import read_loadavg
 
 app = Flask(__name__)
 DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+# Fleet panel များက "Authorization: Bearer <API_TOKEN>" ဖြင့် ခေါ်သည်။ မသတ်မှတ်ထားပါက auth မစစ်ပါ။
+# Token ကို endpoints အသစ်များ (user ဖန်တီးခြင်း၊ /metrics) တွင်သာ စစ်သည်။ ယခင်ကတည်းက ရှိသော
+# /api/v1/stats, /api/v1/users (GET), /api/v1/user, /api/v1/bandwidth တို့ကို token မပါဘဲ ဆက်ခေါ်နိုင်သည်။
+API_TOKEN = os.environ.get("API_TOKEN", "")
+USERS_PAGE_MAX = 1000
+migrations.run(DATABASE_PATH)
 
 def get_db():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return database.get_db(DATABASE_PATH)
+
+config_syncer = ConfigSyncer(get_db)
+
+metrics.instrument_flask(app)
+metrics.register_db_metrics()
+metrics.register_config_syncer(config_syncer)
+metrics.register_user_counts(get_db)
+
+def require_token(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if API_TOKEN:
+            auth = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth, f"Bearer {API_TOKEN}"):
+                return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/api/v1/stats', methods=['GET'])
 def get_stats():
@@ -268,24 +348,88 @@ def get_stats():
     stats = db.execute('''
         SELECT 
             COUNT(*) as total_users,
-            SUM(CASE WHEN status = "active" AND (expires IS NULL OR expires >= CURRENT_DATE) THEN 1 ELSE 0 END) as active_users,
+            SUM(CASE WHEN status = "active" AND (expires IS NULL OR expires >= date('now', 'localtime')) THEN 1 ELSE 0 END) as active_users,
             SUM(bandwidth_used) as total_bandwidth
         FROM users
     ''').fetchone()
+    free_ports = ports.free_count(db)
     db.close()
+    try:
+        load1 = read_loadavg()[0]
+    except (OSError, ValueError, IndexError):
+        load1 = 0.0
     return jsonify({
         "total_users": stats['total_users'],
-        "active_users": stats['active_users'],
-        "total_bandwidth_bytes": stats['total_bandwidth']
+        "active_users": stats['active_users'] or 0,
+        "total_bandwidth_bytes": stats['total_bandwidth'] or 0,
+        "load1": load1,
+        "free_ports": free_ports,
+        "hostname": socket.gethostname()
     })
 
 @app.route('/api/v1/users', methods=['GET'])
 def get_users():
+    """?after=<username>&limit=&q= ပေးပါက username အစဉ်ဖြင့် page တစ်ခုသာ ပြန်ပေးသည် (fleet merge အတွက်)။"""
+    sql = 'SELECT username, status, expires, port, bandwidth_used, bandwidth_limit, concurrent_conn FROM users'
+    where, args = [], []
+    if request.args.get('after'):
+        where.append('username > ?')
+        args.append(request.args['after'])
+    if request.args.get('q'):
+        where.append("username LIKE ? ESCAPE '\\'")
+        q = request.args['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        args.append(f"%{q}%")
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY username'
+    if request.args.get('limit'):
+        try:
+            limit = max(1, min(int(request.args['limit']), USERS_PAGE_MAX))
+        except ValueError:
+            return jsonify({"error": "invalid limit"}), 400
+        sql += ' LIMIT ?'
+        args.append(limit)
     db = get_db()
-    users = db.execute('SELECT username, status, expires, bandwidth_used, concurrent_conn FROM users').fetchall()
+    users = db.execute(sql, args).fetchall()
     db.close()
     return jsonify([dict(u) for u in users])
 
+@app.route('/api/v1/users', methods=['POST'])
+@require_token
+def create_user():
+    """Fleet panel မှ user ဖန်တီးခြင်း - port ကို free-list မှ insert နှင့် transaction တစ်ခုတည်းတွင် ချပေးသည်။"""
+    data = request.get_json() or {}
+    username = str(data.get('user') or '').strip()
+    password = str(data.get('password') or '').strip()
+    if not username or not password:
+        return jsonify({"error": "user and password are required"}), 400
+    expires = str(data.get('expires') or '').strip()
+    try:
+        if expires.isdigit():
+            expires = (datetime.date.today() + timedelta(days=int(expires))).isoformat()
+        elif expires:
+            expires = datetime.date.fromisoformat(expires).isoformat()
+        limits = [int(data.get(k) or d) for k, d in (('bandwidth_limit', 0), ('speed_limit', 0), ('concurrent_conn', 1))]
+    except ValueError:
+        return jsonify({"error": "invalid expires or limits"}), 400
+
+    db = get_db()
+    try:
+        with db.transaction():
+            if db.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                return jsonify({"error": "user exists"}), 409
+            port = ports.allocate(db)
+            if port is None:
+                return jsonify({"error": "no free port"}), 503
+            db.execute('''
+                INSERT INTO users (username, password, expires, port, status, bandwidth_limit, speed_limit_up, concurrent_conn)
+                VALUES (?, ?, ?, ?, 'active', ?, ?, ?)
+            ''', (username, password, expires or None, port, *limits))
+    finally:
+        db.close()
+    config_syncer.request()
+    return jsonify({"user": username, "port": port, "expires": expires or None}), 201
+
 @app.route('/api/v1/user/<username>', methods=['GET'])
 def get_user(username):
     db = get_db()
@@ -301,106 +445,55 @@ def update_bandwidth(username):
     bytes_used = data.get('bytes_used', 0)
     
     db = get_db()
-    # 1. Update total usage
-    db.execute('''
-        UPDATE users 
-        SET bandwidth_used = bandwidth_used + ?, updated_at = CURRENT_TIMESTAMP 
-        WHERE username = ?
-    ''', (bytes_used, username))
-    
-    # 2. Log bandwidth usage
-    db.execute('''
-        INSERT INTO bandwidth_logs (username, bytes_used) 
-        VALUES (?, ?)
-    ''', (username, bytes_used))
-    
-    db.commit()
-    db.close()
+    try:
+        # Total usage နှင့် ယနေ့၏ bandwidth log ကို transaction တစ်ခုတည်းဖြင့် update လုပ်သည်။
+        record_usage(db, {username: bytes_used})
+    finally:
+        db.close()
     return jsonify({"message": "Bandwidth updated"})
 
+@app.route('/metrics', methods=['GET'])
+@require_token
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8081)
+    app.run(host='0.0.0.0', port=int(os.environ.get("API_PORT", "8081")), threaded=True)
 PY
 
 # ===== Daily Cleanup Script =====
 say "${Y}🧹 Daily Cleanup Service ထည့်သွင်းနေပါတယ်...${Z}"
 cat >/etc/zivpn/cleanup.py <<'PY'
-import sqlite3
-import datetime
-import os
-import subprocess
-import json
-import tempfile
+import database
+import migrations
+import notifications
+import expiry
+from config_sync import ConfigSyncer
 
 DATABASE_PATH = "/etc/zivpn/zivpn.db"
 CONFIG_FILE = "/etc/zivpn/config.json"
 
 def get_db():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def read_json(path, default):
-    try:
-        with open(path,"r") as f: return json.load(f)
-    except Exception:
-        return default
-
-def write_json_atomic(path, data):
-    d=json.dumps(data, ensure_ascii=False, indent=2)
-    dirn=os.path.dirname(path); fd,tmp=tempfile.mkstemp(prefix=".tmp-", dir=dirn)
-    try:
-        with os.fdopen(fd,"w") as f: f.write(d)
-        os.replace(tmp,path)
-    finally:
-        try: os.remove(tmp)
-        except: pass
-
-def sync_config_passwords():
-    # Only sync passwords for non-suspended/non-expired users
-    db = get_db()
-    active_users = db.execute('''
-        SELECT password FROM users 
-        WHERE status = "active" AND password IS NOT NULL AND password != "" 
-              AND (expires IS NULL OR expires >= CURRENT_DATE)
-    ''').fetchall()
-    db.close()
-    
-    users_pw = sorted({str(u["password"]) for u in active_users})
-    
-    cfg=read_json(CONFIG_FILE,{})
-    if not isinstance(cfg.get("auth"),dict): cfg["auth"]={}
-    cfg["auth"]["mode"]="passwords"
-    cfg["auth"]["config"]=users_pw
-    
-    write_json_atomic(CONFIG_FILE,cfg)
-    subprocess.run("systemctl restart zivpn.service", shell=True)
+    return database.get_db(DATABASE_PATH)
 
 def daily_cleanup():
     db = get_db()
-    today = datetime.datetime.now().date().strftime("%Y-%m-%d")
-    suspended_count = 0
     
     try:
-        # 1. Auto-suspend expired users
-        expired_users = db.execute('''
-            SELECT username, expires, status FROM users
-            WHERE status = 'active' AND expires < ?
-        ''', (today,)).fetchall()
-        
-        for user in expired_users:
-            db.execute('UPDATE users SET status = "suspended" WHERE username = ?', (user['username'],))
-            suspended_count += 1
-            print(f"User {user['username']} expired on {user['expires']} and was suspended.")
-            
-        db.commit()
+        # 1. Auto-suspend expired users (set-based UPDATE တစ်ခုတည်း၊ notifications ပါ)
+        # Web panel ၏ expiry scheduler က 00:00 တွင် လုပ်ပြီးဖြစ်သည် - ဤ job သည် web panel မ run ခဲ့ပါက fallback သာ။
+        expired_users = expiry.suspend_expired(db)
+        for username, expires in expired_users:
+            print(f"User {username} expired on {expires} and was suspended.")
 
         # 2. Re-sync passwords to exclude the newly suspended users
-        if suspended_count > 0:
-            print(f"Total {suspended_count} users suspended. Restarting ZIVPN service...")
-            sync_config_passwords()
-        
-        print(f"Cleanup finished. {suspended_count} users suspended today.")
+        # (config.json ပြောင်းမှသာ ရေး/restart လုပ်သည် - scheduler က sync ပြီးသားဖြစ်ပါက restart မလုပ်ပါ)
+        if expired_users:
+            print(f"Total {len(expired_users)} users suspended. Syncing ZIVPN config...")
+            ConfigSyncer(get_db, CONFIG_FILE).sync_now()
+
+        notifications.prune(db)
+        print(f"Cleanup finished. {len(expired_users)} users suspended today.")
         
     except Exception as e:
         print(f"An error occurred during daily cleanup: {e}")
@@ -409,43 +502,10 @@ def daily_cleanup():
         db.close()
 
 if __name__ == '__main__':
+    migrations.run(DATABASE_PATH)
     daily_cleanup()
 PY
 
-# ===== Backup Script =====
-say "${Y}💾 Backup System ထည့်သွင်းနေပါတယ်...${Z}"
-cat >/etc/zivpn/backup.py <<'PY'
-import sqlite3, shutil, datetime, os, gzip
-
-BACKUP_DIR = "/etc/zivpn/backups"
-DATABASE_PATH = "/etc/zivpn/zivpn.db"
-
-def backup_database():
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(BACKUP_DIR, f"zivpn_backup_{timestamp}.db.gz")
-    
-    # Backup database
-    with open(DATABASE_PATH, 'rb') as f_in:
-        with gzip.open(backup_file, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
-    
-    # Cleanup old backups (keep last 7 days)
-    for file in os.listdir(BACKUP_DIR):
-        file_path = os.path.join(BACKUP_DIR, file)
-        if os.path.isfile(file_path):
-            file_time = datetime.datetime.fromtimestamp(os.path.getctime(file_path))
-            if (datetime.datetime.now() - file_time).days > 7:
-                os.remove(file_path)
-    
-    print(f"Backup created: {backup_file}")
-
-if __name__ == '__main__':
-    backup_database()
-PY
-
 # ===== Connection Manager =====
 say "${Y}🔗 Connection Manager ထည့်သွင်းနေပါတယ်...${Z}"
 
@@ -509,6 +569,7 @@ After=network.target
 Type=simple
 User=root
 WorkingDirectory=/etc/zivpn
+EnvironmentFile=-/etc/zivpn/web.env
 ExecStart=/usr/bin/python3 /etc/zivpn/api.py
 Restart=always
 RestartSec=3
@@ -545,6 +606,7 @@ After=network.target zivpn.service
 [Service]
 Type=simple
 User=root
+EnvironmentFile=-/etc/zivpn/web.env
 WorkingDirectory=/etc/zivpn
 ExecStart=/usr/bin/python3 /etc/zivpn/connection_manager.py
 Restart=always
@@ -564,6 +626,7 @@ After=network.target
 Type=oneshot
 User=root
 WorkingDirectory=/etc/zivpn
+EnvironmentFile=-/etc/zivpn/web.env
 ExecStart=/usr/bin/python3 /etc/zivpn/backup.py
 
 [Install]
@@ -616,6 +679,10 @@ EOF
 echo -e "${Y}🌐 Network Configuration ပြုလုပ်နေပါတယ်...${Z}"
 sysctl -w net.ipv4.ip_forward=1 >/dev/null
 grep -q '^net.ipv4.ip_forward=1' /etc/sysctl.conf || echo 'net.ipv4.ip_forward=1' >> /etc/sysctl.conf
+# Bandwidth accounting အတွက် conntrack byte counters များကို ဖွင့်သည်။
+modprobe nf_conntrack 2>/dev/null || true
+sysctl -w net.netfilter.nf_conntrack_acct=1 >/dev/null 2>&1 || true
+grep -q '^net.netfilter.nf_conntrack_acct=1' /etc/sysctl.conf || echo 'net.netfilter.nf_conntrack_acct=1' >> /etc/sysctl.conf
 
 IFACE=$(ip -4 route ls | awk '/default/ {print $5; exit}')
 [ -n "${IFACE:-}" ] || IFACE=eth0
@@ -625,6 +692,15 @@ iptables -t nat -F
 iptables -t nat -A PREROUTING -i "$IFACE" -p udp --dport 6000:19999 -j DNAT --to-destination :5667
 iptables -t nat -A POSTROUTING -o "$IFACE" -j MASQUERADE
 
+# ZIVPN flows ကို CONNMARK ဖြင့် mark လုပ်ထားသဖြင့် netlink dump ကို kernel ထဲတွင်ပင် filter လုပ်နိုင်သည်။
+CT_MARK_RULE=(PREROUTING -i "$IFACE" -p udp -m multiport --dports 5667,6000:19999 -j CONNMARK --set-xmark "$CT_MARK")
+iptables -t mangle -C "${CT_MARK_RULE[@]}" 2>/dev/null || iptables -t mangle -A "${CT_MARK_RULE[@]}"
+
+# Limit ကျော်၍ drop လုပ်ခံရသော devices များကို ခဏတာ block ထားရန် (Connection Manager က timeout ဖြင့် ထည့်သည်)
+ipset create zivpn_block hash:ip,port timeout 30 -exist
+BLOCK_RULE=(PREROUTING -p udp -m set --match-set zivpn_block src,dst -j DROP)
+iptables -t raw -C "${BLOCK_RULE[@]}" 2>/dev/null || iptables -t raw -A "${BLOCK_RULE[@]}"
+
 # UFW Rules
 ufw allow 1:65535/tcp >/dev/null 2>&1 || true
 ufw allow 1:65535/udp >/dev/null 2>&1 || true
@@ -662,6 +738,9 @@ echo -e "${C}🌐 WEB PANEL:${Z} ${Y}http://$IP:8080${Z}"
 echo -e "\n${G}🔐 LOGIN CREDENTIALS${Z}"
 echo -e "  ${Y}• Username:${Z} ${Y}$WEB_USER${Z}"
 echo -e "  ${Y}• Password:${Z} ${Y}$WEB_PASS${Z}"
+echo -e "\n${G}🛰️ FLEET API${Z} (FLEET_MODE panel တွင် node အဖြစ် ထည့်ရန်)"
+echo -e "  ${Y}• URL:${Z} ${Y}http://$IP:8081${Z}"
+echo -e "  ${Y}• Token:${Z} ${Y}$API_TOKEN${Z}"
 echo -e "\n${M}📊 SERVICES STATUS:${Z}"
 echo -e "  ${Y}systemctl status zivpn-web${Z}      - Web Panel"
 echo -e "  ${Y}systemctl status zivpn-bot${Z}      - Telegram Bot"
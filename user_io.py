@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+ZIVPN users CSV export / import
+- Export: users table ကို cursor မှ row အလိုက် ဖတ်ပြီး csv module ဖြင့် chunk များအဖြစ် stream လုပ်သည် (gzip optional)။
+- Import: rows များကို validate လုပ်ပြီး port မပါသော users များကို batch ဖြင့် port ချပေးကာ
+  chunk တစ်ခုလျှင် transaction တစ်ခုဖြင့် upsert လုပ်သည်။ dry-run ဖြင့် DB ကို မပြင်ဘဲ ရလဒ်ကိုသာ ကြည့်နိုင်သည်။
+
+Usage:
+  python3 user_io.py export [--gzip] [-o FILE]
+  python3 user_io.py import FILE [--dry-run]
+"""
+
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+
+import database
+import ports
+
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "/etc/zivpn/zivpn.db")
+GB = 1024 ** 3
+# Stream chunk တစ်ခုလျှင် rows / import transaction တစ်ခုလျှင် rows
+EXPORT_CHUNK_ROWS = 500
+IMPORT_CHUNK_ROWS = 500
+MAX_ERRORS_REPORTED = 200
+STATUSES = ("active", "suspended")
+
+EXPORT_HEADER = ["User", "Password", "Expires", "Port", "HWID", "Bandwidth Used (GB)", "Bandwidth Limit (GB)",
+                 "Speed Limit (MB/s)", "Max Connections", "Status", "Bandwidth Used (bytes)"]
+
+EXPORT_SQL = '''
+    SELECT username, password, expires, port, hwid, bandwidth_used, bandwidth_limit,
+           speed_limit_up, concurrent_conn, status
+    FROM users ORDER BY id
+'''
+
+# Import header (lowercase) -> field။ Export header နှင့် ရိုးရိုး column names နှစ်မျိုးလုံး လက်ခံသည်။
+IMPORT_COLUMNS = {
+    "user": "user", "username": "user",
+    "password": "password",
+    "expires": "expires",
+    "port": "port",
+    "hwid": "hwid",
+    "bandwidth used (bytes)": "bandwidth_used", "bandwidth_used": "bandwidth_used",
+    "bandwidth used (gb)": "bandwidth_used_gb",
+    "bandwidth limit (gb)": "bandwidth_limit", "bandwidth_limit": "bandwidth_limit",
+    "speed limit (mb/s)": "speed_limit", "speed_limit": "speed_limit",
+    "max connections": "concurrent_conn", "concurrent_conn": "concurrent_conn",
+    "status": "status",
+}
+
+UPSERT_SQL = '''
+    INSERT INTO users (username, password, expires, port, status, bandwidth_limit, speed_limit_up,
+                       concurrent_conn, hwid, bandwidth_used)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, IFNULL(?, 0))
+    ON CONFLICT(username) DO UPDATE SET
+        password = excluded.password, expires = excluded.expires, port = excluded.port,
+        status = excluded.status, bandwidth_limit = excluded.bandwidth_limit,
+        speed_limit_up = excluded.speed_limit_up, concurrent_conn = excluded.concurrent_conn,
+        hwid = excluded.hwid, bandwidth_used = IFNULL(?, bandwidth_used),
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# ===== Export =====
+
+def export_rows(db):
+    """Users rows ကို cursor မှ တစ်ခုချင်း yield လုပ်သည် (table တစ်ခုလုံးကို memory ထဲ မတင်ပါ)။"""
+    for r in db.execute(EXPORT_SQL):
+        used = int(r["bandwidth_used"] or 0)
+        yield [r["username"], r["password"], r["expires"] or "", r["port"] or "", r["hwid"] or "",
+               f"{used / GB:.2f}", r["bandwidth_limit"] or 0, r["speed_limit_up"] or 0,
+               r["concurrent_conn"] or 1, r["status"] or "", used]
+
+def iter_csv(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Header + rows ကို CSV text chunks အဖြစ် yield လုပ်သည်။"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EXPORT_HEADER)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % chunk_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def iter_gzip(chunks):
+    """Text chunks ကို gzip stream အဖြစ် compress လုပ်ပြီး yield လုပ်သည်။"""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield z.flush()
+
+def stream_export(get_db, compress=False):
+    """Response body generator - generator ပြီးဆုံးမှ (သို့မဟုတ် client ဖြတ်သွားမှ) connection ကို ပြန်ပေးသည်။"""
+    db = get_db()
+    try:
+        chunks = iter_csv(export_rows(db))
+        if compress:
+            yield from iter_gzip(chunks)
+        else:
+            for chunk in chunks:
+                yield chunk.encode("utf-8")
+    finally:
+        db.close()
+
+# ===== Import =====
+
+def open_csv_text(binary):
+    """Binary stream (gzip သို့မဟုတ် plain, UTF-8 BOM ပါနိုင်) ကို text stream အဖြစ်"""
+    if not hasattr(binary, "peek"):
+        binary = io.BufferedReader(binary)
+    if binary.peek(2)[:2] == b"\x1f\x8b":
+        binary = gzip.GzipFile(fileobj=binary)
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+def _int(value, field, minimum=0, maximum=None):
+    try:
+        n = int(float(value)) if value not in (None, "") else None
+    except ValueError:
+        raise ValueError(f"invalid {field}")
+    if n is not None and (n < minimum or (maximum is not None and n > maximum)):
+        raise ValueError(f"invalid {field}")
+    return n
+
+def parse_row(raw, today=None):
+    """CSV row (field -> text) ကို validate လုပ်ပြီး user dict ပြန်ပေးသည်။ မမှန်ပါက ValueError။"""
+    row = {}
+    for key, value in raw.items():
+        field = IMPORT_COLUMNS.get((key or "").strip().lower())
+        if field:
+            row[field] = (value or "").strip() if isinstance(value, str) else ""
+    user, password = row.get("user", ""), row.get("password", "")
+    if not user or not password:
+        raise ValueError("user and password are required")
+
+    expires = row.get("expires", "")
+    if expires.isdigit():
+        expires = ((today or date.today()) + timedelta(days=int(expires))).isoformat()
+    elif expires:
+        try:
+            expires = datetime.strptime(expires, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            raise ValueError("invalid expires")
+
+    status = (row.get("status") or "active").lower()
+    if status not in STATUSES:
+        # Export ထဲမှ 'expired' / 'online' စသည့် display statuses များ
+        status = "active"
+
+    used = _int(row.get("bandwidth_used"), "bandwidth_used")
+    if used is None and row.get("bandwidth_used_gb"):
+        try:
+            used = int(float(row["bandwidth_used_gb"]) * GB)
+        except ValueError:
+            raise ValueError("invalid bandwidth_used")
+
+    return {
+        "user": user,
+        "password": password,
+        "expires": expires or None,
+        "port": _int(row.get("port"), "port", ports.PORT_MIN, ports.PORT_MAX),
+        "status": status,
+        "bandwidth_limit": _int(row.get("bandwidth_limit"), "bandwidth_limit") or 0,
+        "speed_limit": _int(row.get("speed_limit"), "speed_limit") or 0,
+        "concurrent_conn": _int(row.get("concurrent_conn"), "concurrent_conn", 1) or 1,
+        "hwid": row.get("hwid", ""),
+        "bandwidth_used": used,
+    }
+
+def import_users(db, text, dry_run=False, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    CSV text stream မှ users များကို upsert လုပ်သည်။ မှားသော rows များကို ကျော်ပြီး errors ထဲ မှတ်သည်။
+    Summary dict ကို ပြန်ပေးသည်: rows, inserted, updated, errors, dry_run
+    """
+    existing = {}
+    for r in db.execute("SELECT username, port FROM users"):
+        try:
+            existing[r[0]] = int(r[1]) if r[1] not in (None, "") else None
+        except (TypeError, ValueError):
+            existing[r[0]] = None
+    # port -> owner username
+    owners = {port: name for name, port in existing.items() if port is not None}
+
+    summary = {"rows": 0, "inserted": 0, "updated": 0, "errors": [], "dry_run": dry_run}
+    seen = set()
+    valid = []
+    reader = csv.DictReader(text)
+    for raw in reader:
+        summary["rows"] += 1
+        try:
+            u = parse_row(raw)
+            if u["user"] in seen:
+                raise ValueError("duplicate user in file")
+            if u["port"] is not None and owners.get(u["port"], u["user"]) != u["user"]:
+                raise ValueError(f"port {u['port']} is used by {owners[u['port']]}")
+        except ValueError as e:
+            if len(summary["errors"]) < MAX_ERRORS_REPORTED:
+                summary["errors"].append({"line": reader.line_num, "user": raw.get("User") or raw.get("user") or "",
+                                          "error": str(e)})
+            else:
+                summary["errors_truncated"] = True
+            continue
+        seen.add(u["user"])
+        if u["port"] is not None:
+            owners[u["port"]] = u["user"]
+        valid.append(u)
+    summary["error_count"] = summary["rows"] - len(valid)
+
+    # Port မပါသော rows များ: ရှိပြီးသား user ဖြစ်ပါက port ဟောင်းကို ထားပြီး အသစ်များကို free-list မှ batch ဖြင့် ချပေးသည်။
+    file_ports = {u["port"] for u in valid if u["port"] is not None}
+    for u in valid:
+        if u["port"] is None:
+            current = existing.get(u["user"])
+            if current is not None and owners.get(current) == u["user"]:
+                u["port"] = current
+        if u["user"] in existing:
+            summary["updated"] += 1
+        else:
+            summary["inserted"] += 1
+
+    if dry_run:
+        needed = sum(1 for u in valid if u["port"] is None)
+        summary["ports_allocated"] = len(ports.reserve(db, needed, file_ports))
+        return summary
+    summary["ports_allocated"] = 0
+    for i in range(0, len(valid), chunk_rows):
+        chunk = valid[i:i + chunk_rows]
+        try:
+            with db.transaction():
+                # Reservation နှင့် insert ကို transaction တစ်ခုတည်းတွင် လုပ်သည် (ports များကို trigger က free-list မှ ဖယ်သည်)။
+                need = [u for u in chunk if u["port"] is None]
+                for u, port in zip(need, ports.reserve(db, len(need), file_ports)):
+                    u["port"] = port
+                    summary["ports_allocated"] += 1
+                db.executemany(UPSERT_SQL, [(
+                    u["user"], u["password"], u["expires"], u["port"], u["status"], u["bandwidth_limit"],
+                    u["speed_limit"], u["concurrent_conn"], u["hwid"], u["bandwidth_used"], u["bandwidth_used"],
+                ) for u in chunk])
+        except sqlite3.IntegrityError as e:
+            # ဥပမာ file ထဲတွင် users အချင်းချင်း port လဲထားခြင်း - ဤ chunk ကိုသာ ကျော်သည်။
+            summary["errors"].append({"line": None, "user": f"{chunk[0]['user']}..{chunk[-1]['user']}",
+                                      "error": f"chunk skipped: {e}"})
+            summary["error_count"] += len(chunk)
+            for u in chunk:
+                summary["updated" if u["user"] in existing else "inserted"] -= 1
+    return summary
+
+if __name__ == "__main__":
+    import json
+    args = sys.argv[1:]
+    if not args or args[0] not in ("export", "import"):
+        print("Usage:" + __doc__.split("Usage:")[1].rstrip())
+        sys.exit(2)
+    get_db = lambda: database.get_db(DATABASE_PATH)
+    if args[0] == "export":
+        out_path = args[args.index("-o") + 1] if "-o" in args else None
+        out = open(out_path, "wb") if out_path else sys.stdout.buffer
+        try:
+            for data in stream_export(get_db, compress="--gzip" in args):
+                out.write(data)
+        finally:
+            if out_path:
+                out.close()
+    else:
+        paths = [a for a in args[1:] if not a.startswith("--")]
+        if not paths:
+            print("import: CSV file required")
+            sys.exit(2)
+        dry_run = "--dry-run" in args
+        db = get_db()
+        try:
+            with open(paths[0], "rb") as f:
+                summary = import_users(db, open_csv_text(f), dry_run=dry_run)
+        finally:
+            db.close()
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        if not dry_run and (summary["inserted"] or summary["updated"]):
+            from config_sync import ConfigSyncer
+            ConfigSyncer(get_db).sync_now()